@@ -1,24 +1,33 @@
-from fastapi import APIRouter
-from app.core.config import settings
+from fastapi import APIRouter, HTTPException
+from app.core.logging import get_logger
+from app.services.detection_state import get_detection_state
 
 router = APIRouter(tags=["control"])
+log = get_logger(__name__)
 
-# simple in-memory flag (authoritative at runtime)
-_state = {"enabled": getattr(settings, 'DETECTION_ENABLED', False)}
+# The flag lives in the shared state backend (see app.services.detection_state);
+# every worker holds a locally cached copy that follows its change notifications.
+
+async def _set_enabled(enabled: bool) -> dict:
+    try:
+        await get_detection_state().set_enabled(enabled)
+    except Exception as e:
+        log.error("could not update detection state", enabled=enabled, error=repr(e))
+        raise HTTPException(status_code=503, detail="detection state backend unavailable")
+    return {"enabled": enabled}
 
 @router.post("/start")
-def start_detection():
-    _state["enabled"] = True
-    return {"enabled": True}
+async def start_detection():
+    return await _set_enabled(True)
 
 @router.post("/stop")
-def stop_detection():
-    _state["enabled"] = False
-    return {"enabled": False}
+async def stop_detection():
+    return await _set_enabled(False)
 
 @router.get("/status")
 def status():
-    return {"enabled": _state["enabled"]}
+    return {"enabled": is_enabled()}
     
 def is_enabled() -> bool:
-    return _state["enabled"]
+    # Hot path (every inbound call): cached value, no I/O
+    return get_detection_state().is_enabled()
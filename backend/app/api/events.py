@@ -0,0 +1,83 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.security import bearer_token, may_subscribe
+from app.services.event_hub import Subscription, get_event_hub
+
+router = APIRouter(tags=["events"])
+log = get_logger(__name__)
+
+
+@router.get("/events")
+async def events_sse(
+    call_sid: Optional[str] = None, token: Optional[str] = None, authorization: Optional[str] = Header(None)
+):
+    """
+    Server-sent events for one call (?call_sid=CA...) or, with EVENTS_API_TOKEN
+    (Authorization: Bearer ... or ?token=...), all calls.
+
+    A comment line goes out every EVENT_HUB_HEARTBEAT_SECONDS so proxies keep
+    the stream open; an "evicted" event means the client fell behind and
+    should reconnect.
+    """
+    if not may_subscribe(call_sid, bearer_token(authorization) or token):
+        raise HTTPException(status_code=401, detail="call_sid or a valid token is required")
+    sub = get_event_hub().subscribe(call_sid)
+
+    async def stream():
+        try:
+            while True:
+                event = await sub.get(timeout=settings.EVENT_HUB_HEARTBEAT_SECONDS)
+                if event is not None:
+                    yield event.sse
+                elif sub.closed:
+                    return
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            sub.close()
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/events/ws")
+async def events_ws(ws: WebSocket, call_sid: Optional[str] = None, token: Optional[str] = None):
+    """The same events as /events, one JSON text message each (same call_sid / token rules)."""
+    if not may_subscribe(call_sid, bearer_token(ws.headers.get("authorization")) or token):
+        log.warning("event subscription refused", all_calls=call_sid is None)
+        await ws.close(code=1008)  # policy violation
+        return
+    await ws.accept()
+    sub: Subscription = get_event_hub().subscribe(call_sid)
+
+    async def watch_disconnect():
+        # Clients don't send anything; this only notices when they go away
+        try:
+            while True:
+                await ws.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sub.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            event = await sub.get()
+            if event is None:
+                break
+            await ws.send_text(event.json)
+        if not watcher.done():
+            await ws.close()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        sub.close()
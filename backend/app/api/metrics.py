@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Prometheus text exposition of call latency, queue depth and event-loop lag metrics.
+
+    async on purpose: rendering runs on the event loop that updates the metrics
+    (and owns the state gauge probes read), never on a threadpool thread.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
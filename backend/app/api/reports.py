@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.security import require_api_token
+from app.db import queries
+from app.db.session import get_engine
+from app.services.capture_archive import get_capture_archive, mulaw_wav
+
+# Call SIDs, transcripts and audio: every route needs EVENTS_API_TOKEN
+router = APIRouter(prefix="/reports", tags=["reports"], dependencies=[Depends(require_api_token)])
+
+
+def _engine():
+    engine = get_engine()
+    if engine is None:
+        raise HTTPException(status_code=503, detail="persistence is disabled")
+    return engine
+
+
+@router.get("/calls")
+async def list_calls(
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[datetime] = None,
+    status: Optional[str] = None,
+):
+    """Call history, newest first (page with ?before=<started_at of the last row>)."""
+    async with _engine().connect() as conn:
+        return {"calls": await queries.recent_calls(conn, limit=limit, before=before, status=status)}
+
+
+@router.get("/calls/{call_sid}")
+async def get_call(call_sid: str):
+    async with _engine().connect() as conn:
+        report = await queries.call_report(conn, call_sid)
+    if report is None:
+        raise HTTPException(status_code=404, detail="unknown call")
+    return report
+
+
+@router.get("/calls/{call_sid}/audio")
+async def get_call_audio(call_sid: str):
+    """A call's archived captures as one μ-law WAV, streamed from the memory-mapped segments."""
+    archive = get_capture_archive()
+    if archive is None:
+        raise HTTPException(status_code=503, detail="μ-law capture archive is disabled")
+    chunks = await asyncio.to_thread(archive.call_audio, call_sid)
+    if not chunks:
+        raise HTTPException(status_code=404, detail="no archived audio for this call")
+    # A plain iterator: Starlette pulls it in a thread, so page faults on the mapping stay off the loop
+    return StreamingResponse(iter(mulaw_wav(chunks)), media_type="audio/wav")
+
+
+@router.get("/summary")
+async def summary(days: int = Query(7, ge=1, le=365)):
+    since = datetime.utcnow() - timedelta(days=days)
+    async with _engine().connect() as conn:
+        return {"since": since, "calls_by_status": await queries.verdict_counts(conn, since)}
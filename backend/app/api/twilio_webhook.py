@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Request, Response
 from app.core.config import settings
+from app.core.logging import get_logger
 # from app.core.security import validate_twilio_request  # Commented out for development
 from app.api.detection import is_enabled
-from twilio.twiml.voice_response import VoiceResponse, Start, Stream, Dial, Say
+from app.services.admission import get_admission
+from app.services.twiml_cache import called_number, forward_target, get_twiml_cache
 
 router = APIRouter(tags=["twilio"])
+log = get_logger(__name__)
 
 @router.post("/twilio/voice")
 async def voice_webhook(request: Request):
@@ -16,9 +19,9 @@ async def voice_webhook(request: Request):
     try:
         ua = request.headers.get("user-agent", "<unknown>")
         ct = request.headers.get("content-type", "<unknown>")
-        print(f"TWILIO WEBHOOK HIT: method=POST path=/twilio/voice ua={ua} content-type={ct} body-bytes={len(body)}")
+        log.info("voice webhook hit", ua=ua, content_type=ct, body_bytes=len(body))
     except Exception:
-        print("TWILIO WEBHOOK HIT: (failed to read request headers/body length)")
+        log.warning("voice webhook hit (failed to read request headers/body length)")
 
     """
     Twilio Signature Validation (Currently Disabled):
@@ -47,43 +50,20 @@ async def voice_webhook(request: Request):
     - Compare signatures using your TWILIO_AUTH_TOKEN
     """
 
-    vr = VoiceResponse()
-
+    # Prebuilt per (detection on/off, forward target): call setup is a dict lookup.
+    # A worker that is declining new streams (load shedding) answers without one, so
+    # Twilio never opens a socket we'd refuse.
     detection_on = is_enabled()
-    print(f"TWILIO WEBHOOK: detection_enabled={detection_on}")
-
-    if detection_on:
-        # 1) Start media streaming to your FastAPI WS
-        start = Start()
-        start.append(Stream(url=settings.PUBLIC_WS_MEDIA_URL))
-        vr.append(start)
-        print(f"TWILIO WEBHOOK: starting media stream to {settings.PUBLIC_WS_MEDIA_URL}")
-
-        # Optional: brief notice for compliance (region-specific)
-        vr.append(Say("This call may be monitored and transcribed for demo purposes."))
-
-        # During testing, disable forwarding and keep the call open briefly
-        # if settings.FORWARD_TO_NUMBER:
-        #     dial = Dial(caller_id=settings.TWILIO_PHONE_NUMBER)
-        #     dial.number(settings.FORWARD_TO_NUMBER)
-        #     vr.append(dial)
-        #     print(f"TWILIO WEBHOOK: dialing forward_to={settings.FORWARD_TO_NUMBER}")
-        # else:
-        vr.pause(length=60)
-        print("TWILIO WEBHOOK: forwarding disabled; pausing call for 60s")
-    else:
-        # OFF mode: normal flow (no stream)
-        # Forwarding disabled during testing as well
-        # if settings.FORWARD_TO_NUMBER:
-        #     dial = Dial(caller_id=settings.TWILIO_PHONE_NUMBER)
-        #     dial.number(settings.FORWARD_TO_NUMBER)
-        #     vr.append(dial)
-        #     print(f"TWILIO WEBHOOK: detection OFF; dialing forward_to={settings.FORWARD_TO_NUMBER}")
-        # else:
-        vr.append(Say("Streaming is currently disabled."))
-        print("TWILIO WEBHOOK: detection OFF; informing caller that streaming is disabled")
-
-    # Return as XML
-    twiml = str(vr)
-    print(f"TWILIO WEBHOOK RESPONSE TwiML=\n{twiml}")
+    admission = get_admission()
+    streaming = detection_on and admission.accepting_streams
+    forward_to = forward_target(called_number(body)) if settings.FORWARD_CALLS_ENABLED else ""
+    twiml = get_twiml_cache().get(streaming, forward_to)
+    log.info(
+        "voice webhook",
+        detection_enabled=detection_on,
+        streaming=streaming,
+        shedding_tier=admission.tier or None,
+        forward_to=forward_to or None,
+    )
+    log.debug("voice webhook response", twiml=twiml)
     return Response(content=twiml, media_type="application/xml")
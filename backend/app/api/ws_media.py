@@ -1,26 +1,44 @@
-import asyncio
-import wave
-import os
 import time
-import base64
-import json
-from typing import Optional
+from typing import Any, Dict, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.reality_defender import RealityDefenderService
+from app.services.reality_defender import get_reality_defender
 
 from app.core.config import settings
-from app.services.google_stt import GoogleSTTStreamer
-from app.services.notifier import notify_detection_result
+from app.core.logging import bind_call_sid, get_logger
+from app.core.metrics import (
+    DETECTION_STEP_SECONDS,
+    DETECTION_WINDOWS,
+    MEDIA_FRAMES,
+    STT_FIRST_RESULT_SECONDS,
+    VERDICTS,
+    CallTrace,
+    end_call_trace,
+    start_call_trace,
+)
+from app.db.writer import PersistenceWriter, get_persistence
+from app.services.admission import get_admission
+from app.services.audio_pipeline import (
+    BYTES_PER_SECOND,
+    BytesLike,
+    CallAudioBuffer,
+    FrameCoalescer,
+    SpeechTimeline,
+    VoiceActivityGate,
+    get_audio_executor,
+)
+from app.services.capture_archive import archive_in_background, archive_wav, get_capture_archive
+from app.services.detection_scheduler import DetectionScheduler
+from app.services.event_hub import get_event_hub
+from app.services.google_stt import AsyncGoogleSTTStreamer
+from app.services.media_stream import MediaStreamError, parse_message
+from app.services.notifier import notify_detection_result, notify_transcript_risk
+from app.services.phrase_detector import TranscriptRiskTracker
+from app.services.task_supervisor import get_task_supervisor
+from app.services.verdict_cache import get_verdict_cache
 
 
 router = APIRouter(tags=["media"])
-
-_BIAS = 0x84
-_CLIP = 32635
-_EXP_LUT = [0, 132, 396, 924, 1980, 4092, 8316, 16764]
-capture_buf: Optional[bytearray] = None
-CAPTURE_TARGET_BYTES = 8000 * 10  # 10s of MULAW at 8kHz, mono
-captured = False
+log = get_logger(__name__)
 
 @router.websocket("/media")
 async def media_ws(ws: WebSocket):
@@ -30,198 +48,374 @@ async def media_ws(ws: WebSocket):
     Twilio sends base64-encoded G.711 MULAW audio at 8 kHz. We stream
     the decoded bytes (raw MULAW) directly to Google STT with encoding=MULAW.
     """
-    await ws.accept()
-    
+    # Draining for a restart: new streams go to another worker, calls already here carry on
+    if get_task_supervisor().draining:
+        log.info("media stream refused while draining")
+        await ws.close(code=1012)  # "service restart"
+        return
+
     # Track call and stream identifiers for logging and debugging
     call_sid = None
     stream_sid = None
     frames = 0
 
-    stt: Optional[GoogleSTTStreamer] = None
+    stt: Optional[AsyncGoogleSTTStreamer] = None
+    stt_chunks = FrameCoalescer(settings.STT_CHUNK_MS, settings.STT_CHUNK_MAX_DELAY_MS)
+    stt_first_audio: Optional[float] = None
 
-    print("WS: client connected")
-    
-    last_interim = ""
+    # Silence gate in front of STT and detection (None = everything passes)
+    vad: Optional[VoiceActivityGate] = None
+    in_speech = False
+    call_bytes = 0  # μ-law bytes received since "start" (call time, gated or not)
+
+    # Vars for reality defender check (per call, reset on "start").
+    # With VAD on, capture_buf only holds speech, so windows are speech-dense;
+    # timeline maps its offsets back to call time for reporting.
+    capture_buf: Optional[CallAudioBuffer] = None
+    timeline = SpeechTimeline()
+    detector: Optional[DetectionScheduler] = None
+    notified_status: Optional[str] = None
+
+    # Scam-phrase matcher over this call's transcripts (reset on "start")
+    risk: Optional[TranscriptRiskTracker] = None
 
-    def mulaw_to_linear16(mulaw_bytes: bytes) -> bytes:
-        out = bytearray(len(mulaw_bytes)*2)
-        j = 0 
-
-        for b in mulaw_bytes:
-            mu = (~b) & 0xFF
-            sign = mu & 0x80
-            exponent = (mu >> 4) & 0x07
-            mantissa = mu & 0x0F
-            magnitude = _EXP_LUT[exponent] + (mantissa << (exponent + 3))
-            
-            if magnitude > _CLIP:
-                magnitude = _CLIP
-            
-            sample = magnitude - _BIAS
-
-            if sign:
-                sample = -sample
-            
-            out[j] = sample & 0xFF
-            out[j+1] = (sample >> 8) & 0xFF
-            j += 2
-        
-        return bytes(out)
-    
-    async def save_and_submit_wav(call_sid: str, mulaw_bytes: bytes) -> None:
-        # Convert to PCM 16
-        pcm = mulaw_to_linear16(mulaw_bytes)
-
-        # Write WAV (mono, 8khz, 16-bit)
-        ts = int(time.time()) # timestamp
-        out_dir = settings.CAPTURE_DIR
-        os.makedirs(out_dir, exist_ok=True) # Make sure the directory exists
-        fname = f"call_{call_sid or 'unknown'}_{ts}.wav"
-        path = os.path.join(out_dir, fname)
-
-        with wave.open(path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(8000)
-            wf.writeframes(pcm)
-        
-        print(f"WAV written: {path}")
+    # Stage timings for this call (first frame, verdict, ...), see app.core.metrics
+    trace: Optional[CallTrace] = None
+
+    # Write-behind store for the call's history (None when persistence is off)
+    db: Optional[PersistenceWriter] = None
+    utterance_phrases: list = []  # phrases matched since the last final transcript
+
+    # Live events for subscribed apps (publish is a no-op when nobody is listening)
+    hub = get_event_hub()
+
+    last_interim = ""
+    call_ended = False  # set once the socket is done; late STT results are only persisted
+
+    async def save_and_submit_wav(call_sid: str, mulaw_bytes: BytesLike, start: int) -> Dict[str, Any]:
+        if trace is not None:
+            trace.mark("capture_complete")
+
+        # The window is a view into the call's ring buffer, which the media loop keeps writing
+        # while this capture is encoded and uploaded: archive it before the first await
+        archive = get_capture_archive() if settings.DETECTION_SUBMIT_MODE != "file" else None
+        if archive is not None:
+            archive.append(call_sid, mulaw_bytes, start)  # μ-law as received, not the PCM upload
+
+        # Build the WAV (mono, 8khz, 16-bit PCM) in memory, plus its fingerprint for the
+        # verdict cache; both run on the audio executor, off this event loop
+        cache = get_verdict_cache()
+        t = time.perf_counter()
+        wav, words = await get_audio_executor().wav_and_fingerprint(mulaw_bytes, fingerprint=cache is not None)
+        DETECTION_STEP_SECONDS.observe(time.perf_counter() - t, step="encode")
+
+        # Replayed robocall audio: reuse an earlier verdict instead of uploading again
+        if words:
+            cached = await cache.lookup(words)
+            if cached is not None:
+                DETECTION_WINDOWS.inc(outcome="cached")
+                log.info("verdict from cache", status=cached.get("status"), score=cached.get("score"))
+                return cached
+
+        svc = get_reality_defender()
 
         # Submit to reality defender (non-block here, but we await once)
-        svc = RealityDefenderService()
-        result = await svc.analyze_file(path)
-        print("Reality Defender:", {"status": result.get("status"), "score": result.get("score")})
-        
-        # Send SMS with detection outcome (AUTHENTIC or MANIPULATED)
+        t = time.perf_counter()
+        if settings.DETECTION_SUBMIT_MODE == "file":
+            path = await archive_wav(call_sid, wav)
+            if trace is not None:
+                trace.mark("wav_written")
+            request_id = await svc.upload(path)
+        else:
+            if trace is not None:
+                trace.mark("wav_written")
+            if archive is None and settings.CAPTURE_ARCHIVE_ENABLED:
+                archive_in_background(call_sid, wav)
+            request_id = await svc.upload_bytes(wav, filename=f"call_{call_sid or 'unknown'}.wav")
+        DETECTION_STEP_SECONDS.observe(time.perf_counter() - t, step="upload")
+        if trace is not None:
+            trace.mark("upload_done")
+
+        t = time.perf_counter()
+        result = await svc.wait_for_result(request_id)
+        DETECTION_STEP_SECONDS.observe(time.perf_counter() - t, step="result")
+        log.info("reality defender result", status=result.get("status"), score=result.get("score"))
+        if words:
+            await cache.store(words, result)
+        return result
+
+    def on_verdict(result: Dict[str, Any], start: int, end: int) -> None:
+        nonlocal notified_status
+        status = result.get("status")
+        VERDICTS.inc(status=status or "unknown")
+        if trace is not None:
+            trace.mark("verdict")
+        # Window offsets count speech only when VAD is on; report them in call time
+        start_s = round(timeline.to_call(start) / BYTES_PER_SECOND, 1)
+        end_s = round(timeline.to_call(end, end=True) / BYTES_PER_SECOND, 1)
+        log.info(
+            "detection window scored",
+            window_start_s=start_s,
+            window_end_s=end_s,
+            status=status,
+            score=result.get("score"),
+        )
+        if db is not None:
+            db.record_window(call_sid, start_s, end_s, status, result.get("score"))
+        hub.publish("verdict", call_sid or "", status=status, score=result.get("score"), window_start_s=start_s, window_end_s=end_s)
+        # Send SMS with detection outcome (AUTHENTIC or MANIPULATED): once for the
+        # first verdict, then again only if a later window changes it.
+        if status == notified_status:
+            return
+        notified_status = status
+        if db is not None and status:
+            db.record_verdict(call_sid, status, result.get("score"), notified=bool(settings.FORWARD_TO_NUMBER))
         if settings.FORWARD_TO_NUMBER:
             notify_detection_result(
                 settings.FORWARD_TO_NUMBER,
-                call_sid,
-                result.get("status"),
+                call_sid or "",
+                status,
                 result.get("score"),
             )
 
     def on_transcript(text: str, is_final: bool) -> None:
         nonlocal last_interim
         t = text.strip()
+        if call_ended:
+            # STT readers outlive the socket to flush final results; those are only stored, no
+            # events, risk updates or alerts for a call that is over
+            if is_final and t and db is not None:
+                db.record_transcript(call_sid, t)
+            return
+        if trace is not None and trace.mark("stt_first_result") is not None and stt_first_audio is not None:
+            STT_FIRST_RESULT_SECONDS.observe(time.monotonic() - stt_first_audio)
         if is_final:
-            print(f"STT[FINAL]: {t}")
+            log.info("transcript", final=True, text=t)
             last_interim = "" # Reset between utterances
-        
+
         else:
-            # If it's not the same text then print it
+            # Interims arrive several times a second: debug level only
             if t and t != last_interim:
-                print(f"STT[INTERIM]: {t}")
+                log.debug("transcript", final=False, text=t)
                 last_interim = t
+            else:
+                return  # unchanged interim: nothing new to match
+
+        update = risk.update(t, is_final) if risk is not None else None
+        if update is not None:
+            utterance_phrases.extend(update.new_phrases)
+        if is_final and db is not None and t:
+            db.record_transcript(call_sid, t, utterance_phrases, risk.score if risk is not None and utterance_phrases else None)
+        if is_final:
+            utterance_phrases.clear()
+            if t:
+                hub.publish("transcript", call_sid or "", text=t[: settings.EVENT_TRANSCRIPT_MAX_CHARS])
+        if update is None:
+            return
+        hub.publish("risk", call_sid or "", score=round(update.score, 3), phrases=update.new_phrases)
+        log.info("scam phrases heard", phrases=update.new_phrases, risk=round(update.score, 2))
+        if update.crossed_alert and settings.FORWARD_TO_NUMBER:
+            notify_transcript_risk(settings.FORWARD_TO_NUMBER, call_sid or "", update.score, risk.matched_phrases)
+
+    async def close_stt() -> None:
+        """Send the buffered tail, end the stream and give its slot back to the ticket."""
+        nonlocal stt
+        try:
+            tail = stt_chunks.flush()
+            if tail is not None:
+                await stt.write(tail)
+            stt.close()
+            log.info("STT streaming session closed")
+        except Exception as e:
+            log.warning("STT error while closing session", error=str(e))
+        finally:
+            stt = None
+            ticket.stt_stopped()
+
+    # Load shedding: refuse the socket outright when this worker is declining new streams.
+    # From here on the ticket is released by the finally below, even if accept() fails.
+    admission = get_admission()
+    ticket = admission.admit()
+    if ticket is None:
+        log.warning("media stream declined under load", tier=admission.tier, sessions=admission.sessions)
+        await ws.close(code=1013)  # "try again later"
+        return
 
     try:
+        await ws.accept()
+        log.info("client connected")
+
         while True:
             # Receive raw JSON message from WebSocket
             raw = await ws.receive_text()
 
             try:
-                msg = json.loads(raw)
-            except json.JSONDecodeError as e:
-                print(f"WS: Invalid JSON received: {e}")
+                event, mulaw_bytes, msg = parse_message(raw)
+            except MediaStreamError as e:
+                log.warning("invalid message received", error=str(e))
                 continue
 
-            # Extract event type from the message
-            event = msg.get("event")
+            if event == "media":
+                # Handle incoming audio data (hot path: ~50 frames/s per call)
+                frames += 1
+                MEDIA_FRAMES.inc()
+                if frames == 1 and trace is not None:
+                    trace.mark("first_frame")
 
-            if event == "start":
+                if mulaw_bytes is None:
+                    log.warning("media event without payload")
+                    continue
 
-                # Vars for reality defender check
-                capture_buf = bytearray()
-                captured = False
+                call_bytes += len(mulaw_bytes)
+                if vad is not None:
+                    audio, is_speech = vad.push(mulaw_bytes)
+                else:
+                    audio, is_speech = mulaw_bytes, True
 
+                if stt is not None:
+                    chunk = stt_chunks.push(audio) if audio is not None else None
+                    if chunk is None and in_speech and not is_speech:
+                        # Speech just ended: send the tail now, not with the next frame the gate lets through
+                        chunk = stt_chunks.flush()
+                    if chunk is not None:
+                        if stt_first_audio is None:
+                            stt_first_audio = time.monotonic()
+                        try:
+                            await stt.write(chunk)
+                        except Exception as e:
+                            log.warning("STT failed to process audio chunk", error=str(e))
+
+                if settings.LOG_SAMPLE_EVERY and frames % settings.LOG_SAMPLE_EVERY == 0:
+                    log.debug("media frames received", frames=frames)
+
+                in_speech = is_speech
+
+                if capture_buf is not None and is_speech:
+                    # audio may start with pre-roll, so it ends (not starts) at the current frame
+                    timeline.add(capture_buf.total_written, call_bytes - len(audio))
+                    capture_buf.write(audio)
+                    # Submits due windows in the background so we don't block streaming
+                    detector.poll()
+
+            elif event == "start":
                 # Handle media stream start event
                 # This event contains metadata about the call and stream
                 start_data = msg.get("start", {})
                 call_sid = start_data.get("callSid")
                 stream_sid = start_data.get("streamSid")
 
-                print(f"MEDIA START callSid={call_sid}, streamSid={stream_sid}")
-
-                # Initialize Google STT streaming session
-                try:
-                    stt = GoogleSTTStreamer(
-                        language_code=settings.STT_LANGUAGE_CODE,
-                        sample_rate_hz=8000,
-                        enable_interim_results=True,
-                        enable_automatic_punctuation=True,
-                        audio_encoding="MULAW",
-                    )
-                    stt.start(callback=on_transcript)
-                    print("STT: streaming session started (MULAW@8kHz)")
-                except Exception as e:
-                    print(f"STT: failed to start streaming session: {e}")
-                    stt = None
-
-            elif event == "media":
-                # Handle incoming audio data
-                frames += 1
-                
-                # Extract base64-encoded audio payload
-                media_data = msg.get("media", {})
-                payload_b64 = media_data.get("payload")
-
-                if not payload_b64:
-                    print("WS: Received media event without payload")
-                    continue
-
-                try:
-                    mulaw_bytes = base64.b64decode(payload_b64)
-                except Exception as e:
-                    print(f"WS: Failed to decode base64 payload: {e}")
-                    continue
-
+                # A repeated "start" replaces the stream: end the previous one's STT session first
                 if stt is not None:
+                    await close_stt()
+
+                # Everything logged from here on (and by tasks started below) carries the callSid
+                bind_call_sid(call_sid)
+                log.info("media start", streamSid=stream_sid)
+
+                if trace is not None:
+                    end_call_trace(trace)
+                trace = start_call_trace(call_sid or stream_sid or "unknown")
+                frames = 0
+                call_bytes = 0
+                in_speech = False
+                timeline = SpeechTimeline()
+                db = get_persistence() if call_sid else None
+                if db is not None:
+                    db.record_call_started(call_sid, stream_sid)
+                hub.publish("call_started", call_sid or "", streamSid=stream_sid)
+                utterance_phrases.clear()
+                stt_first_audio = None
+
+                if detector is not None:
+                    detector.close()
+                capture_buf = CallAudioBuffer(settings.CALL_BUFFER_SECONDS)
+                archive = get_capture_archive()
+                if archive is not None:
+                    archive.new_stream(call_sid)  # window offsets restart with the new buffer
+                sid = call_sid or ""
+                detector = DetectionScheduler(
+                    capture_buf,
+                    analyze=lambda window, start: save_and_submit_wav(sid, window, start),
+                    on_verdict=on_verdict,
+                    hop_factor=admission.hop_factor,
+                )
+                notified_status = None
+                risk = TranscriptRiskTracker() if settings.SCAM_PHRASES_ENABLED else None
+                vad = (
+                    VoiceActivityGate(
+                        margin_db=settings.VAD_MARGIN_DB,
+                        hangover_ms=settings.VAD_HANGOVER_MS,
+                        preroll_ms=settings.VAD_PREROLL_MS,
+                        keepalive_ms=settings.VAD_KEEPALIVE_MS,
+                    )
+                    if settings.VAD_ENABLED
+                    else None
+                )
+
+                # Initialize Google STT streaming session (skipped first when shedding load)
+                if not ticket.allow_stt:
+                    log.warning("transcription skipped under load", tier=admission.tier)
+                else:
                     try:
-                        stt.write(mulaw_bytes)
+                        stt = AsyncGoogleSTTStreamer(
+                            language_code=settings.STT_LANGUAGE_CODE,
+                            sample_rate_hz=8000,
+                            enable_interim_results=True,
+                            enable_automatic_punctuation=True,
+                            audio_encoding="MULAW",
+                        )
+                        stt.start(callback=on_transcript)
+                        ticket.stt_started()
+                        log.info("STT streaming session started", encoding="MULAW", sample_rate_hz=8000)
                     except Exception as e:
-                        print(f"STT: failed to process audio chunk: {e}")
-
-                if frames % 50 == 0:
-                    print(f"MEDIA frames received: {frames}")
-                
-                if capture_buf is not None and not captured:
-                    capture_buf.extend(mulaw_bytes)
-                    if len(capture_buf) >= CAPTURE_TARGET_BYTES:
-                        captured = True
-                        # Run save + submit in background so we don't block streaming
-                        asyncio.create_task(save_and_submit_wav(call_sid or "", bytes(capture_buf)))
+                        log.error("STT failed to start streaming session", error=str(e))
+                        stt = None
+
+                # Queue depths for /metrics, read at scrape time
+                probe_stt, probe_det = stt, detector
+                if probe_stt is not None:
+                    trace.probes["stt"] = lambda: probe_stt.queue_depth
+                trace.probes["detection_in_flight"] = lambda: probe_det.in_flight
 
             elif event == "stop":
-                print(f"MEDIA STOP callSid={call_sid}, streamSid={stream_sid}")
-                
-                if capture_buf and not captured and len(capture_buf) > 0:  # If ended under 10s, grab whatever is there and process
-                    asyncio.create_task(save_and_submit_wav(call_sid or "", bytes(capture_buf)))
+                log.info(
+                    "media stop",
+                    streamSid=stream_sid,
+                    frames=frames,
+                    speech_s=round(vad.speech_bytes / BYTES_PER_SECOND, 1) if vad is not None else None,
+                    gated_s=round(vad.gated_bytes / BYTES_PER_SECOND, 1) if vad is not None else None,
+                )
+
+                if detector is not None:  # Score audio since the last window (or the whole call if under one window)
+                    detector.finish()
 
                 if stt is not None:
-                    try:
-                        stt.close()
-                        print("STT: streaming session closed")
-                    except Exception as e:
-                        print(f"STT: error while closing session: {e}")
-                    finally:
-                        stt = None
+                    await close_stt()
                 break
 
-            else:
-                # Twilio may send 'mark' or other diagnostic events
-                # These are typically used for debugging and can be ignored
-                print(f"WS: Received unknown event type: {event}")
+            # Anything else ('connected', 'mark', 'dtmf', ...) is diagnostic and ignored
 
     except WebSocketDisconnect:
-        print("WS: Client disconnected")
-    except Exception as e:
-        print(f"WS: Unexpected error: {e}")
+        log.info("client disconnected")
+    except Exception:
+        log.exception("unexpected error in media stream")
     finally:
+        call_ended = True
+        ticket.release()
+        if detector is not None:
+            detector.close()
         if stt is not None:
             try:
                 stt.close()
-                print("STT: streaming session closed (finally)")
+                log.info("STT streaming session closed (finally)")
             except Exception:
                 pass
-        print(f"WS: Connection ended for callSid={call_sid}, streamSid={stream_sid}")
-
+        if trace is not None:
+            end_call_trace(trace)
+        if call_sid:
+            hub.publish("call_ended", call_sid, frames=frames)
+        if db is not None:
+            db.record_call_ended(
+                call_sid, frames, round(vad.speech_bytes / BYTES_PER_SECOND, 1) if vad is not None else None
+            )
+        log.info("connection ended", streamSid=stream_sid)
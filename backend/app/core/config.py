@@ -13,22 +13,165 @@ class Settings:
     TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "")
     FORWARD_TO_NUMBER: str = os.getenv("FORWARD_TO_NUMBER")
     
+    # Outbound SMS dispatcher
+    SMS_MAX_PENDING: int = int(os.getenv("SMS_MAX_PENDING", "1000"))
+    SMS_MIN_INTERVAL_SECONDS: float = float(os.getenv("SMS_MIN_INTERVAL_SECONDS", "1"))  # per recipient
+    SMS_MAX_RETRIES: int = int(os.getenv("SMS_MAX_RETRIES", "3"))
+    SMS_RETRY_BACKOFF_SECONDS: float = float(os.getenv("SMS_RETRY_BACKOFF_SECONDS", "2"))
+    SMS_WORKERS: int = int(os.getenv("SMS_WORKERS", "4"))
+
     # Google Configuration
     GOOGLE_APPLICATION_CREDENTIALS: str = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
     STT_LANGUAGE_CODE: str = os.getenv("STT_LANGUAGE_CODE", "en-US")
+    # Batch Twilio's 20ms frames into chunks of this many ms before STT (0 = send every frame)
+    STT_CHUNK_MS: int = int(os.getenv("STT_CHUNK_MS", "100"))
+    # ...but never hold the first frame of a batch longer than this
+    STT_CHUNK_MAX_DELAY_MS: int = int(os.getenv("STT_CHUNK_MAX_DELAY_MS", "250"))
+    # Audio chunks queued per STT stream before backpressure applies (50 x 100ms chunks ~= 5s)
+    STT_QUEUE_MAX_CHUNKS: int = int(os.getenv("STT_QUEUE_MAX_CHUNKS", "50"))
+    # What to do when that queue is full: drop_oldest | coalesce | block
+    STT_BACKPRESSURE: str = os.getenv("STT_BACKPRESSURE", "drop_oldest").lower()
+    # Rotate streaming_recognize before Google's ~5 minute stream limit
+    STT_STREAM_ROTATE_SECONDS: float = float(os.getenv("STT_STREAM_ROTATE_SECONDS", "280"))
+    # Open the next stream this long before the rotation so the handover doesn't wait for it
+    # (it sits idle until then; keep it well under Google's ~10 s no-audio timeout)
+    STT_STREAM_PREOPEN_SECONDS: float = float(os.getenv("STT_STREAM_PREOPEN_SECONDS", "2"))
+    # Upper bound on unfinalized audio replayed into the next stream
+    STT_MAX_REPLAY_SECONDS: float = float(os.getenv("STT_MAX_REPLAY_SECONDS", "10"))
+    # Long-lived Speech gRPC channels shared by all STT streams in a worker
+    STT_POOL_SIZE: int = int(os.getenv("STT_POOL_SIZE", "2"))
+    # Connectivity check interval for the pooled channels (0 = off)
+    STT_POOL_HEALTH_SECONDS: float = float(os.getenv("STT_POOL_HEALTH_SECONDS", "15"))
+    # Consecutive failed sessions on one channel before it is replaced
+    STT_POOL_MAX_FAILURES: int = int(os.getenv("STT_POOL_MAX_FAILURES", "3"))
     
     # WebSocket and Media Configuration
     PUBLIC_WS_MEDIA_URL: str = os.getenv("PUBLIC_WS_MEDIA_URL", "ws://localhost:8000/media")
     FORWARD_TO_NUMBER: str = os.getenv("FORWARD_TO_NUMBER", "")
+    # Dial the forward number from the voice webhook (off while testing: the call is held instead)
+    FORWARD_CALLS_ENABLED: bool = os.getenv("FORWARD_CALLS_ENABLED", "false").lower() == "true"
+    # Per-number forwarding for multiple tenants: "called=forward_to,..." (others use FORWARD_TO_NUMBER)
+    FORWARD_NUMBERS: dict = dict(
+        pair.strip().split("=", 1) for pair in os.getenv("FORWARD_NUMBERS", "").split(",") if "=" in pair
+    )
     
+    # Logging: level and line format (logfmt | json)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "logfmt").lower()
+    # Log media-frame progress (debug level) every N frames per call (0 = never)
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "500"))
+
     # Detection Service Control
     DETECTION_ENABLED: bool = os.getenv("DETECTION_ENABLED", "false").lower() == "true"
+    # Where /start and /stop are shared across workers: memory (this process) | sqlite | redis
+    DETECTION_STATE_BACKEND: str = os.getenv("DETECTION_STATE_BACKEND", "memory").lower()
+    DETECTION_STATE_PATH: str = os.getenv("DETECTION_STATE_PATH", "/tmp/trustline_state.sqlite3")
+    DETECTION_STATE_REDIS_URL: str = os.getenv("DETECTION_STATE_REDIS_URL", "redis://localhost:6379/0")
+    # How often the sqlite backend checks for other workers' changes
+    DETECTION_STATE_POLL_SECONDS: float = float(os.getenv("DETECTION_STATE_POLL_SECONDS", "0.5"))
 
     # Reality Defender
     REALITY_DEFENDER_API_KEY: str = os.getenv("REALITY_DEFENDER_API_KEY", "")
+    RD_MAX_CONCURRENT_UPLOADS: int = int(os.getenv("RD_MAX_CONCURRENT_UPLOADS", "8"))
+    RD_MAX_CONCURRENT_POLLS: int = int(os.getenv("RD_MAX_CONCURRENT_POLLS", "16"))
+    RD_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("RD_REQUEST_TIMEOUT_SECONDS", "15"))
+    RD_RESULT_TIMEOUT_SECONDS: float = float(os.getenv("RD_RESULT_TIMEOUT_SECONDS", "60"))
+    RD_MAX_RETRIES: int = int(os.getenv("RD_MAX_RETRIES", "3"))
+    RD_BACKOFF_BASE_SECONDS: float = float(os.getenv("RD_BACKOFF_BASE_SECONDS", "0.5"))
+    RD_BACKOFF_MAX_SECONDS: float = float(os.getenv("RD_BACKOFF_MAX_SECONDS", "8"))
+    RD_POLL_INTERVAL_SECONDS: float = float(os.getenv("RD_POLL_INTERVAL_SECONDS", "0.5"))
+    RD_POLL_INTERVAL_MAX_SECONDS: float = float(os.getenv("RD_POLL_INTERVAL_MAX_SECONDS", "2"))
 
     # Directory for saved audio files
     CAPTURE_DIR: str = os.getenv("CAPTURE_DIR", "/tmp")
+    # "memory": upload WAVs straight from memory; "file": write to CAPTURE_DIR and upload the file
+    DETECTION_SUBMIT_MODE: str = os.getenv("DETECTION_SUBMIT_MODE", "memory").lower()
+    # Keep a copy of each capture in CAPTURE_DIR (background write; turn off in production)
+    CAPTURE_ARCHIVE_ENABLED: bool = os.getenv("CAPTURE_ARCHIVE_ENABLED", "true").lower() == "true"
+    # "mulaw": original μ-law appended to indexed segment files (half the size); "wav": a PCM WAV file per capture
+    CAPTURE_ARCHIVE_FORMAT: str = os.getenv("CAPTURE_ARCHIVE_FORMAT", "mulaw").lower()
+    # Start a new μ-law segment past this size or age
+    CAPTURE_ARCHIVE_SEGMENT_MB: float = float(os.getenv("CAPTURE_ARCHIVE_SEGMENT_MB", "64"))
+    CAPTURE_ARCHIVE_SEGMENT_SECONDS: float = float(os.getenv("CAPTURE_ARCHIVE_SEGMENT_SECONDS", "3600"))
+    # Queued captures are written (and fsynced) together at most this often
+    CAPTURE_ARCHIVE_FLUSH_SECONDS: float = float(os.getenv("CAPTURE_ARCHIVE_FLUSH_SECONDS", "1.0"))
+    # Captures waiting to be written before new ones are dropped
+    CAPTURE_ARCHIVE_MAX_PENDING: int = int(os.getenv("CAPTURE_ARCHIVE_MAX_PENDING", "256"))
+    # Calls whose capture index is kept in memory for /reports/calls/{sid}/audio (others are rescanned)
+    CAPTURE_ARCHIVE_INDEX_CALLS: int = int(os.getenv("CAPTURE_ARCHIVE_INDEX_CALLS", "1000"))
+
+    # Where WAV encoding / fingerprinting of detection windows runs: process | thread | inline
+    AUDIO_EXECUTOR: str = os.getenv("AUDIO_EXECUTOR", "process").lower()
+    AUDIO_EXECUTOR_WORKERS: int = int(os.getenv("AUDIO_EXECUTOR_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+
+    # Call history (calls, windows, verdicts, transcripts) for the report API; any SQLAlchemy async URL
+    PERSISTENCE_ENABLED: bool = os.getenv("PERSISTENCE_ENABLED", "true").lower() == "true"
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:////tmp/trustline.sqlite3")
+    # Write-behind queue: rows buffered (then dropped), rows per commit, max seconds between commits
+    PERSIST_MAX_PENDING: int = int(os.getenv("PERSIST_MAX_PENDING", "10000"))
+    PERSIST_BATCH_MAX: int = int(os.getenv("PERSIST_BATCH_MAX", "500"))
+    PERSIST_FLUSH_SECONDS: float = float(os.getenv("PERSIST_FLUSH_SECONDS", "0.5"))
+
+    # Live event push to apps (GET /events SSE, /events/ws): events buffered per subscriber
+    # before it is evicted as too slow, SSE keepalive interval, transcript text per event
+    EVENT_HUB_QUEUE_MAX: int = int(os.getenv("EVENT_HUB_QUEUE_MAX", "256"))
+    EVENT_HUB_HEARTBEAT_SECONDS: float = float(os.getenv("EVENT_HUB_HEARTBEAT_SECONDS", "15"))
+    EVENT_TRANSCRIPT_MAX_CHARS: int = int(os.getenv("EVENT_TRANSCRIPT_MAX_CHARS", "280"))
+    # Bearer token for the app API: /reports and the all-calls event stream (unset = both disabled)
+    EVENTS_API_TOKEN: str = os.getenv("EVENTS_API_TOKEN", "")
+
+    # Seconds of recent μ-law audio kept per call (fixed-size ring buffer)
+    CALL_BUFFER_SECONDS: float = float(os.getenv("CALL_BUFFER_SECONDS", "30"))
+
+    # Voice activity gating: silence is not sent to STT, detection windows are built from speech only
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "true").lower() == "true"
+    VAD_MARGIN_DB: float = float(os.getenv("VAD_MARGIN_DB", "9"))  # above the adaptive noise floor
+    VAD_HANGOVER_MS: int = int(os.getenv("VAD_HANGOVER_MS", "300"))
+    VAD_PREROLL_MS: int = int(os.getenv("VAD_PREROLL_MS", "200"))
+    VAD_KEEPALIVE_MS: int = int(os.getenv("VAD_KEEPALIVE_MS", "5000"))  # keep idle STT streams open
+
+    # Fingerprint-keyed verdict cache for replayed robocall audio: memory | sqlite | off
+    VERDICT_CACHE_BACKEND: str = os.getenv("VERDICT_CACHE_BACKEND", "memory").lower()
+    VERDICT_CACHE_PATH: str = os.getenv("VERDICT_CACHE_PATH", "/tmp/trustline_verdicts.sqlite3")
+    VERDICT_CACHE_TTL_SECONDS: float = float(os.getenv("VERDICT_CACHE_TTL_SECONDS", "86400"))
+    VERDICT_CACHE_MAX_ENTRIES: int = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "10000"))
+    # A hit needs this many fingerprint words agreeing on one alignment (or this share of the query)
+    VERDICT_CACHE_MIN_MATCHES: int = int(os.getenv("VERDICT_CACHE_MIN_MATCHES", "20"))
+    VERDICT_CACHE_MIN_MATCH_RATIO: float = float(os.getenv("VERDICT_CACHE_MIN_MATCH_RATIO", "0.01"))
+
+    # Scam-phrase detection over STT transcripts
+    SCAM_PHRASES_ENABLED: bool = os.getenv("SCAM_PHRASES_ENABLED", "true").lower() == "true"
+    SCAM_PHRASES_PATH: str = os.getenv(
+        "SCAM_PHRASES_PATH", os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "scam_phrases.txt"))
+    )
+    SCAM_PHRASES_RELOAD_SECONDS: float = float(os.getenv("SCAM_PHRASES_RELOAD_SECONDS", "10"))  # 0 = no reload
+    SCAM_PHRASE_DEFAULT_WEIGHT: float = float(os.getenv("SCAM_PHRASE_DEFAULT_WEIGHT", "0.5"))
+    # Alert (SMS) the first time a call's phrase risk score reaches each of these
+    SCAM_PHRASE_ALERT_TIERS: list = [float(t) for t in os.getenv("SCAM_PHRASE_ALERT_TIERS", "0.8,0.95").split(",") if t.strip()]
+
+    # Sliding-window deepfake detection
+    DETECTION_WINDOW_SECONDS: float = float(os.getenv("DETECTION_WINDOW_SECONDS", "10"))
+    DETECTION_HOP_SECONDS: float = float(os.getenv("DETECTION_HOP_SECONDS", "5"))
+    DETECTION_MAX_CONCURRENCY: int = int(os.getenv("DETECTION_MAX_CONCURRENCY", "16"))  # all calls
+    DETECTION_MAX_PER_CALL: int = int(os.getenv("DETECTION_MAX_PER_CALL", "1"))
+    DETECTION_EARLY_EXIT_SCORE: float = float(os.getenv("DETECTION_EARLY_EXIT_SCORE", "0.8"))
+
+    # Admission control / load shedding (see app/services/admission.py). Past each limit the
+    # worker sheds in tiers: no STT for new calls, then longer detection hops, then declines streams.
+    # At the session cap new streams are declined until a session ends (no recovery delay)
+    ADMISSION_MAX_SESSIONS: int = int(os.getenv("ADMISSION_MAX_SESSIONS", "200"))
+    ADMISSION_MAX_STT_STREAMS: int = int(os.getenv("ADMISSION_MAX_STT_STREAMS", "150"))
+    ADMISSION_MAX_DETECTIONS: int = int(os.getenv("ADMISSION_MAX_DETECTIONS", str(2 * DETECTION_MAX_CONCURRENCY)))
+    # Event-loop lag (seconds) that triggers tier 1, 2 and 3
+    ADMISSION_LAG_TIERS: list = [float(t) for t in os.getenv("ADMISSION_LAG_TIERS", "0.1,0.25,1.0").split(",") if t.strip()]
+    ADMISSION_HOP_FACTOR: float = float(os.getenv("ADMISSION_HOP_FACTOR", "3"))
+    ADMISSION_RECOVER_SECONDS: float = float(os.getenv("ADMISSION_RECOVER_SECONDS", "10"))
+    ADMISSION_CHECK_SECONDS: float = float(os.getenv("ADMISSION_CHECK_SECONDS", "0.5"))
+
+    # Per-call background tasks (detection windows, archive writes) allowed in flight per worker
+    TASKS_MAX_IN_FLIGHT: int = int(os.getenv("TASKS_MAX_IN_FLIGHT", "512"))
+    # On shutdown, how long to wait for those tasks (verdicts, final transcripts) before cancelling
+    SHUTDOWN_DRAIN_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
     
     @classmethod
     def validate_twilio_config(cls) -> bool:
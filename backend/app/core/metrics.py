@@ -0,0 +1,299 @@
+"""
+In-process metrics with Prometheus text exposition (served at GET /metrics).
+
+Counters, gauges and histograms are updated from the event loop thread and
+rendered on scrape; gauges can also be callbacks evaluated at scrape time
+(queue depths). No client library is needed.
+
+Per-call latency is traced by CallTrace: each stage of a call's life
+(first frame, capture complete, WAV written, upload done, verdict, SMS
+sent, first STT result) is recorded once, as seconds since the stream's
+"start" event, into trustline_call_stage_seconds{stage=...} and logged
+with the call's SID.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    """Label value escaping per the text exposition format (backslash, quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+        return head + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Gauge(_Metric):
+    """A settable gauge, or one computed on scrape when `fn` is given (fn returns {label values: value})."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, fn: Optional[Callable[[], Dict[LabelKey, float]]] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterable[str]:
+        values = self._values
+        if self._fn is not None:
+            try:
+                values = self._fn()
+            except Exception as exc:  # a broken probe must not break the scrape
+                log.warning("gauge callback failed", metric=self.name, error=repr(exc))
+                values = {}
+        for key, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelKey, List[float]] = {}  # per-bucket counts, then sum, then count
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for key, series in self._series.items():
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_fmt(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(series[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(series[-1])}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: "OrderedDict[str, _Metric]" = OrderedDict()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing  # module reloads / repeated registration share one series
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), fn=None) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames, fn=fn))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        return "".join(m.render() for m in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+CALL_STAGE_SECONDS = REGISTRY.histogram(
+    "trustline_call_stage_seconds", "Seconds from stream start until each stage first happens in a call", ("stage",)
+)
+DETECTION_STEP_SECONDS = REGISTRY.histogram(
+    "trustline_detection_step_seconds", "Duration of each step of one detection window", ("step",)
+)
+STT_FIRST_RESULT_SECONDS = REGISTRY.histogram(
+    "trustline_stt_first_result_seconds", "Seconds from the first audio sent to STT until its first result"
+)
+STT_SESSION_START_SECONDS = REGISTRY.histogram(
+    "trustline_stt_session_start_seconds",
+    "Seconds from opening a streaming_recognize session (the call's start event, or a rotation) to its first response",
+    ("session",),
+)
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "trustline_event_loop_lag_seconds", "How late a periodic event-loop timer fires", buckets=LAG_BUCKETS
+)
+MEDIA_FRAMES = REGISTRY.counter("trustline_media_frames_total", "Twilio media frames received")
+CALLS_TOTAL = REGISTRY.counter("trustline_calls_total", "Media streams started")
+DETECTION_WINDOWS = REGISTRY.counter(
+    "trustline_detection_windows_total", "Detection windows by outcome (submitted, dropped, failed, cached)", ("outcome",)
+)
+VERDICTS = REGISTRY.counter("trustline_verdicts_total", "Detection verdicts by status", ("status",))
+
+
+# --- per-call tracing -------------------------------------------------------
+
+_active: Dict[str, "CallTrace"] = {}
+# Ended calls stay reachable for a while: verdicts and SMS can land after the stream stops
+_recent: "OrderedDict[str, CallTrace]" = OrderedDict()
+_MAX_RECENT = 1000
+
+
+class CallTrace:
+    """First-occurrence stage timestamps for one call, plus queue-depth probes read on scrape."""
+
+    __slots__ = ("call_sid", "started", "stages", "probes")
+
+    def __init__(self, call_sid: str) -> None:
+        self.call_sid = call_sid
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.probes: Dict[str, Callable[[], float]] = {}
+
+    def mark(self, stage: str) -> Optional[float]:
+        """Record `stage` the first time it happens; returns seconds since start (None if already seen)."""
+        if stage in self.stages:
+            return None
+        elapsed = time.monotonic() - self.started
+        self.stages[stage] = elapsed
+        CALL_STAGE_SECONDS.observe(elapsed, stage=stage)
+        log.info("stage", stage=stage, elapsed_ms=round(elapsed * 1e3, 1))
+        return elapsed
+
+
+def start_call_trace(call_sid: str) -> CallTrace:
+    trace = CallTrace(call_sid)
+    _active[call_sid] = trace
+    CALLS_TOTAL.inc()
+    return trace
+
+
+def end_call_trace(trace: CallTrace) -> None:
+    trace.probes.clear()
+    if _active.get(trace.call_sid) is trace:
+        del _active[trace.call_sid]
+    _recent[trace.call_sid] = trace
+    while len(_recent) > _MAX_RECENT:
+        _recent.popitem(last=False)
+
+
+def get_call_trace(call_sid: Optional[str]) -> Optional[CallTrace]:
+    if not call_sid:
+        return None
+    return _active.get(call_sid) or _recent.get(call_sid)
+
+
+def _call_queue_depths() -> Dict[LabelKey, float]:
+    out: Dict[LabelKey, float] = {}
+    for trace in list(_active.values()):
+        for queue, probe in trace.probes.items():
+            depth = float(probe())
+            total, peak = out.get((queue, "sum"), 0.0), out.get((queue, "max"), 0.0)
+            out[(queue, "sum")] = total + depth
+            out[(queue, "max")] = max(peak, depth)
+    return out
+
+
+REGISTRY.gauge("trustline_active_calls", "Media streams in progress", fn=lambda: {(): float(len(_active))})
+REGISTRY.gauge(
+    "trustline_call_queue_depth", "Per-call queue depths across active calls (sum and max)", ("queue", "agg"),
+    fn=_call_queue_depths,
+)
+
+
+# --- event-loop lag ---------------------------------------------------------
+
+_lag_task: Optional[asyncio.Task] = None
+_recent_lag = 0.0  # smoothed over the last ~second of samples
+
+
+async def _watch_loop_lag(interval: float) -> None:
+    global _recent_lag
+    loop = asyncio.get_running_loop()
+    while True:
+        t = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - t - interval)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        # Rises at once on a stall, decays over a few samples
+        _recent_lag = max(lag, _recent_lag * 0.7 + lag * 0.3)
+        if lag > 0.25:
+            log.warning("event loop stalled", lag_ms=round(lag * 1e3, 1))
+
+
+def start_loop_monitor(interval: float = 0.1) -> None:
+    global _lag_task
+    if _lag_task is None:
+        _lag_task = asyncio.create_task(_watch_loop_lag(interval))
+
+
+def stop_loop_monitor() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+
+
+def recent_loop_lag() -> float:
+    """Smoothed event-loop lag in seconds (0 until start_loop_monitor() runs)."""
+    return _recent_lag
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
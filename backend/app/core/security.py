@@ -1,3 +1,44 @@
+"""
+Access checks for the app-facing endpoints.
 
+Live event streams (/events, /events/ws) carry transcripts and verdicts,
+so a subscription needs either the callSid of the call it follows (an
+unguessable ID the app got from the call itself) or EVENTS_API_TOKEN; the
+all-calls stream always needs the token. EventSource and browser
+WebSockets can't set headers, so the token is also accepted as ?token=.
 
+Call history (/reports) lists callSids, so it always needs the token;
+otherwise a callSid would prove nothing.
+"""
+import hmac
+from typing import Optional
 
+from fastapi import Header, HTTPException
+
+from app.core.config import settings
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token from an "Authorization: Bearer <token>" header value, if any."""
+    if authorization and authorization[:7].lower() == "bearer ":
+        return authorization[7:].strip() or None
+    return None
+
+
+def events_token_ok(token: Optional[str]) -> bool:
+    """True when `token` matches EVENTS_API_TOKEN (never when no token is configured)."""
+    expected = settings.EVENTS_API_TOKEN
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def may_subscribe(call_sid: Optional[str], token: Optional[str]) -> bool:
+    """A per-call subscription needs its callSid or the token; all calls need the token."""
+    return bool(call_sid) or events_token_ok(token)
+
+
+def require_api_token(token: Optional[str] = None, authorization: Optional[str] = Header(None)) -> None:
+    """Route dependency: 401 unless EVENTS_API_TOKEN is given (Authorization: Bearer ... or ?token=...)."""
+    if not events_token_ok(bearer_token(authorization) or token):
+        raise HTTPException(status_code=401, detail="a valid token is required")
@@ -0,0 +1,74 @@
+"""initial schema: calls, detection windows, verdicts, transcript segments
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "calls",
+        sa.Column("call_sid", sa.String(64), primary_key=True),
+        sa.Column("stream_sid", sa.String(64), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("ended_at", sa.DateTime(), nullable=True),
+        sa.Column("frames", sa.Integer(), nullable=False),
+        sa.Column("speech_seconds", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(32), nullable=True),
+        sa.Column("max_score", sa.Float(), nullable=True),
+        sa.Column("phrase_risk", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_calls_started_at", "calls", ["started_at"])
+    op.create_index("ix_calls_status_started_at", "calls", ["status", "started_at"])
+
+    op.create_table(
+        "detection_windows",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("call_sid", sa.String(64), sa.ForeignKey("calls.call_sid"), nullable=False),
+        sa.Column("start_s", sa.Float(), nullable=False),
+        sa.Column("end_s", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(32), nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_detection_windows_call_start", "detection_windows", ["call_sid", "start_s"])
+
+    op.create_table(
+        "verdicts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("call_sid", sa.String(64), sa.ForeignKey("calls.call_sid"), nullable=False),
+        sa.Column("status", sa.String(32), nullable=False),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("notified", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_verdicts_call_created", "verdicts", ["call_sid", "created_at"])
+    op.create_index("ix_verdicts_status_created", "verdicts", ["status", "created_at"])
+
+    op.create_table(
+        "transcript_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("call_sid", sa.String(64), sa.ForeignKey("calls.call_sid"), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("phrases", sa.Text(), nullable=True),
+        sa.Column("risk", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_transcript_segments_call_created", "transcript_segments", ["call_sid", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("transcript_segments")
+    op.drop_table("verdicts")
+    op.drop_table("detection_windows")
+    op.drop_table("calls")
@@ -1,3 +1,86 @@
+"""
+SQL schema: calls and what was learned about them.
 
+Rows are keyed by the Twilio callSid, so the write-behind queue
+(app.db.writer) can insert children without waiting for generated IDs.
+Indexes follow the mobile app's report screens: recent calls (newest
+first), calls by verdict, and everything about one call in time order.
+"""
+from datetime import datetime
+from typing import Optional
 
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Call(Base):
+    __tablename__ = "calls"
+
+    call_sid: Mapped[str] = mapped_column(String(64), primary_key=True)
+    stream_sid: Mapped[Optional[str]] = mapped_column(String(64))
+    started_at: Mapped[datetime] = mapped_column(DateTime)
+    ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    frames: Mapped[int] = mapped_column(Integer, default=0)
+    speech_seconds: Mapped[Optional[float]] = mapped_column(Float)
+    # Latest verdict and peak scores, denormalized for the call list
+    status: Mapped[Optional[str]] = mapped_column(String(32))
+    max_score: Mapped[Optional[float]] = mapped_column(Float)
+    phrase_risk: Mapped[Optional[float]] = mapped_column(Float)
+
+    __table_args__ = (
+        Index("ix_calls_started_at", "started_at"),
+        Index("ix_calls_status_started_at", "status", "started_at"),
+    )
+
+
+class DetectionWindow(Base):
+    """One scored slice of call audio."""
+
+    __tablename__ = "detection_windows"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    call_sid: Mapped[str] = mapped_column(ForeignKey("calls.call_sid"))
+    start_s: Mapped[float] = mapped_column(Float)
+    end_s: Mapped[float] = mapped_column(Float)
+    status: Mapped[Optional[str]] = mapped_column(String(32))
+    score: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (Index("ix_detection_windows_call_start", "call_sid", "start_s"),)
+
+
+class Verdict(Base):
+    """A change in a call's verdict (the first one, then each flip), i.e. what the user was alerted about."""
+
+    __tablename__ = "verdicts"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    call_sid: Mapped[str] = mapped_column(ForeignKey("calls.call_sid"))
+    status: Mapped[str] = mapped_column(String(32))
+    score: Mapped[Optional[float]] = mapped_column(Float)
+    notified: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (
+        Index("ix_verdicts_call_created", "call_sid", "created_at"),
+        Index("ix_verdicts_status_created", "status", "created_at"),
+    )
+
+
+class TranscriptSegment(Base):
+    """A final STT result, with the phrase matches it contributed."""
+
+    __tablename__ = "transcript_segments"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    call_sid: Mapped[str] = mapped_column(ForeignKey("calls.call_sid"))
+    text: Mapped[str] = mapped_column(Text)
+    phrases: Mapped[Optional[str]] = mapped_column(Text)  # comma-separated matches, if any
+    risk: Mapped[Optional[float]] = mapped_column(Float)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+    __table_args__ = (Index("ix_transcript_segments_call_created", "call_sid", "created_at"),)
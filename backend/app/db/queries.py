@@ -0,0 +1,63 @@
+"""
+Read queries behind the mobile app's report screens.
+
+Each one is served by an index from app.db.models: the call list pages
+backwards through started_at (optionally within one verdict status), and a
+call's detail view reads its windows, verdicts and transcript by call_sid.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.models import Call, DetectionWindow, TranscriptSegment, Verdict
+
+_calls = Call.__table__
+_windows = DetectionWindow.__table__
+_verdicts = Verdict.__table__
+_segments = TranscriptSegment.__table__
+
+
+def _rows(result) -> List[Dict[str, Any]]:
+    return [dict(row) for row in result.mappings()]
+
+
+async def recent_calls(
+    conn: AsyncConnection, limit: int = 50, before: Optional[datetime] = None, status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Newest calls first; pass the last row's started_at as `before` for the next page."""
+    q = select(_calls).order_by(_calls.c.started_at.desc()).limit(limit)
+    if before is not None:
+        q = q.where(_calls.c.started_at < before)
+    if status is not None:
+        q = q.where(_calls.c.status == status)
+    return _rows(await conn.execute(q))
+
+
+async def call_report(conn: AsyncConnection, call_sid: str) -> Optional[Dict[str, Any]]:
+    """One call with its detection windows, verdict changes and transcript, each in time order."""
+    call = (await conn.execute(select(_calls).where(_calls.c.call_sid == call_sid))).mappings().first()
+    if call is None:
+        return None
+    report = dict(call)
+    report["windows"] = _rows(await conn.execute(
+        select(_windows).where(_windows.c.call_sid == call_sid).order_by(_windows.c.start_s)
+    ))
+    report["verdicts"] = _rows(await conn.execute(
+        select(_verdicts).where(_verdicts.c.call_sid == call_sid).order_by(_verdicts.c.created_at)
+    ))
+    report["transcript"] = _rows(await conn.execute(
+        select(_segments).where(_segments.c.call_sid == call_sid).order_by(_segments.c.created_at)
+    ))
+    return report
+
+
+async def verdict_counts(conn: AsyncConnection, since: datetime) -> Dict[str, int]:
+    """Calls per latest verdict status started since `since` (summary screen)."""
+    q = (
+        select(_calls.c.status, func.count())
+        .where(_calls.c.started_at >= since)
+        .group_by(_calls.c.status)
+    )
+    return {status or "PENDING": n for status, n in (await conn.execute(q)).all()}
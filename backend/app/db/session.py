@@ -0,0 +1,60 @@
+"""
+Async SQLAlchemy engine (DATABASE_URL).
+
+Locally this is SQLite through aiosqlite, in WAL mode so the report API can
+read while the write-behind queue commits; in production any async
+driver URL works (e.g. postgresql+asyncpg://...).
+"""
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+from app.db.models import Base
+
+_engine: Optional[AsyncEngine] = None
+
+
+def _sqlite_pragmas(dbapi_conn, _record) -> None:
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; a crash loses at most the last commits
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.close()
+
+
+def create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, pool_pre_ping=not url.startswith("sqlite"))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+async def init_db() -> AsyncEngine:
+    """
+    Create the process-wide engine and any missing tables.
+
+    create_all only covers a fresh database (local SQLite); schema changes
+    go through the Alembic revisions in app/db/migrations (`alembic upgrade
+    head`). A database created this way is at revision "0001"
+    (`alembic stamp 0001` before the first upgrade).
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.DATABASE_URL)
+        async with _engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    return _engine
+
+
+def get_engine() -> Optional[AsyncEngine]:
+    """The engine once init_db() has run (None when persistence is off)."""
+    return _engine
+
+
+async def close_db() -> None:
+    global _engine
+    if _engine is not None:
+        engine, _engine = _engine, None
+        await engine.dispose()
@@ -0,0 +1,213 @@
+"""
+Write-behind persistence for calls, detection windows, verdicts and transcripts.
+
+The media loop only ever calls the record_* methods, which append to a
+bounded in-memory queue and return immediately; nothing on the call path
+awaits the database. A background task drains the queue in batches (up to
+PERSIST_BATCH_MAX rows, at most every PERSIST_FLUSH_SECONDS), commits
+each batch in one transaction with one executemany per statement, and
+falls back to a transaction per row if the batch fails, so one bad row
+(e.g. a duplicate callSid) doesn't lose the rest. When the queue is full
+new rows are dropped and counted rather than slowing calls down.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+from app.db.models import Call, DetectionWindow, TranscriptSegment, Verdict
+
+log = get_logger(__name__)
+
+PERSIST_ROWS = REGISTRY.counter(
+    "trustline_persist_rows_total", "Rows handed to the write-behind queue by outcome (written, dropped, failed)", ("result",)
+)
+PERSIST_FLUSH_SECONDS = REGISTRY.histogram("trustline_persist_flush_seconds", "Duration of one write-behind batch commit")
+
+_calls = Call.__table__
+_sid = _calls.c.call_sid == bindparam("sid")
+
+# Every write is one of these statements plus a parameter dict; batches run them with executemany.
+# (Update binds can't reuse column names, hence sid/new_*.)
+_STATEMENTS = {
+    "call": insert(_calls),
+    "window": insert(DetectionWindow.__table__),
+    "verdict": insert(Verdict.__table__),
+    "transcript": insert(TranscriptSegment.__table__),
+    "call_end": update(_calls).where(_sid).values(
+        ended_at=bindparam("new_ended_at"), frames=bindparam("new_frames"), speech_seconds=bindparam("new_speech")
+    ),
+    "call_status": update(_calls).where(_sid).values(status=bindparam("new_status")),
+    "call_score": update(_calls)
+    .where(_sid, or_(_calls.c.max_score.is_(None), _calls.c.max_score < bindparam("new_score")))
+    .values(max_score=bindparam("new_score")),
+    "call_risk": update(_calls)
+    .where(_sid, or_(_calls.c.phrase_risk.is_(None), _calls.c.phrase_risk < bindparam("new_risk")))
+    .values(phrase_risk=bindparam("new_risk")),
+}
+
+Op = Tuple[str, Dict[str, Any]]
+_STOP: Op = ("stop", {})
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _group(batch: List[Op]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """One executemany per statement, in _STATEMENTS order (calls are inserted before anything refers to them)."""
+    by_kind: Dict[str, List[Dict[str, Any]]] = {}
+    for kind, params in batch:
+        by_kind.setdefault(kind, []).append(params)
+    return [(kind, by_kind[kind]) for kind in _STATEMENTS if kind in by_kind]
+
+
+class PersistenceWriter:
+    def __init__(self, engine: AsyncEngine, max_pending: int, batch_max: int, flush_seconds: float) -> None:
+        self._engine = engine
+        self._queue: "asyncio.Queue[Op]" = asyncio.Queue(maxsize=max_pending)
+        self._batch_max = batch_max
+        self._flush_seconds = flush_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _put(self, kind: str, params: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait((kind, params))
+        except asyncio.QueueFull:
+            PERSIST_ROWS.inc(result="dropped")
+
+    # --- called from the media loop (never block) ---
+
+    def record_call_started(self, call_sid: str, stream_sid: Optional[str]) -> None:
+        self._put("call", {"call_sid": call_sid, "stream_sid": stream_sid, "started_at": _now(), "frames": 0})
+
+    def record_call_ended(self, call_sid: str, frames: int, speech_seconds: Optional[float]) -> None:
+        self._put("call_end", {"sid": call_sid, "new_ended_at": _now(), "new_frames": frames, "new_speech": speech_seconds})
+
+    def record_window(self, call_sid: str, start_s: float, end_s: float, status: Optional[str], score: Optional[float]) -> None:
+        self._put("window", {
+            "call_sid": call_sid, "start_s": start_s, "end_s": end_s, "status": status, "score": score, "created_at": _now(),
+        })
+        if score is not None:
+            self._put("call_score", {"sid": call_sid, "new_score": score})
+
+    def record_verdict(self, call_sid: str, status: str, score: Optional[float], notified: bool) -> None:
+        self._put("verdict", {"call_sid": call_sid, "status": status, "score": score, "notified": notified, "created_at": _now()})
+        self._put("call_status", {"sid": call_sid, "new_status": status})
+
+    def record_transcript(self, call_sid: str, text: str, phrases: Optional[List[str]] = None, risk: Optional[float] = None) -> None:
+        self._put("transcript", {
+            "call_sid": call_sid, "text": text, "phrases": ",".join(phrases) if phrases else None, "risk": risk,
+            "created_at": _now(),
+        })
+        if risk is not None:
+            self._put("call_risk", {"sid": call_sid, "new_risk": risk})
+
+    # --- background flushing ---
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self._batch_max and batch[0] is not _STOP:
+                await asyncio.sleep(self._flush_seconds)  # let rows accumulate: one commit per interval
+            while len(batch) < self._batch_max and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                try:
+                    await self._write(batch)
+                except Exception:
+                    # Keep draining: a dead writer would fill the queue and drop every later row
+                    PERSIST_ROWS.inc(len(batch), result="failed")
+                    log.exception("write-behind batch lost", rows=len(batch))
+            if stop:
+                return
+
+    async def _write(self, batch: List[Op]) -> None:
+        groups = _group(batch)
+        t = time.perf_counter()
+        try:
+            async with self._engine.begin() as conn:
+                for kind, rows in groups:
+                    await conn.execute(_STATEMENTS[kind], rows)
+            PERSIST_ROWS.inc(len(batch), result="written")
+        except SQLAlchemyError as exc:
+            log.warning("batch write failed; retrying row by row", rows=len(batch), error=repr(exc))
+            for kind, rows in groups:
+                for row in rows:
+                    try:
+                        async with self._engine.begin() as conn:
+                            await conn.execute(_STATEMENTS[kind], row)
+                        PERSIST_ROWS.inc(result="written")
+                    except Exception as exc:  # not only SQL errors: a bad parameter must not stop the rest
+                        PERSIST_ROWS.inc(result="failed")
+                        log.error("dropping row that failed to write", statement=kind, error=repr(exc))
+        PERSIST_FLUSH_SECONDS.observe(time.perf_counter() - t)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Stop accepting rows and flush what is queued (bounded by `timeout`)."""
+        self._closed = True
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(_STOP), timeout)
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            log.warning("persistence flush timed out on shutdown", pending=self.pending)
+
+
+_writer: Optional[PersistenceWriter] = None
+
+
+def get_persistence() -> Optional[PersistenceWriter]:
+    """The running writer, or None when persistence is off (or not started yet)."""
+    return _writer
+
+
+async def start_persistence(engine: AsyncEngine) -> PersistenceWriter:
+    global _writer
+    if _writer is None:
+        _writer = PersistenceWriter(
+            engine,
+            max_pending=settings.PERSIST_MAX_PENDING,
+            batch_max=settings.PERSIST_BATCH_MAX,
+            flush_seconds=settings.PERSIST_FLUSH_SECONDS,
+        )
+        _writer.start()
+    return _writer
+
+
+REGISTRY.gauge(
+    "trustline_persist_queue_depth", "Rows waiting in the write-behind queue",
+    fn=lambda: {(): float(_writer.pending)} if _writer is not None else {},
+)
+
+
+async def shutdown_persistence() -> None:
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        await writer.aclose()
@@ -1,15 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.api import twilio_webhook, detection, ws_media
+from app.api import twilio_webhook, detection, events, metrics, reports, ws_media
 # Load env etc
 from app.core.config import settings
+from app.core.logging import configure_logging, get_logger
+from app.core.metrics import start_loop_monitor, stop_loop_monitor
+from app.db.session import close_db, init_db
+from app.db.writer import shutdown_persistence, start_persistence
+from app.services.admission import get_admission, shutdown_admission
+from app.services.audio_pipeline import get_audio_executor, shutdown_audio_executor
+from app.services.capture_archive import shutdown_capture_archive, start_capture_archive
+from app.services.detection_state import get_detection_state, shutdown_detection_state
+from app.services.event_hub import shutdown_event_hub
+from app.services.notifier import shutdown_notifier
+from app.services.phrase_detector import get_phrase_dictionary
+from app.services.reality_defender import shutdown_reality_defender
+from app.services.stt_pool import shutdown_stt_pool
+from app.services.task_supervisor import get_task_supervisor, shutdown_task_supervisor
+from app.services.twiml_cache import get_twiml_cache
+from app.services.verdict_cache import shutdown_verdict_cache
+from app.services.warmup import warm_up_clients
+
+configure_logging()
+log = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Detection on/off flag shared with the other workers; kept current in memory from here on
+    await get_detection_state().start()
+    # Per-call background tasks are registered here; SIGTERM starts refusing new /media streams
+    get_task_supervisor().install_signal_handler()
+    # Voice-webhook TwiML for both detection states (and each forward target)
+    get_twiml_cache().warm()
+    # SDK imports and shared clients (pooled Speech gRPC channels, Reality Defender, Twilio) are built
+    # in the background so the worker serves at once; the first call finds them ready
+    warmup = asyncio.create_task(warm_up_clients())
+    # Scam-phrase dictionary: load now and pick up edits without a restart
+    phrases = get_phrase_dictionary() if settings.SCAM_PHRASES_ENABLED else None
+    if phrases is not None:
+        phrases.start_watching()
+    # Worker pool for WAV encoding / fingerprinting, started before the first call needs it
+    get_audio_executor().warm_up()
+    # Call history: tables created if missing, rows written behind the media loop in batches
+    if settings.PERSISTENCE_ENABLED:
+        await start_persistence(await init_db())
+    # Capture archive: μ-law segments written and fsynced in batches behind the media loop
+    if settings.CAPTURE_ARCHIVE_ENABLED and settings.CAPTURE_ARCHIVE_FORMAT == "mulaw":
+        start_capture_archive()
+    start_loop_monitor()
+    # Load shedding thresholds, re-checked in the background (uses the loop-lag monitor)
+    get_admission().start(settings.ADMISSION_CHECK_SECONDS)
+    yield
+    warmup.cancel()
+    # Let in-flight detections finish while the clients they use (and the SMS / DB queues
+    # their verdicts feed) are still open
+    await shutdown_task_supervisor(settings.SHUTDOWN_DRAIN_SECONDS)
+    shutdown_admission()
+    stop_loop_monitor()
+    shutdown_event_hub()
+    if phrases is not None:
+        phrases.stop_watching()
+    await shutdown_stt_pool()
+    await shutdown_reality_defender()
+    await shutdown_notifier()
+    shutdown_verdict_cache()
+    shutdown_audio_executor()
+    await shutdown_detection_state()
+    await shutdown_persistence()
+    await shutdown_capture_archive()
+    await close_db()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
 app.include_router(twilio_webhook.router)
 app.include_router(detection.router)
 app.include_router(ws_media.router)
+app.include_router(metrics.router)
+app.include_router(reports.router)
+app.include_router(events.router)
 
 
 @app.get("/")
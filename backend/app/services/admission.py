@@ -0,0 +1,202 @@
+"""
+Admission control and tiered load shedding for /media streams.
+
+The controller watches live sessions, STT streams, detection windows in
+flight and event-loop lag (re-evaluated every ADMISSION_CHECK_SECONDS)
+and sets a shedding tier:
+
+  0  normal
+  1  new calls get no transcription (STT is the heaviest per-call cost)
+  2  ...and detection hops are stretched by ADMISSION_HOP_FACTOR, for
+     calls already running too
+  3  ...and new streams are declined: voice_webhook returns the
+     non-streaming TwiML, and /media refuses sockets that still arrive
+
+Tiers rise as soon as a threshold is crossed and fall one step at a time,
+after ADMISSION_RECOVER_SECONDS below it, so a burst doesn't flap. The
+session cap (ADMISSION_MAX_SESSIONS) is not a tier: it is a hard count,
+so streams are declined exactly while sessions are at the cap and
+accepted again as soon as one ends. All
+reads on the call path (tier, accepting_streams, hop_factor) are plain
+attribute reads. State is per worker process; each uvicorn worker sheds
+based on its own load.
+"""
+import asyncio
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY, recent_loop_lag
+from app.services.detection_scheduler import windows_in_flight
+
+log = get_logger(__name__)
+
+NORMAL, NO_STT, LONG_HOP, DECLINE = 0, 1, 2, 3
+TIER_NAMES = ("normal", "no_stt", "long_hop", "decline")
+
+ADMISSION_DECISIONS = REGISTRY.counter(
+    "trustline_admission_total", "New /media streams by admission decision (admitted, no_stt, declined)", ("decision",)
+)
+
+
+class Ticket:
+    """One admitted stream; release() when it ends."""
+
+    __slots__ = ("_controller", "stt", "released")
+
+    def __init__(self, controller: "AdmissionController") -> None:
+        self._controller = controller
+        self.stt = False
+        self.released = False
+
+    @property
+    def allow_stt(self) -> bool:
+        return self._controller.tier < NO_STT
+
+    def stt_started(self) -> None:
+        if not self.stt:
+            self.stt = True
+            self._controller.stt_streams += 1
+
+    def stt_stopped(self) -> None:
+        if self.stt:
+            self.stt = False
+            self._controller.stt_streams -= 1
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.stt_stopped()
+            self._controller.sessions -= 1
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_sessions: int,
+        max_stt_streams: int,
+        max_detections: int,
+        lag_tiers: List[float],
+        hop_factor: float,
+        recover_seconds: float,
+    ) -> None:
+        self._max_sessions = max_sessions
+        self._max_stt_streams = max_stt_streams
+        self._max_detections = max_detections
+        self._lag_tiers = lag_tiers
+        self._hop_factor = hop_factor
+        self._recover = recover_seconds
+        self.sessions = 0
+        self.stt_streams = 0
+        self.tier = NORMAL
+        self._below_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def at_capacity(self) -> bool:
+        return self.sessions >= self._max_sessions
+
+    @property
+    def accepting_streams(self) -> bool:
+        return self.tier < DECLINE and not self.at_capacity
+
+    def hop_factor(self) -> float:
+        return self._hop_factor if self.tier >= LONG_HOP else 1.0
+
+    def pressure_tier(self) -> int:
+        """The tier current load calls for (before hysteresis; the session cap is checked separately)."""
+        tier = NORMAL
+        lag = recent_loop_lag()
+        for i, limit in enumerate(self._lag_tiers[:DECLINE]):
+            if lag >= limit:
+                tier = i + 1
+        if self.stt_streams >= self._max_stt_streams:
+            tier = max(tier, NO_STT)
+        if windows_in_flight() >= self._max_detections:
+            tier = max(tier, LONG_HOP)
+        return tier
+
+    def evaluate(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        wanted = self.pressure_tier()
+        if wanted > self.tier:
+            self._set_tier(wanted)
+            self._below_since = None
+        elif wanted < self.tier:
+            if self._below_since is None:
+                self._below_since = now
+            elif now - self._below_since >= self._recover:
+                self._set_tier(self.tier - 1)
+                self._below_since = now
+        else:
+            self._below_since = None
+        return self.tier
+
+    def _set_tier(self, tier: int) -> None:
+        log.warning(
+            "load shedding tier changed",
+            tier=TIER_NAMES[tier],
+            previous=TIER_NAMES[self.tier],
+            sessions=self.sessions,
+            stt_streams=self.stt_streams,
+            detections=windows_in_flight(),
+            loop_lag_ms=round(recent_loop_lag() * 1e3, 1),
+        )
+        self.tier = tier
+
+    def admit(self) -> Optional[Ticket]:
+        """Admit a new stream, or None to decline it."""
+        if not self.accepting_streams:
+            ADMISSION_DECISIONS.inc(decision="declined")
+            return None
+        self.sessions += 1
+        ADMISSION_DECISIONS.inc(decision="admitted" if self.tier < NO_STT else "no_stt")
+        return Ticket(self)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.evaluate()
+
+    def start(self, interval: float) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval))
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_controller: Optional[AdmissionController] = None
+
+REGISTRY.gauge(
+    "trustline_admission_tier", "Load shedding tier (0 normal, 1 no STT, 2 long hop, 3 declining streams)",
+    fn=lambda: {(): float(_controller.tier if _controller is not None else 0)},
+)
+REGISTRY.gauge(
+    "trustline_stt_streams", "STT streaming sessions open",
+    fn=lambda: {(): float(_controller.stt_streams if _controller is not None else 0)},
+)
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_sessions=settings.ADMISSION_MAX_SESSIONS,
+            max_stt_streams=settings.ADMISSION_MAX_STT_STREAMS,
+            max_detections=settings.ADMISSION_MAX_DETECTIONS,
+            lag_tiers=settings.ADMISSION_LAG_TIERS,
+            hop_factor=settings.ADMISSION_HOP_FACTOR,
+            recover_seconds=settings.ADMISSION_RECOVER_SECONDS,
+        )
+    return _controller
+
+
+def shutdown_admission() -> None:
+    global _controller
+    if _controller is not None:
+        controller, _controller = _controller, None
+        controller.stop()
@@ -1,3 +1,632 @@
+"""
+Audio helpers shared by the Twilio media path.
 
+Twilio Media Streams deliver G.711 μ-law at 8 kHz mono. Everything in here
+works on that format so callers never have to re-derive sample rates or
+frame sizes.
+"""
 
+import asyncio
+import multiprocessing
+import operator
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Deque, List, Optional, Tuple, Union
 
+BytesLike = Union[bytes, bytearray, memoryview]
+
+SAMPLE_RATE_HZ = 8000
+BYTES_PER_SECOND = SAMPLE_RATE_HZ  # one μ-law byte per sample, mono
+
+_BIAS = 0x84
+_CLIP = 32635
+_EXP_LUT = (0, 132, 396, 924, 1980, 4092, 8316, 16764)
+
+
+def _decode_mulaw_sample(b: int) -> int:
+    """Decode a single μ-law byte to a signed 16-bit sample (reference implementation)."""
+    mu = (~b) & 0xFF
+    sign = mu & 0x80
+    exponent = (mu >> 4) & 0x07
+    mantissa = mu & 0x0F
+    magnitude = _EXP_LUT[exponent] + (mantissa << (exponent + 3))
+    if magnitude > _CLIP:
+        magnitude = _CLIP
+    sample = magnitude - _BIAS
+    return -sample if sign else sample
+
+
+# 256-entry decode table, plus the low/high byte of each little-endian sample
+# as translate() tables so a whole capture decodes in two C-level passes.
+MULAW_TO_LINEAR16 = tuple(_decode_mulaw_sample(b) for b in range(256))
+_LO_TABLE = bytes(s & 0xFF for s in MULAW_TO_LINEAR16)
+_HI_TABLE = bytes((s >> 8) & 0xFF for s in MULAW_TO_LINEAR16)
+
+
+def _as_bytes(data: BytesLike) -> Union[bytes, bytearray]:
+    # translate() lives on bytes/bytearray only; memoryviews need one copy.
+    return data if isinstance(data, (bytes, bytearray)) else bytes(data)
+
+
+def mulaw_to_linear16_into(
+    mulaw_bytes: BytesLike, out: Union[bytearray, memoryview], offset: int = 0
+) -> int:
+    """
+    Decode μ-law into a caller-supplied buffer as 16-bit little-endian PCM.
+
+    Samples are written starting at `out[offset]`; `out` must be writable and
+    hold at least offset + 2 * len(mulaw_bytes) bytes. Returns the number of
+    bytes written.
+    """
+    src = _as_bytes(mulaw_bytes)
+    n = len(src) * 2
+    size = out.nbytes if isinstance(out, memoryview) else len(out)
+    if size < offset + n:
+        raise ValueError(f"output buffer too small: need {offset + n} bytes, got {size}")
+    if isinstance(out, bytearray):
+        out[offset:offset + n:2] = src.translate(_LO_TABLE)
+        out[offset + 1:offset + n:2] = src.translate(_HI_TABLE)
+        return n
+    # Strided slice assignment is a tight C loop on bytearray but goes through
+    # the generic buffer path on memoryview, so views get a contiguous copy instead.
+    tmp = bytearray(n)
+    tmp[0::2] = src.translate(_LO_TABLE)
+    tmp[1::2] = src.translate(_HI_TABLE)
+    out.cast("B")[offset:offset + n] = tmp
+    return n
+
+
+def mulaw_to_linear16(mulaw_bytes: BytesLike) -> bytearray:
+    """Decode μ-law to 16-bit little-endian PCM (mono, same sample rate)."""
+    out = bytearray(len(mulaw_bytes) * 2)
+    mulaw_to_linear16_into(mulaw_bytes, out)
+    return out
+
+
+WAV_HEADER_BYTES = 44
+
+
+def wav_header(data_bytes: int, sample_rate: int = SAMPLE_RATE_HZ, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Canonical 44-byte RIFF/WAVE header for PCM audio with `data_bytes` of sample data."""
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b"data", data_bytes,
+    )
+
+
+WAVE_FORMAT_MULAW = 7
+MULAW_WAV_HEADER_BYTES = 58
+
+
+def mulaw_wav_header(data_bytes: int, sample_rate: int = SAMPLE_RATE_HZ) -> bytes:
+    """58-byte RIFF/WAVE header for mono μ-law audio stored as-is (WAVE_FORMAT_MULAW, one byte per sample)."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHHH4sII4sI",
+        b"RIFF", 50 + data_bytes, b"WAVE",
+        b"fmt ", 18, WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0,
+        b"fact", 4, data_bytes,  # sample count; required for non-PCM formats
+        b"data", data_bytes,
+    )
+
+
+def mulaw_to_wav(mulaw_bytes: BytesLike) -> bytearray:
+    """
+    Build a complete in-memory WAV (mono, 8 kHz, 16-bit PCM) from μ-law.
+
+    Samples are decoded straight into the buffer after the header, so the
+    PCM is never materialized separately.
+    """
+    n = len(mulaw_bytes) * 2
+    out = bytearray(WAV_HEADER_BYTES + n)
+    out[:WAV_HEADER_BYTES] = wav_header(n)
+    mulaw_to_linear16_into(mulaw_bytes, out, offset=WAV_HEADER_BYTES)
+    return out
+
+
+class CallAudioBuffer:
+    """
+    Fixed-capacity ring of μ-law bytes holding the most recent audio of one call.
+
+    The ring is stored twice back to back (a "mirrored" ring), so any window no
+    longer than `capacity` is a single contiguous slice and can be handed out as
+    a memoryview without copying. Memory per call is constant (2 * capacity)
+    regardless of call length.
+
+    Offsets are absolute positions in the call's byte stream (0 = first byte
+    received), so windows can be addressed by "bytes since call start".
+
+    A window view stays valid until `capacity - len(window)` further bytes are
+    written; copy it (bytes(view)) if it must outlive that.
+    """
+
+    __slots__ = ("_capacity", "_buf", "_view", "_pos", "_total")
+
+    def __init__(self, seconds: float = 30.0, *, capacity: int = 0) -> None:
+        self._capacity = capacity or int(seconds * BYTES_PER_SECOND)
+        if self._capacity <= 0:
+            raise ValueError("CallAudioBuffer capacity must be positive")
+        self._buf = bytearray(self._capacity * 2)
+        self._view = memoryview(self._buf)
+        self._pos = 0  # next write index in [0, capacity)
+        self._total = 0  # bytes written since the call started
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def total_written(self) -> int:
+        """Absolute stream offset of the next byte to be written."""
+        return self._total
+
+    @property
+    def oldest_offset(self) -> int:
+        """Absolute offset of the oldest byte still held."""
+        return max(0, self._total - self._capacity)
+
+    def __len__(self) -> int:
+        return min(self._total, self._capacity)
+
+    def write(self, data: BytesLike) -> None:
+        """Append audio, overwriting the oldest bytes once the ring is full."""
+        n = len(data)
+        if n == 0:
+            return
+        cap = self._capacity
+        if n >= cap:
+            # Only the tail can survive; realign so it sits at index 0.
+            data = data[n - cap:]
+            self._view[0:cap] = data
+            self._view[cap:] = data
+            self._pos = 0
+            self._total += n
+            return
+        pos = self._pos
+        first = min(n, cap - pos)
+        view = self._view
+        view[pos:pos + first] = data[:first]
+        view[pos + cap:pos + cap + first] = data[:first]
+        if first < n:
+            rest = n - first
+            view[0:rest] = data[first:]
+            view[cap:cap + rest] = data[first:]
+        self._pos = (pos + n) % cap
+        self._total += n
+
+    def window(self, start: int, end: int) -> memoryview:
+        """
+        Zero-copy view of absolute offsets [start, end).
+
+        Raises ValueError if any part of the range was never written or has
+        already been overwritten.
+        """
+        if start < self.oldest_offset or end > self._total or start > end:
+            raise ValueError(
+                f"window [{start}, {end}) outside buffered range "
+                f"[{self.oldest_offset}, {self._total})"
+            )
+        # Index of `end` in the mirrored buffer, picked so the slice never wraps.
+        stop = self._pos + self._capacity - (self._total - end)
+        return self._view[stop - (end - start):stop]
+
+    def latest(self, nbytes: int) -> memoryview:
+        """Zero-copy view of the most recent `nbytes` (or everything held, if fewer)."""
+        nbytes = min(nbytes, len(self))
+        return self.window(self._total - nbytes, self._total)
+
+
+class FrameCoalescer:
+    """
+    Batch small media frames into larger chunks before they go to STT.
+
+    Twilio sends 20ms frames (50/s); each would otherwise become its own
+    queue put and StreamingRecognizeRequest. A batch is flushed once it holds
+    `chunk_ms` of audio, or once its first frame is `max_delay_ms` old
+    (wall clock), whichever comes first, so latency stays bounded when frames
+    arrive late or unevenly. chunk_ms=0 disables batching (every frame passes
+    straight through).
+    """
+
+    __slots__ = ("_buf", "_flush_bytes", "_max_delay", "_started", "_clock", "flushes")
+
+    def __init__(self, chunk_ms: int = 100, max_delay_ms: int = 250, clock=time.monotonic) -> None:
+        self._flush_bytes = int(chunk_ms * BYTES_PER_SECOND / 1000)
+        self._max_delay = max_delay_ms / 1000.0
+        self._buf = bytearray()
+        self._started = 0.0
+        self._clock = clock
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def push(self, frame: BytesLike) -> Optional[bytes]:
+        """Add a frame; returns a chunk to send when a flush is due, else None."""
+        if self._flush_bytes <= 0:
+            return bytes(frame) if frame else None
+        buf = self._buf
+        if not buf:
+            self._started = self._clock()
+        buf += frame
+        if len(buf) >= self._flush_bytes or self._clock() - self._started >= self._max_delay:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        """Return whatever is buffered (None if empty) and start a new batch."""
+        if not self._buf:
+            return None
+        chunk = bytes(self._buf)
+        self._buf.clear()
+        self.flushes += 1
+        return chunk
+
+
+# Per-byte tables for working on μ-law without decoding. A μ-law byte is
+# sign | 3-bit exponent | 4-bit mantissa, bit-inverted; with the inversion
+# undone, the low 7 bits rise monotonically with magnitude (16 steps ≈ 6 dB),
+# so their mean behaves like log energy.
+_LEVEL_TABLE = bytes((~b) & 0x7F for b in range(256))
+_SIGN_TABLE = bytes(b >> 7 for b in range(256))
+_LEVELS_PER_DB = 16 / 6.02
+
+
+def mulaw_frame_stats(frame: bytes) -> Tuple[float, float]:
+    """
+    (mean level 0..127, zero-crossing rate 0..1) of a μ-law frame, computed
+    straight from the encoded bytes.
+    """
+    n = len(frame)
+    if n == 0:
+        return 0.0, 0.0
+    level = sum(frame.translate(_LEVEL_TABLE)) / n
+    if n < 2:
+        return level, 0.0
+    signs = frame.translate(_SIGN_TABLE)
+    # Each byte is 0/1, so XOR of the shifted sequences has one set bit per sign change.
+    changes = (int.from_bytes(signs[1:], "big") ^ int.from_bytes(signs[:-1], "big")).bit_count()
+    return level, changes / (n - 1)
+
+
+class VoiceActivityGate:
+    """
+    Energy / zero-crossing voice activity gate working on μ-law frames directly.
+
+    A frame counts as speech when its mean level is `margin_db` above an
+    adaptive noise floor (and above `min_level`); frames with a very high
+    zero-crossing rate (hiss, line noise) additionally need twice the margin.
+    Speech is extended by `hangover_ms` so word endings and the pause STT
+    uses to finalize are kept, and the `preroll_ms` before an onset is
+    released with it so word starts are not clipped.
+
+    push(frame) returns (audio, is_speech):
+    - audio: bytes to forward to STT, or None while gated. During long
+      silences one frame is let through every `keepalive_ms` so the STT
+      stream isn't closed for lack of audio.
+    - is_speech: True when `audio` is speech (plus pre-roll/hangover), i.e.
+      suitable for building detection windows.
+    """
+
+    __slots__ = (
+        "_floor", "_margin", "_min_level", "_max_zcr", "_hangover", "_hang_left",
+        "_preroll", "_preroll_bytes", "_preroll_max", "_keepalive", "_since_forward",
+        "speech_bytes", "gated_bytes",
+    )
+
+    def __init__(
+        self,
+        margin_db: float = 9.0,
+        min_level: float = 32.0,
+        max_zcr: float = 0.6,
+        hangover_ms: int = 300,
+        preroll_ms: int = 200,
+        keepalive_ms: int = 5000,
+    ) -> None:
+        bytes_per_ms = BYTES_PER_SECOND / 1000
+        self._floor: Optional[float] = None
+        self._margin = margin_db * _LEVELS_PER_DB
+        self._min_level = min_level
+        self._max_zcr = max_zcr
+        self._hangover = int(hangover_ms * bytes_per_ms)
+        self._hang_left = 0
+        self._preroll: Deque[bytes] = deque()
+        self._preroll_bytes = 0
+        self._preroll_max = int(preroll_ms * bytes_per_ms)
+        self._keepalive = int(keepalive_ms * bytes_per_ms)
+        self._since_forward = 0
+        self.speech_bytes = 0
+        self.gated_bytes = 0
+
+    def _classify(self, frame: bytes) -> bool:
+        level, zcr = mulaw_frame_stats(frame)
+        floor = self._floor
+        if floor is None:
+            floor = level
+        elif level < floor:
+            floor = level  # drop quickly to quieter backgrounds
+        else:
+            floor += 0.005 * (level - floor)  # rise slowly so speech doesn't become "noise"
+        self._floor = floor
+        if level < self._min_level:
+            return False
+        margin = self._margin * (2 if zcr > self._max_zcr else 1)
+        return level >= floor + margin
+
+    def push(self, frame: BytesLike) -> Tuple[Optional[bytes], bool]:
+        frame = bytes(frame)
+        n = len(frame)
+        if self._classify(frame):
+            self._hang_left = self._hangover
+        elif self._hang_left > 0:
+            self._hang_left -= n
+        else:
+            return self._gate(frame), False
+
+        self._since_forward = 0
+        self.speech_bytes += n
+        if self._preroll:
+            frame = b"".join(self._preroll) + frame
+            self._preroll.clear()
+            self._preroll_bytes = 0
+        return frame, True
+
+    def _gate(self, frame: bytes) -> Optional[bytes]:
+        n = len(frame)
+        self.gated_bytes += n
+        self._preroll.append(frame)
+        self._preroll_bytes += n
+        while self._preroll_bytes > self._preroll_max and self._preroll:
+            self._preroll_bytes -= len(self._preroll.popleft())
+        self._since_forward += n
+        if self._keepalive and self._since_forward >= self._keepalive:
+            self._since_forward = 0
+            return frame
+        return None
+
+
+class SpeechTimeline:
+    """
+    Maps offsets in the speech-only stream (what a VAD-gated CallAudioBuffer
+    holds) back to offsets in the call, so detection windows can be reported
+    in call time.
+
+    add(speech_offset, call_offset) is called for each chunk of speech as it
+    is buffered; only a break point per speech run is stored (where the gap
+    between the two clocks changes), so memory grows with the number of
+    utterances, not frames. Without gating the two clocks are the same.
+    """
+
+    __slots__ = ("_speech", "_call")
+
+    def __init__(self) -> None:
+        self._speech: List[int] = []
+        self._call: List[int] = []
+
+    def add(self, speech_offset: int, call_offset: int) -> None:
+        if self._speech and call_offset - speech_offset == self._call[-1] - self._speech[-1]:
+            return  # same run: the mapping is unchanged
+        self._speech.append(speech_offset)
+        self._call.append(call_offset)
+
+    def to_call(self, speech_offset: int, end: bool = False) -> int:
+        """Call offset of a speech offset; end=True maps an exclusive end (the byte before it)."""
+        i = bisect_right(self._speech, speech_offset - 1 if end and speech_offset > 0 else speech_offset) - 1
+        if i < 0:
+            return speech_offset
+        return self._call[i] + speech_offset - self._speech[i]
+
+
+# Fingerprint framing: energies in 2.5ms steps, 20ms frames (8 steps) compared with the
+# frame 10ms (4 steps) earlier; words pack 6 frames 10ms apart, 4 bits each (24 bits).
+# The fine step keeps words stable when two captures are misaligned by a few samples.
+_FP_STEP = 20
+_FP_FRAME_STEPS = 8
+_FP_DELTA_STEPS = 4
+_FP_FRAMES_PER_WORD = 6
+_FP_BANDS = 5
+
+
+def _pcm_samples(pcm: BytesLike) -> array:
+    samples = array("h")
+    samples.frombytes(pcm if isinstance(pcm, (bytes, bytearray)) else bytes(pcm))
+    if sys.byteorder == "big":
+        samples.byteswap()  # PCM here is always little-endian
+    return samples
+
+
+def audio_fingerprint(pcm: BytesLike) -> List[int]:
+    """
+    Robust fingerprint of 16-bit little-endian PCM at 8 kHz, as a list of
+    24-bit words (one per 2.5ms step).
+
+    Haitsma-Kalker style: for every 20ms frame, energies are taken in five
+    bands ordered low to high, produced by cheap FIR filters ((1+z^-1)^2,
+    1+z^-1, identity, 1-z^-1, (1-z^-1)^2) instead of an FFT. Each bit is the
+    sign of the change, over 10ms, of the energy difference between adjacent
+    bands; it depends on spectral shape, not level, so it survives gain
+    changes and moderate noise.
+
+    Matching is done on individual words with their positions (see
+    verdict_cache), so captures starting at different points of the same
+    recording still line up.
+    """
+    x = _pcm_samples(pcm)
+    s1 = list(map(operator.add, x[1:], x[:-1]))
+    d1 = list(map(operator.sub, x[1:], x[:-1]))
+    bands = (
+        list(map(operator.add, s1[1:], s1[:-1])),
+        s1,
+        x,
+        d1,
+        list(map(operator.sub, d1[1:], d1[:-1])),
+    )
+    n_steps = len(bands[-1]) // _FP_STEP
+    n_frames = n_steps - _FP_FRAME_STEPS + 1
+    pairs = _FP_BANDS - 1
+    if n_frames <= _FP_DELTA_STEPS * _FP_FRAMES_PER_WORD:
+        return []
+
+    # Energy per step and band, then per frame as a sliding sum of steps.
+    mul = operator.mul
+    frame_energy = []
+    for band in bands:
+        steps = [sum(map(mul, seg, seg)) for seg in (band[i:i + _FP_STEP] for i in range(0, n_steps * _FP_STEP, _FP_STEP))]
+        acc = sum(steps[:_FP_FRAME_STEPS])
+        frames = [acc]
+        for f in range(1, n_frames):
+            acc += steps[f + _FP_FRAME_STEPS - 1] - steps[f - 1]
+            frames.append(acc)
+        frame_energy.append(frames)
+
+    diffs = [list(map(operator.sub, frame_energy[b], frame_energy[b + 1])) for b in range(pairs)]
+    bits: List[int] = []
+    for f in range(_FP_DELTA_STEPS, n_frames):
+        v = 0
+        for d in diffs:
+            v = (v << 1) | (d[f] > d[f - _FP_DELTA_STEPS])
+        bits.append(v)
+
+    span = _FP_DELTA_STEPS * _FP_FRAMES_PER_WORD
+    words: List[int] = []
+    for f in range(len(bits) - span + _FP_DELTA_STEPS):
+        w = 0
+        for v in bits[f:f + span:_FP_DELTA_STEPS]:
+            w = (w << pairs) | v
+        words.append(w)
+    return words
+
+
+def wav_and_fingerprint(mulaw_bytes: BytesLike, fingerprint: bool = True) -> Tuple[bytearray, List[int]]:
+    """The CPU-heavy part of preparing a detection window: WAV encode plus (optionally) its fingerprint."""
+    wav = mulaw_to_wav(mulaw_bytes)
+    words = audio_fingerprint(memoryview(wav)[WAV_HEADER_BYTES:]) if fingerprint else []
+    return wav, words
+
+
+def _shm_wav_job(shm_name: str, n: int, fingerprint: bool) -> Tuple[int, List[int]]:
+    """
+    Worker-process side of AudioWorkExecutor: μ-law is read from shm[0:n] and
+    the WAV written back to shm[n:], so only the segment name and the
+    fingerprint words cross the process boundary.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        wav, words = wav_and_fingerprint(bytes(shm.buf[:n]), fingerprint)
+        shm.buf[n:n + len(wav)] = wav
+        return len(wav), words
+    finally:
+        shm.close()
+
+
+class AudioWorkExecutor:
+    """
+    Runs CPU-bound audio work off the event loop that serves every call's
+    WebSocket, so a burst of simultaneous detection windows can't stall
+    media ingestion.
+
+    kind:
+    - "process": a pool of worker processes (true parallelism; the GIL isn't
+      shared with the loop). Audio is handed over in shared memory instead of
+      being pickled through the pool's pipe.
+    - "thread": a thread pool (no IPC, but pure-Python steps still contend
+      for the GIL with the loop).
+    - "inline": on the loop itself (small deployments, debugging).
+
+    The input may be a zero-copy view into a CallAudioBuffer; it is copied
+    once before the first await, so later writes to the ring can't tear it.
+    """
+
+    KINDS = ("process", "thread", "inline")
+
+    def __init__(self, kind: str = "process", workers: int = 2) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown audio executor {kind!r}; expected one of {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self._pool: Optional[Executor] = None
+        self.pool_restarts = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn: never fork a process that is running an event loop and helper threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="audio-work")
+        return self._pool
+
+    def warm_up(self) -> None:
+        """Start the workers now rather than on the first capture (spawned processes take ~100ms each)."""
+        if self.kind != "inline":
+            pool = self._get_pool()
+            for _ in range(self.workers):
+                pool.submit(int)
+
+    async def wav_and_fingerprint(self, mulaw_bytes: BytesLike, fingerprint: bool = True) -> Tuple[BytesLike, List[int]]:
+        """WAV (16-bit PCM) for a μ-law capture and, if asked, its audio_fingerprint() words."""
+        if self.kind == "inline":
+            return wav_and_fingerprint(mulaw_bytes, fingerprint)
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            return await loop.run_in_executor(self._get_pool(), wav_and_fingerprint, bytes(mulaw_bytes), fingerprint)
+
+        n = len(mulaw_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, n + WAV_HEADER_BYTES + 2 * n))
+        try:
+            shm.buf[:n] = mulaw_bytes
+            for _ in range(2):
+                pool = self._get_pool()
+                try:
+                    wav_len, words = await loop.run_in_executor(pool, _shm_wav_job, shm.name, n, fingerprint)
+                except BrokenProcessPool:
+                    # A worker died (OOM-killed, ...): replace the pool and retry once on the fresh one
+                    self._discard_pool(pool)
+                    continue
+                return bytes(shm.buf[n:n + wav_len]), words
+            # The fresh pool broke too: do this one on a thread, still off the loop
+            return await asyncio.to_thread(wav_and_fingerprint, bytes(shm.buf[:n]), fingerprint)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _discard_pool(self, pool: Executor) -> None:
+        """Shut down a broken pool; jobs that failed on it together count one restart."""
+        if self._pool is pool:
+            self._pool = None
+            self.pool_restarts += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: Optional[AudioWorkExecutor] = None
+
+
+def get_audio_executor() -> AudioWorkExecutor:
+    """The process-wide executor per AUDIO_EXECUTOR / AUDIO_EXECUTOR_WORKERS."""
+    global _executor
+    if _executor is None:
+        from app.core.config import settings  # this module stays dependency-free for worker processes
+
+        _executor = AudioWorkExecutor(settings.AUDIO_EXECUTOR, settings.AUDIO_EXECUTOR_WORKERS)
+    return _executor
+
+
+def shutdown_audio_executor() -> None:
+    global _executor
+    if _executor is not None:
+        executor, _executor = _executor, None
+        executor.shutdown()
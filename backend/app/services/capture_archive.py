@@ -0,0 +1,370 @@
+"""
+Optional on-disk archive of detection captures.
+
+Detection submits audio from memory; archiving a copy to CAPTURE_DIR is a
+separate background step (CAPTURE_ARCHIVE_ENABLED) whose disk I/O runs in
+a worker thread so it never blocks the event loop.
+
+Two formats (CAPTURE_ARCHIVE_FORMAT):
+
+- "wav": one 16-bit PCM WAV file per capture (archive_in_background), the
+  same bytes that were uploaded; twice the size of the call audio.
+- "mulaw": the original μ-law bytes appended to segment files under
+  CAPTURE_DIR/archive by CaptureArchive. Detection windows overlap (a 10 s
+  window every 5 s), so only the part of each capture past what was
+  already archived for the call is written; "pos" is its offset in the
+  call's detection stream. Each segment "seg-*.ulaw" has an index
+  "seg-*.idx" of JSON lines {"call", "pos", "offset", "length", "ts"}, so a
+  call's captures are found without touching the audio and read back as
+  memory-mapped slices (call_audio). A background task batches queued
+  captures and fsyncs once per batch (data before index, so an index line
+  never points at bytes that are not on disk). Segments rotate at
+  CAPTURE_ARCHIVE_SEGMENT_MB or CAPTURE_ARCHIVE_SEGMENT_SECONDS; each
+  worker process appends to its own segments.
+"""
+import asyncio
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+from app.services.audio_pipeline import BytesLike, mulaw_wav_header
+from app.services.task_supervisor import get_task_supervisor
+
+log = get_logger(__name__)
+
+ARCHIVE_CAPTURES = REGISTRY.counter(
+    "trustline_capture_archive_captures_total", "μ-law captures handed to the archive by outcome (written, dropped, failed)", ("result",)
+)
+ARCHIVE_FLUSH_SECONDS = REGISTRY.histogram(
+    "trustline_capture_archive_flush_seconds", "Duration of one archive batch write including fsync"
+)
+
+
+def capture_path(call_sid: str, suffix: str = ".wav") -> str:
+    """Archive path for a capture taken now (ms timestamp: several windows per call)."""
+    ts = int(time.time() * 1000)
+    return os.path.join(settings.CAPTURE_DIR, f"call_{call_sid or 'unknown'}_{ts}{suffix}")
+
+
+def _write_file(path: str, data: BytesLike) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)  # Make sure the directory exists
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+async def archive_wav(call_sid: str, wav: BytesLike) -> str:
+    """Write a WAV capture to CAPTURE_DIR off the event loop and return its path."""
+    path = capture_path(call_sid)
+    await asyncio.to_thread(_write_file, path, wav)
+    log.info("WAV written", path=path)
+    return path
+
+
+def archive_in_background(call_sid: str, wav: BytesLike) -> None:
+    """Fire-and-forget archive_wav(); failures are logged, never raised to the caller."""
+
+    async def _run() -> None:
+        try:
+            await archive_wav(call_sid, wav)
+        except Exception as exc:
+            log.error("failed to archive capture", error=str(exc))
+
+    get_task_supervisor().spawn(_run(), "archive")
+
+
+class CaptureRef(NamedTuple):
+    """Where one capture lives: a byte range of a segment file."""
+
+    segment: str
+    offset: int
+    length: int
+    ts: int  # epoch ms when it was queued
+    pos: int  # offset of its first byte in the call's detection stream
+
+
+class _Segment:
+    """The segment this process is appending to."""
+
+    def __init__(self, directory: str, seq: int) -> None:
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        base = os.path.join(directory, f"seg-{stamp}-{os.getpid()}-{seq}")
+        self.path = base + ".ulaw"
+        self.data: BinaryIO = open(self.path, "ab")
+        self.index: BinaryIO = open(base + ".idx", "ab")
+        self.size = 0
+        self.opened = time.monotonic()
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+
+Capture = Tuple[str, bytes, int, int]  # (call, audio, pos, ts)
+_STOP: Capture = ("", b"", 0, 0)
+
+
+class CaptureArchive:
+    def __init__(
+        self, directory: str, segment_bytes: int, segment_seconds: float, flush_seconds: float, max_pending: int,
+        max_mapped: int = 16, max_calls: int = 1000,
+    ) -> None:
+        self._dir = directory
+        self._segment_bytes = segment_bytes
+        self._segment_seconds = segment_seconds
+        self._flush_seconds = flush_seconds
+        self._queue: "asyncio.Queue[Capture]" = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._segment: Optional[_Segment] = None
+        self._seq = 0
+        # Stream offset archived up to per live call, for trimming overlapping windows (loop only)
+        self._archived: "OrderedDict[str, int]" = OrderedDict()
+        self._max_calls = max_calls
+        # Index of recently read calls over every worker's segments: idx files are tailed from the
+        # last position read, and a call evicted from it is looked up again with a full scan.
+        # Readers run in worker threads, hence the lock.
+        self._lock = threading.Lock()
+        self._calls: "OrderedDict[str, List[CaptureRef]]" = OrderedDict()
+        self._evicted = False
+        self._index_pos: Dict[str, int] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._max_mapped = max_mapped
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # --- called from the media loop (never blocks) ---
+
+    def append(self, call_sid: str, mulaw: BytesLike, pos: int = 0) -> None:
+        """
+        Queue one capture starting at stream offset `pos`, minus any part of it already archived.
+
+        The new audio is copied now, since detection windows are views into the call's ring buffer.
+        """
+        if self._closed:
+            return
+        call_sid = call_sid or "unknown"
+        end = pos + len(mulaw)
+        done = self._archived.get(call_sid, 0)
+        if end <= done:
+            return  # nothing new: earlier windows covered all of it
+        if pos < done:
+            mulaw, pos = memoryview(mulaw)[done - pos:], done
+        try:
+            self._queue.put_nowait((call_sid, bytes(mulaw), pos, int(time.time() * 1000)))
+        except asyncio.QueueFull:
+            ARCHIVE_CAPTURES.inc(result="dropped")
+            return  # leave the range unarchived so the next window still covers it
+        self._archived[call_sid] = end
+        self._archived.move_to_end(call_sid)
+        if len(self._archived) > self._max_calls:
+            self._archived.popitem(last=False)
+
+    def new_stream(self, call_sid: str) -> None:
+        """A media stream (re)started for the call: its stream offsets count from 0 again."""
+        self._archived.pop(call_sid or "unknown", None)
+
+    # --- background writing ---
+
+    def start(self) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            if batch[0] is not _STOP:
+                await asyncio.sleep(self._flush_seconds)  # let captures accumulate: one fsync per interval
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                t = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                    ARCHIVE_CAPTURES.inc(len(batch), result="written")
+                except Exception as exc:  # any failure: drop this batch but keep the writer running
+                    ARCHIVE_CAPTURES.inc(len(batch), result="failed")
+                    log.error("failed to archive captures", captures=len(batch), error=repr(exc))
+                    self._close_segment()  # start clean on the next batch
+                ARCHIVE_FLUSH_SECONDS.observe(time.perf_counter() - t)
+            if stop:
+                self._close_segment()
+                return
+
+    def _current_segment(self) -> _Segment:
+        seg = self._segment
+        if seg is not None and (
+            seg.size >= self._segment_bytes or time.monotonic() - seg.opened >= self._segment_seconds
+        ):
+            log.info("rotating capture archive segment", segment=seg.path, bytes=seg.size)
+            self._close_segment()
+            seg = None
+        if seg is None:
+            self._seq += 1
+            seg = self._segment = _Segment(self._dir, self._seq)
+        return seg
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _write_batch(self, batch: List[Capture]) -> None:
+        """Runs in a worker thread: append audio and index lines, then fsync each file once."""
+        seg = self._current_segment()
+        lines = []
+        for call_sid, data, pos, ts in batch:
+            seg.data.write(data)
+            lines.append(
+                json.dumps({"call": call_sid, "pos": pos, "offset": seg.size, "length": len(data), "ts": ts}) + "\n"
+            )
+            seg.size += len(data)
+        seg.data.flush()
+        os.fsync(seg.data.fileno())
+        seg.index.write("".join(lines).encode())
+        seg.index.flush()
+        os.fsync(seg.index.fileno())
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Stop accepting captures and write what is queued (bounded by `timeout`)."""
+        self._closed = True
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._queue.put(_STOP), timeout)
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                log.warning("capture archive flush timed out on shutdown", pending=self.pending)
+        with self._lock:
+            self._maps.clear()  # released once no caller holds a slice
+
+    # --- reading back ---
+
+    @staticmethod
+    def _parse(idx: str, lines: bytes, call_sid: Optional[str] = None) -> List[Tuple[str, CaptureRef]]:
+        segment = idx[: -len(".idx")] + ".ulaw"
+        refs = []
+        for line in lines.splitlines():
+            entry = json.loads(line)
+            if call_sid is None or entry["call"] == call_sid:
+                refs.append((entry["call"], CaptureRef(segment, entry["offset"], entry["length"], entry["ts"], entry["pos"])))
+        return refs
+
+    def _index(self, call_sid: str, refs: List[CaptureRef]) -> None:
+        self._calls.setdefault(call_sid, []).extend(refs)
+        self._calls.move_to_end(call_sid)
+        if len(self._calls) > self._max_calls:
+            self._calls.popitem(last=False)
+            self._evicted = True
+
+    def _refresh_index(self) -> None:
+        """Index the idx files' new whole lines (caller holds the lock)."""
+        for idx in glob.glob(os.path.join(self._dir, "seg-*.idx")):
+            pos = self._index_pos.get(idx, 0)
+            with open(idx, "rb") as f:
+                f.seek(pos)
+                tail = f.read()
+            end = tail.rfind(b"\n") + 1  # only whole lines; the writer may be mid-batch
+            if not end:
+                continue
+            for call_sid, ref in self._parse(idx, tail[:end]):
+                self._index(call_sid, [ref])
+            self._index_pos[idx] = pos + end
+
+    def _scan(self, call_sid: str) -> List[CaptureRef]:
+        """One call's captures from every idx file, up to what has been indexed (caller holds the lock)."""
+        refs: List[CaptureRef] = []
+        needle = json.dumps(call_sid).encode()
+        for idx, indexed in self._index_pos.items():
+            try:
+                with open(idx, "rb") as f:
+                    lines = f.read(indexed)
+            except FileNotFoundError:
+                continue
+            if needle in lines:
+                refs.extend(ref for _, ref in self._parse(idx, lines, call_sid))
+        return refs
+
+    def captures(self, call_sid: str) -> List[CaptureRef]:
+        """A call's archived captures, oldest first (reads only the index files' new lines)."""
+        with self._lock:
+            self._refresh_index()
+            refs = self._calls.get(call_sid)
+            if refs is None and self._evicted:
+                refs = self._scan(call_sid)
+                if refs:
+                    self._index(call_sid, refs)
+            elif refs is not None:
+                self._calls.move_to_end(call_sid)
+            return sorted(refs or [], key=lambda r: r.ts)
+
+    def read(self, ref: CaptureRef) -> memoryview:
+        """The capture's μ-law bytes as a slice of the memory-mapped segment (no copy)."""
+        end = ref.offset + ref.length
+        with self._lock:
+            mapped = self._maps.get(ref.segment)
+            if mapped is None or len(mapped) < end:  # the active segment grows: map it again
+                if len(self._maps) >= self._max_mapped:
+                    self._maps.pop(next(iter(self._maps)))  # closed when its last slice is released
+                with open(ref.segment, "rb") as f:
+                    mapped = self._maps[ref.segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)[ref.offset : end]
+
+    def call_audio(self, call_sid: str) -> List[memoryview]:
+        return [self.read(ref) for ref in self.captures(call_sid)]
+
+
+def mulaw_wav(chunks: List[BytesLike]) -> List[BytesLike]:
+    """WAVE_FORMAT_MULAW header followed by the chunks: a playable file without re-encoding."""
+    return [mulaw_wav_header(sum(len(c) for c in chunks)), *chunks]
+
+
+_archive: Optional[CaptureArchive] = None
+
+
+def get_capture_archive() -> Optional[CaptureArchive]:
+    """The running μ-law archive, or None when archiving is off or in "wav" format."""
+    return _archive
+
+
+def start_capture_archive() -> CaptureArchive:
+    global _archive
+    if _archive is None:
+        _archive = CaptureArchive(
+            os.path.join(settings.CAPTURE_DIR, "archive"),
+            segment_bytes=int(settings.CAPTURE_ARCHIVE_SEGMENT_MB * 1024 * 1024),
+            segment_seconds=settings.CAPTURE_ARCHIVE_SEGMENT_SECONDS,
+            flush_seconds=settings.CAPTURE_ARCHIVE_FLUSH_SECONDS,
+            max_pending=settings.CAPTURE_ARCHIVE_MAX_PENDING,
+            max_calls=settings.CAPTURE_ARCHIVE_INDEX_CALLS,
+        )
+        _archive.start()
+    return _archive
+
+
+REGISTRY.gauge(
+    "trustline_capture_archive_queue_depth", "Captures waiting to be written to the μ-law archive",
+    fn=lambda: {(): float(_archive.pending)} if _archive is not None else {},
+)
+
+
+async def shutdown_capture_archive() -> None:
+    global _archive
+    if _archive is not None:
+        archive, _archive = _archive, None
+        await archive.aclose()
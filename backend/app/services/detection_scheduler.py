@@ -0,0 +1,179 @@
+"""
+Sliding-window deepfake detection for the life of a call.
+
+Each call owns a DetectionScheduler that watches its CallAudioBuffer and
+submits overlapping windows (length/hop from settings) to the detector.
+Fan-out is bounded twice: a process-wide cap on windows in flight across
+all calls, and a per-call cap. When the detector falls behind, only the
+newest due window is kept; older ones are dropped rather than queued.
+Once a confident MANIPULATED verdict arrives the scheduler stops.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import DETECTION_WINDOWS
+from app.services.audio_pipeline import BYTES_PER_SECOND, CallAudioBuffer
+from app.services.task_supervisor import get_task_supervisor
+
+# analyze(window, window_start) -> detector result dict ({"status": ..., "score": ...})
+AnalyzeFn = Callable[[memoryview, int], Awaitable[Dict[str, Any]]]
+# on_verdict(result, window_start, window_end)
+VerdictFn = Callable[[Dict[str, Any], int, int], None]
+
+log = get_logger(__name__)
+
+_global_slots: Optional[asyncio.Semaphore] = None
+# Windows submitted or waiting for a slot, across all calls (admission control reads this)
+_windows_pending = 0
+
+
+def _global_limiter() -> asyncio.Semaphore:
+    """Process-wide cap on detection windows in flight (created on first use)."""
+    global _global_slots
+    if _global_slots is None:
+        _global_slots = asyncio.Semaphore(max(1, settings.DETECTION_MAX_CONCURRENCY))
+    return _global_slots
+
+
+def windows_in_flight() -> int:
+    """Detection windows being analyzed or waiting for a slot, across all calls."""
+    return _windows_pending
+
+
+def is_confident_manipulated(result: Dict[str, Any]) -> bool:
+    """True when a verdict is MANIPULATED with a score at or above the early-exit threshold."""
+    if (result.get("status") or "").upper() != "MANIPULATED":
+        return False
+    score = result.get("score")
+    if not isinstance(score, (int, float)):
+        return True
+    return score >= settings.DETECTION_EARLY_EXIT_SCORE
+
+
+class DetectionScheduler:
+    """
+    Submit overlapping windows of one call's audio to the detector.
+
+    Typical usage (inside the media loop):
+      sched = DetectionScheduler(buffer, analyze=..., on_verdict=...)
+      buffer.write(chunk); sched.poll()   # per media frame
+      sched.finish()                      # on "stop": score the unscored tail
+      sched.close()                       # on disconnect
+    """
+
+    def __init__(
+        self,
+        buffer: CallAudioBuffer,
+        analyze: AnalyzeFn,
+        on_verdict: VerdictFn,
+        *,
+        window_seconds: Optional[float] = None,
+        hop_seconds: Optional[float] = None,
+        per_call_limit: Optional[int] = None,
+        hop_factor: Optional[Callable[[], float]] = None,
+    ) -> None:
+        window_seconds = window_seconds or settings.DETECTION_WINDOW_SECONDS
+        hop_seconds = hop_seconds or settings.DETECTION_HOP_SECONDS
+
+        self._buffer = buffer
+        self._analyze = analyze
+        self._on_verdict = on_verdict
+        self._window = min(int(window_seconds * BYTES_PER_SECOND), buffer.capacity)
+        self._hop = max(1, int(hop_seconds * BYTES_PER_SECOND))
+        self._per_call_limit = max(1, per_call_limit or settings.DETECTION_MAX_PER_CALL)
+        # Read per window: lets load shedding stretch the hop of calls already running
+        self._hop_factor = hop_factor
+
+        self._next_end = self._window  # stream offset at which the next window is due
+        self._pending: Optional[int] = None  # end offset of the newest unsubmitted window
+        self._scored_end = 0  # end offset of the newest window handed to the detector
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+        self.verdict: Optional[Dict[str, Any]] = None
+        self.submitted = 0
+        self.dropped = 0
+
+    @property
+    def done(self) -> bool:
+        """True once a confident MANIPULATED verdict has been seen; no further windows are scored."""
+        return self.verdict is not None and is_confident_manipulated(self.verdict)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def poll(self) -> None:
+        """Schedule the newest due window, if any. Cheap enough to call per frame."""
+        if self._closed or self.done:
+            return
+        total = self._buffer.total_written
+        if total < self._next_end:
+            return
+        hop = self._hop if self._hop_factor is None else max(1, int(self._hop * self._hop_factor()))
+        # Jump straight to the latest due boundary; anything older is stale.
+        end = self._next_end + ((total - self._next_end) // hop) * hop
+        self._next_end = end + hop
+        self._enqueue(end)
+
+    def finish(self) -> None:
+        """Score whatever audio arrived after the last window (e.g. calls shorter than one window)."""
+        if self._closed or self.done:
+            return
+        total = self._buffer.total_written
+        if total > self._scored_end and (self._pending is None or self._pending < total):
+            self._enqueue(total)
+
+    def close(self) -> None:
+        """Stop scheduling new windows. Windows already queued or in flight still complete."""
+        self._closed = True
+
+    def _enqueue(self, end: int) -> None:
+        if self._pending is not None:
+            self.dropped += 1
+            DETECTION_WINDOWS.inc(outcome="dropped")
+        self._pending = end
+        if len(self._tasks) < self._per_call_limit:
+            # Supervised so shutdown waits for it; at the worker-wide cap the window stays
+            # pending and the next poll() supersedes it
+            task = get_task_supervisor().spawn(self._drain(), "detection")
+            if task is not None:
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self) -> None:
+        global _windows_pending
+        _windows_pending += 1
+        try:
+            await self._drain_pending()
+        finally:
+            _windows_pending -= 1
+
+    async def _drain_pending(self) -> None:
+        while self._pending is not None and not self.done:
+            async with _global_limiter():
+                # Pick the window only once a slot is free, so waiting never
+                # submits audio that a newer window already covers.
+                end = self._pending
+                self._pending = None
+                if end is None or self.done:
+                    return
+                start = max(end - self._window, self._buffer.oldest_offset)
+                if end <= start:
+                    self.dropped += 1
+                    DETECTION_WINDOWS.inc(outcome="dropped")
+                    continue
+                self._scored_end = max(self._scored_end, end)
+                self.submitted += 1
+                DETECTION_WINDOWS.inc(outcome="submitted")
+                try:
+                    result = await self._analyze(self._buffer.window(start, end), start)
+                except Exception as exc:
+                    DETECTION_WINDOWS.inc(outcome="failed")
+                    log.warning("detection window failed", window_start=start, window_end=end, error=repr(exc))
+                    continue
+            if self.verdict is None or not is_confident_manipulated(self.verdict):
+                self.verdict = result
+            self._on_verdict(result, start, end)
@@ -0,0 +1,325 @@
+"""
+Detection on/off state shared by every uvicorn worker and replica.
+
+/start and /stop write through a pluggable backend (DETECTION_STATE_BACKEND);
+every process keeps the current value in memory and is told when it
+changes, so is_enabled() on the voice-webhook path is a plain attribute
+read with no I/O.
+
+Backends:
+- "memory": this process only (single worker, development)
+- "sqlite": a file shared by workers on one host (DETECTION_STATE_PATH);
+  other workers' writes are noticed by polling PRAGMA data_version
+- "redis": any server speaking the Redis protocol (DETECTION_STATE_REDIS_URL);
+  writes are PUBLISHed and every worker SUBSCRIBEs, re-reading the state
+  after a reconnect. benchmarks/resp_standin.py serves enough of the
+  protocol for local multi-worker runs without a Redis install.
+"""
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+log = get_logger(__name__)
+
+ChangeFn = Callable[[str, Optional[str]], None]
+
+ENABLED_KEY = "detection_enabled"
+
+
+class MemoryStateBackend:
+    def __init__(self) -> None:
+        self._values: Dict[str, str] = {}
+        self._on_change: Optional[ChangeFn] = None
+
+    async def start(self, on_change: ChangeFn) -> None:
+        self._on_change = on_change
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._values.get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        self._values[key] = value
+        if self._on_change is not None:
+            self._on_change(key, value)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SQLiteStateBackend:
+    """Key/value table in a shared SQLite file; blocking calls run in a worker thread."""
+
+    def __init__(self, path: str, poll_seconds: float) -> None:
+        self._poll = poll_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._seen: Dict[str, Optional[str]] = {}
+        self._on_change: Optional[ChangeFn] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _read_all(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM state").fetchall())
+
+    def _data_version(self) -> int:
+        with self._lock:
+            return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _write(self, key: str, value: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    async def start(self, on_change: ChangeFn) -> None:
+        self._on_change = on_change
+        self._seen = dict(await asyncio.to_thread(self._read_all))
+        self._task = asyncio.create_task(self._watch())
+
+    async def _watch(self) -> None:
+        # data_version changes only when *another* connection commits, so this is one cheap query per tick
+        version = await asyncio.to_thread(self._data_version)
+        while True:
+            await asyncio.sleep(self._poll)
+            try:
+                current = await asyncio.to_thread(self._data_version)
+                if current == version:
+                    continue
+                version = current
+                values = await asyncio.to_thread(self._read_all)
+            except sqlite3.Error as exc:
+                log.warning("state poll failed", error=str(exc))
+                continue
+            for key in set(values) | set(self._seen):
+                if values.get(key) != self._seen.get(key):
+                    self._seen[key] = values.get(key)
+                    self._on_change(key, values.get(key))
+
+    async def get(self, key: str) -> Optional[str]:
+        return (await asyncio.to_thread(self._read_all)).get(key)
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._write, key, value)
+        self._seen[key] = value
+        if self._on_change is not None:
+            self._on_change(key, value)
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        with self._lock:
+            self._db.close()
+
+
+class RespError(Exception):
+    """An error reply from the server (-ERR ...)."""
+
+
+class _RespConnection:
+    """Just enough of the Redis serialization protocol (RESP2) for GET/SET/PUBLISH/SUBSCRIBE."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def open(cls, url: str, timeout: float) -> "_RespConnection":
+        u = urlparse(url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(u.hostname or "localhost", u.port or 6379), timeout
+        )
+        conn = cls(reader, writer)
+        if u.password:
+            await conn.command(*(["AUTH", u.username, u.password] if u.username else ["AUTH", u.password]))
+        db = (u.path or "/").lstrip("/")
+        if db and db != "0":
+            await conn.command("SELECT", db)
+        return conn
+
+    def send(self, *args: str) -> None:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg.encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(out))
+
+    async def read_reply(self) -> Any:
+        line = await self._reader.readuntil(b"\r\n")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            return None if n < 0 else (await self._reader.readexactly(n + 2))[:-2].decode()
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [await self.read_reply() for _ in range(n)]
+        raise RespError(f"unexpected reply {line!r}")
+
+    async def command(self, *args: str) -> Any:
+        self.send(*args)
+        await self._writer.drain()
+        return await self.read_reply()
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class RedisStateBackend:
+    """State in Redis (or anything speaking its protocol); changes fan out over pub/sub."""
+
+    def __init__(self, url: str, prefix: str = "trustline:", timeout: float = 2.0) -> None:
+        self._url = url
+        self._prefix = prefix
+        self._channel = prefix + "state"
+        self._timeout = timeout
+        self._conn: Optional[_RespConnection] = None
+        self._lock = asyncio.Lock()
+        self._keys: Set[str] = set()
+        self._on_change: Optional[ChangeFn] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _command(self, *args: str) -> Any:
+        async with self._lock:
+            if self._conn is None:
+                self._conn = await _RespConnection.open(self._url, self._timeout)
+            try:
+                return await asyncio.wait_for(self._conn.command(*args), self._timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                self._conn.close()
+                self._conn = None
+                raise
+
+    async def start(self, on_change: ChangeFn) -> None:
+        self._on_change = on_change
+        self._task = asyncio.create_task(self._subscribe())
+
+    async def _subscribe(self) -> None:
+        delay = 0.5
+        while True:
+            conn = None
+            try:
+                conn = await _RespConnection.open(self._url, self._timeout)
+                await conn.command("SUBSCRIBE", self._channel)
+                delay = 0.5
+                # Anything published while we were disconnected was missed: re-read
+                for key in list(self._keys):
+                    self._on_change(key, await self.get(key))
+                while True:
+                    msg = await conn.read_reply()
+                    if isinstance(msg, list) and len(msg) == 3 and msg[0] == "message":
+                        key = msg[2]
+                        self._on_change(key, await self.get(key))
+            except asyncio.CancelledError:
+                raise
+            except (OSError, RespError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+                log.warning("state subscription lost; reconnecting", error=repr(exc), retry_s=delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    async def get(self, key: str) -> Optional[str]:
+        self._keys.add(key)
+        return await self._command("GET", self._prefix + key)
+
+    async def set(self, key: str, value: str) -> None:
+        self._keys.add(key)
+        await self._command("SET", self._prefix + key, value)
+        await self._command("PUBLISH", self._channel, key)
+        if self._on_change is not None:
+            self._on_change(key, value)
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class DetectionState:
+    """
+    The detection flag, cached locally and kept current by the backend's change notifications.
+
+    is_enabled() never does I/O. set_enabled() writes through the backend and
+    updates the local value immediately; other workers follow as soon as
+    they're notified.
+    """
+
+    def __init__(self, backend, default_enabled: bool) -> None:
+        self._backend = backend
+        self._default = default_enabled
+        self._enabled = default_enabled
+        self._started = False
+
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    def _apply(self, enabled: bool) -> None:
+        if enabled == self._enabled:
+            return
+        self._enabled = enabled
+        log.info("detection state changed", enabled=enabled)
+
+    def _on_change(self, key: str, value: Optional[str]) -> None:
+        if key == ENABLED_KEY:
+            self._apply(self._default if value is None else value == "1")
+
+    async def start(self) -> None:
+        """Subscribe to changes and load the shared value (the env default applies until one is written)."""
+        if self._started:
+            return
+        self._started = True
+        await self._backend.start(self._on_change)
+        try:
+            self._on_change(ENABLED_KEY, await self._backend.get(ENABLED_KEY))
+        except (OSError, RespError, asyncio.TimeoutError, sqlite3.Error) as exc:
+            log.error("could not load detection state; using default until it is reachable", error=repr(exc))
+
+    async def set_enabled(self, enabled: bool) -> None:
+        await self._backend.set(ENABLED_KEY, "1" if enabled else "0")
+        self._apply(enabled)
+
+    async def aclose(self) -> None:
+        await self._backend.aclose()
+
+
+_state: Optional[DetectionState] = None
+
+
+def get_detection_state() -> DetectionState:
+    """The process-wide state per DETECTION_STATE_BACKEND (call start() from the lifespan)."""
+    global _state
+    if _state is None:
+        backend_name = settings.DETECTION_STATE_BACKEND
+        if backend_name == "memory":
+            backend = MemoryStateBackend()
+        elif backend_name == "sqlite":
+            backend = SQLiteStateBackend(settings.DETECTION_STATE_PATH, settings.DETECTION_STATE_POLL_SECONDS)
+        elif backend_name == "redis":
+            backend = RedisStateBackend(settings.DETECTION_STATE_REDIS_URL)
+        else:
+            raise ValueError(f"unknown DETECTION_STATE_BACKEND {backend_name!r}; expected memory, sqlite or redis")
+        _state = DetectionState(backend, settings.DETECTION_ENABLED)
+    return _state
+
+
+async def shutdown_detection_state() -> None:
+    global _state
+    if _state is not None:
+        state, _state = _state, None
+        await state.aclose()
@@ -0,0 +1,160 @@
+"""
+In-process fan-out of per-call events to connected clients (SSE at GET /events, WebSocket at /events/ws).
+
+Publishers (the /media handler) call publish(); each event is serialized
+once, to JSON and to its SSE frame, and the same bytes are queued for
+every matching subscriber. Subscribers choose one call or all calls.
+
+Each subscriber has a bounded queue (EVENT_HUB_QUEUE_MAX). A subscriber
+that falls that far behind is evicted, not waited on: its queue is
+dropped and its stream ends with an "evicted" event, so the client
+reconnects and re-reads state from /reports. One slow phone never delays
+the media loop or the other subscribers.
+
+Events: call_started, verdict, risk, transcript, call_ended.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+EVENTS_PUBLISHED = REGISTRY.counter("trustline_events_published_total", "Events published to the push hub", ("type",))
+EVENT_DELIVERIES = REGISTRY.counter(
+    "trustline_event_deliveries_total", "Per-subscriber event deliveries by outcome (queued, evicted)", ("result",)
+)
+
+
+class Event:
+    """One published event; both wire encodings are built once, then shared by every subscriber."""
+
+    __slots__ = ("type", "call_sid", "json", "sse")
+
+    def __init__(self, type: str, call_sid: str, data: Dict[str, Any]) -> None:
+        self.type = type
+        self.call_sid = call_sid
+        self.json = json.dumps({"type": type, "callSid": call_sid, "ts": time.time(), **data}, default=str)
+        self.sse = f"event: {type}\ndata: {self.json}\n\n".encode()
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", call_sid: Optional[str], max_queue: int) -> None:
+        self._hub = hub
+        self.call_sid = call_sid
+        self._queue: Deque[Event] = deque()
+        self._max_queue = max_queue
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def _offer(self, event: Event) -> bool:
+        if len(self._queue) >= self._max_queue:
+            return False
+        self._queue.append(event)
+        self._ready.set()
+        return True
+
+    def _evict(self) -> None:
+        self._queue.clear()
+        self._queue.append(Event("evicted", self.call_sid or "", {"reason": "slow consumer"}))
+        self.closed = True
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event; None on timeout or once the subscription is closed and drained."""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._queue.popleft()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+        self._hub._remove(self)
+
+
+class EventHub:
+    def __init__(self, max_queue: int) -> None:
+        self._max_queue = max_queue
+        self._all: Set[Subscription] = set()
+        self._by_call: Dict[str, Set[Subscription]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._all) + sum(len(s) for s in self._by_call.values())
+
+    def subscribe(self, call_sid: Optional[str] = None) -> Subscription:
+        sub = Subscription(self, call_sid, self._max_queue)
+        if call_sid:
+            self._by_call.setdefault(call_sid, set()).add(sub)
+        else:
+            self._all.add(sub)
+        return sub
+
+    def _remove(self, sub: Subscription) -> None:
+        if sub.call_sid:
+            subs = self._by_call.get(sub.call_sid)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_call[sub.call_sid]
+        else:
+            self._all.discard(sub)
+
+    def has_subscribers(self, call_sid: str) -> bool:
+        return bool(self._all) or call_sid in self._by_call
+
+    def publish(self, type: str, call_sid: str, **data: Any) -> int:
+        """Queue an event for every matching subscriber (non-blocking); returns how many got it."""
+        if not self.has_subscribers(call_sid):
+            return 0  # nobody listening: skip serialization entirely
+        event = Event(type, call_sid, data)
+        EVENTS_PUBLISHED.inc(type=type)
+        delivered = 0
+        for sub in list(self._all) + list(self._by_call.get(call_sid, ())):
+            if sub._offer(event):
+                delivered += 1
+            else:
+                self._remove(sub)
+                sub._evict()
+                EVENT_DELIVERIES.inc(result="evicted")
+                log.warning("evicting slow event subscriber", subscribed_to=sub.call_sid or "all")
+        EVENT_DELIVERIES.inc(delivered, result="queued")
+        return delivered
+
+    def close(self) -> None:
+        """End every subscription (shutdown)."""
+        for sub in list(self._all) + [s for subs in self._by_call.values() for s in subs]:
+            sub.close()
+
+
+_hub: Optional[EventHub] = None
+
+REGISTRY.gauge(
+    "trustline_event_subscribers", "Clients subscribed to the push hub",
+    fn=lambda: {(): float(_hub.subscriber_count if _hub is not None else 0)},
+)
+
+
+def get_event_hub() -> EventHub:
+    global _hub
+    if _hub is None:
+        _hub = EventHub(settings.EVENT_HUB_QUEUE_MAX)
+    return _hub
+
+
+def shutdown_event_hub() -> None:
+    global _hub
+    if _hub is not None:
+        hub, _hub = _hub, None
+        hub.close()
@@ -1,17 +1,44 @@
+import asyncio
 import threading
 import queue
-from typing import Callable, Optional
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional, Set, Tuple
 
-from google.cloud import speech
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import STT_SESSION_START_SECONDS
+from app.services.stt_pool import get_stt_pool
+from app.services.task_supervisor import get_task_supervisor
 
+log = get_logger(__name__)
 
-# Map simple string values to Google Cloud Speech AudioEncoding enums.
-# This lets callers specify encodings like "MULAW" or "LINEAR16" without
-# importing/knowing the SDK enums.
-_ENCODING_MAP = {
-    "LINEAR16": speech.RecognitionConfig.AudioEncoding.LINEAR16,
-    "MULAW": speech.RecognitionConfig.AudioEncoding.MULAW,
-}
+# google.cloud.speech (and grpc under it) takes a large share of worker boot time, so it
+# is imported on first use (load_speech_sdk) rather than with this module
+speech = None
+
+_client = None
+
+
+def load_speech_sdk():
+    """Import google.cloud.speech once; safe to call from a worker thread during warm-up."""
+    global speech
+    if speech is None:
+        from google.cloud import speech
+    return speech
+
+
+def _encoding(name: str):
+    """Map "MULAW" / "LINEAR16" to the SDK's AudioEncoding enum (LINEAR16 if unknown)."""
+    encodings = load_speech_sdk().RecognitionConfig.AudioEncoding
+    return encodings.MULAW if name.upper() == "MULAW" else encodings.LINEAR16
+
+
+def get_speech_client():
+    """Process-wide SpeechClient for the threaded streamer (one channel, credentials loaded once)."""
+    global _client
+    if _client is None:
+        _client = load_speech_sdk().SpeechClient()
+    return _client
 
 
 class GoogleSTTStreamer:
@@ -48,8 +75,8 @@ class GoogleSTTStreamer:
         - enable_automatic_punctuation: Insert punctuation in transcripts
         - audio_encoding: One of {"LINEAR16", "MULAW"}
         """
-        # Google Cloud Speech client
-        self._client = speech.SpeechClient()
+        # Google Cloud Speech client, shared by every stream in the process
+        self._client = get_speech_client()
 
         # Queue to feed audio chunks to Google's request generator
         self._requests_queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
@@ -62,7 +89,7 @@ class GoogleSTTStreamer:
         self._callback: Optional[Callable[[str, bool], None]] = None
 
         # Resolve caller-provided encoding string to Google enum
-        encoding_enum = _ENCODING_MAP.get(audio_encoding.upper(), speech.RecognitionConfig.AudioEncoding.LINEAR16)
+        encoding_enum = _encoding(audio_encoding)
 
         # RecognitionConfig describes the audio format and language
         self._config = speech.RecognitionConfig(
@@ -116,7 +143,7 @@ class GoogleSTTStreamer:
                     transcript = result.alternatives[0].transcript
                     self._callback(transcript, result.is_final)
         except Exception as exc:
-            print(f"STT: response loop error: {exc}")
+            log.error("STT response loop error", error=str(exc))
 
     def start(self, callback: Callable[[str, bool], None]) -> None:
         """Begin recognition.
@@ -137,3 +164,383 @@ class GoogleSTTStreamer:
         if self._response_thread is not None:
             self._response_thread.join(timeout=2.0)
             self._response_thread = None
+
+
+# Google rejects StreamingRecognizeRequest audio_content above this size
+_MAX_REQUEST_AUDIO_BYTES = 25600
+
+BACKPRESSURE_POLICIES = ("drop_oldest", "coalesce", "block")
+
+# Stop reopening streams for a call after this many failures in a row
+_MAX_CONSECUTIVE_STREAM_ERRORS = 5
+
+
+class _BoundedAudioQueue:
+    """
+    Bounded FIFO of audio chunks for one STT stream, living on the event loop.
+
+    When full, put() applies the backpressure policy:
+    - "drop_oldest": discard the oldest queued chunk (lowest latency, loses audio)
+    - "coalesce": append to the newest queued chunk so the request count stays
+      bounded without losing audio; falls back to drop_oldest once that chunk
+      reaches the per-request size limit
+    - "block": wait for room, pushing backpressure onto the caller
+    """
+
+    def __init__(self, max_chunks: int, policy: str) -> None:
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"unknown backpressure policy {policy!r}; expected one of {BACKPRESSURE_POLICIES}")
+        self._items: Deque[bytes] = deque()
+        self._max = max(1, max_chunks)
+        self._policy = policy
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._closed = False
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, chunk: bytes) -> None:
+        if self._policy == "block":
+            while len(self._items) >= self._max and not self._closed:
+                self._not_full.clear()
+                await self._not_full.wait()
+        self.put_nowait(chunk)
+
+    def put_nowait(self, chunk: bytes) -> None:
+        if self._closed or not chunk:
+            return
+        items = self._items
+        if len(items) >= self._max:
+            if self._policy == "coalesce" and len(items[-1]) + len(chunk) <= _MAX_REQUEST_AUDIO_BYTES:
+                items[-1] += chunk
+                return
+            self.dropped_bytes += len(items.popleft())
+        items.append(chunk)
+        self._not_empty.set()
+
+    def push_front(self, chunk: bytes) -> None:
+        """Return a chunk taken by get() to the head of the queue (ignores the size bound)."""
+        self._items.appendleft(chunk)
+        self._not_empty.set()
+
+    async def get(self, stop: Optional[Callable[[], bool]] = None) -> Optional[bytes]:
+        """Next chunk, or None once the queue is closed and drained (or `stop()` is true on a wake-up)."""
+        while not self._items:
+            if self._closed or (stop is not None and stop()):
+                return None
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        chunk = self._items.popleft()
+        self._not_full.set()
+        return chunk
+
+    def wake(self) -> None:
+        """Make waiting get() calls re-check their stop condition."""
+        self._not_empty.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+
+def _duration_ms(d) -> float:
+    """Milliseconds from a result_end_time (timedelta via proto-plus, or a raw Duration)."""
+    if d is None:
+        return 0.0
+    if hasattr(d, "total_seconds"):
+        return d.total_seconds() * 1000.0
+    return d.seconds * 1000.0 + d.nanos / 1e6
+
+
+def _norm_words(text: str):
+    return [w.strip(".,!?;:\"'").lower() for w in text.split()]
+
+
+def _trim_seam_overlap(previous: str, text: str, max_words: int = 8) -> str:
+    """Drop leading words of `text` that repeat the trailing words of `previous`."""
+    prev, cur = _norm_words(previous), _norm_words(text)
+    for k in range(min(max_words, len(prev), len(cur)), 0, -1):
+        if prev[-k:] == cur[:k]:
+            return " ".join(text.split()[k:])
+    return text
+
+
+class _StreamSession:
+    """
+    One streaming_recognize call; rotated out before the provider's stream limit.
+
+    A session is opened (config sent) first and activated (given audio) later:
+    immediately for the first stream, at the handover for a pre-opened one.
+    """
+
+    __slots__ = ("start_ms", "opened_at", "activated_at", "active", "task", "timers", "retired", "cutoff_ms", "replay", "seam")
+
+    def __init__(self, opened_at: float, seam: bool) -> None:
+        self.start_ms = 0.0  # call-timeline position of this stream's first audio byte (set on activation)
+        self.opened_at = opened_at
+        self.activated_at = opened_at
+        self.active = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.timers: List[asyncio.TimerHandle] = []
+        self.retired = False
+        self.cutoff_ms: Optional[float] = None  # once retired: where the next stream's audio starts
+        self.replay: List[bytes] = []  # chunks re-sent at the start of this stream
+        self.seam = seam  # True until the first final result after a rotation
+
+
+class AsyncGoogleSTTStreamer:
+    """
+    asyncio-native counterpart of GoogleSTTStreamer built on SpeechAsyncClient.
+
+    No thread per call: the response reader is a task on the event loop, audio
+    goes through a bounded queue with an explicit backpressure policy, and
+    close() only signals shutdown, so it never blocks the loop.
+
+    Google ends a streaming_recognize call after ~5 minutes (or on transient
+    errors). Sessions are rotated on a timer before that limit
+    (STT_STREAM_ROTATE_SECONDS after they open), whether or not audio is
+    flowing. The next stream is opened STT_STREAM_PREOPEN_SECONDS ahead, so
+    its connection and config round-trip are done by the handover; from there
+    it is replayed the audio sent since the last final result, so nothing is
+    lost across the seam. Results that end before the last final are dropped,
+    as are the retiring stream's results that run past the replay start (the
+    new stream transcribes that audio again), and repeated words at the start
+    of the first final after a seam are trimmed.
+
+    Typical usage (inside a coroutine):
+      stt = AsyncGoogleSTTStreamer(language_code="en-US", sample_rate_hz=8000, audio_encoding="MULAW")
+      stt.start(callback=lambda text, is_final: print(text, is_final))
+      await stt.write(audio_bytes)  # only waits under the "block" policy
+      stt.close()
+    """
+
+    def __init__(
+        self,
+        language_code: str,
+        sample_rate_hz: int = 8000,
+        enable_interim_results: bool = True,
+        enable_automatic_punctuation: bool = True,
+        audio_encoding: str = "LINEAR16",
+        max_queue_chunks: Optional[int] = None,
+        backpressure: Optional[str] = None,
+    ) -> None:
+        """
+        Same arguments as GoogleSTTStreamer, plus:
+
+        - max_queue_chunks: queued chunks before backpressure kicks in (default STT_QUEUE_MAX_CHUNKS)
+        - backpressure: one of BACKPRESSURE_POLICIES (default STT_BACKPRESSURE)
+        """
+        self._pool = get_stt_pool()
+        self._queue = _BoundedAudioQueue(
+            max_queue_chunks or settings.STT_QUEUE_MAX_CHUNKS,
+            backpressure or settings.STT_BACKPRESSURE,
+        )
+        self._callback: Optional[Callable[[str, bool], None]] = None
+        self._closed = False
+
+        encoding = audio_encoding.upper()
+        encoding_enum = _encoding(encoding)
+        self._bytes_per_ms = sample_rate_hz * (1 if encoding == "MULAW" else 2) / 1000.0
+        self._streaming_config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=encoding_enum,
+                sample_rate_hertz=sample_rate_hz,
+                language_code=language_code,
+                enable_automatic_punctuation=enable_automatic_punctuation,
+            ),
+            interim_results=enable_interim_results,
+            single_utterance=False,
+        )
+
+        # Call timeline, in ms of audio sent to Google
+        self._sent_ms = 0.0
+        self._last_final_end_ms = 0.0
+        self._last_final_text = ""
+        # (start_ms, chunk) sent since the last final result: the replay buffer for the next stream
+        self._unfinalized: Deque[Tuple[float, bytes]] = deque()
+        self._max_replay_ms = settings.STT_MAX_REPLAY_SECONDS * 1000.0
+
+        self._session: Optional[_StreamSession] = None
+        self._next: Optional[_StreamSession] = None  # pre-opened, waiting for the handover
+        self._sessions: Set[asyncio.Task] = set()
+        self._consecutive_errors = 0
+        self.rotations = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def dropped_bytes(self) -> int:
+        return self._queue.dropped_bytes
+
+    def _open_session(self, seam: bool) -> _StreamSession:
+        """Start a stream (it sends its config, then waits for activation) and its rotation timers."""
+        loop = asyncio.get_running_loop()
+        session = _StreamSession(loop.time(), seam)
+        session.task = asyncio.create_task(self._response_loop(session))
+        get_task_supervisor().track(session.task, "stt")  # shutdown lets it flush final results
+        self._sessions.add(session.task)
+        session.task.add_done_callback(self._sessions.discard)
+        rotate_after = settings.STT_STREAM_ROTATE_SECONDS
+        preopen_after = max(0.0, rotate_after - settings.STT_STREAM_PREOPEN_SECONDS)
+        session.timers = [
+            loop.call_later(preopen_after, self._preopen, session),
+            loop.call_later(rotate_after, self._expire, session),
+        ]
+        return session
+
+    def _activate(self, session: _StreamSession) -> None:
+        """Make `session` the one carrying audio, starting with the unfinalized audio."""
+        replay = list(self._unfinalized)
+        session.start_ms = replay[0][0] if replay else self._sent_ms
+        session.replay = [c for _, c in replay]
+        session.activated_at = asyncio.get_running_loop().time()
+        self._session = session
+        session.active.set()
+
+    def _preopen(self, session: _StreamSession) -> None:
+        if session is self._session and self._next is None and not self._closed:
+            self._next = self._open_session(seam=True)
+
+    def _expire(self, session: _StreamSession) -> None:
+        if session is self._session:
+            self._rotate("stream age limit")
+
+    def _retire(self, session: _StreamSession) -> None:
+        session.retired = True
+        session.active.set()  # a standby stream that never got audio just ends
+        self._queue.wake()  # end its request stream now, so Google sends its last finals
+        for timer in session.timers:
+            timer.cancel()
+
+    def _rotate(self, reason: str) -> None:
+        """Retire the current stream and hand over to the next one (replaying unfinalized audio)."""
+        if self._closed:
+            return
+        nxt, self._next = self._next, None
+        preopened = nxt is not None and not nxt.task.done()
+        if not preopened:
+            nxt = self._open_session(seam=True)
+        self.rotations += 1
+        log.info("STT rotating stream", reason=reason, replay_chunks=len(self._unfinalized), preopened=preopened)
+        old = self._session
+        self._activate(nxt)
+        if old is not None:
+            old.cutoff_ms = nxt.start_ms
+            self._retire(old)
+
+    async def _requests(self, session: _StreamSession) -> AsyncIterator["speech.StreamingRecognizeRequest"]:
+        """The async API takes config in the first request, then audio_content chunks."""
+        yield speech.StreamingRecognizeRequest(streaming_config=self._streaming_config)
+        await session.active.wait()  # pre-opened: hold here until the handover
+        if session.retired:
+            return
+        for chunk in session.replay:
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+        session.replay = []
+        while not session.retired:
+            chunk = await self._queue.get(lambda: session.retired)
+            if chunk is None:
+                return
+            if session.retired:
+                # A newer stream took over while we waited; it gets this chunk.
+                self._queue.push_front(chunk)
+                return
+            self._unfinalized.append((self._sent_ms, chunk))
+            self._sent_ms += len(chunk) / self._bytes_per_ms
+            while self._unfinalized and self._sent_ms - self._unfinalized[0][0] > self._max_replay_ms:
+                self._unfinalized.popleft()
+            yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+    def _on_result(self, session: _StreamSession, text: str, is_final: bool, end_ms: float) -> None:
+        if end_ms <= self._last_final_end_ms:
+            return  # already covered by a final from the previous stream
+        if session.cutoff_ms is not None and end_ms > session.cutoff_ms:
+            return  # retiring stream: the next one was replayed this audio and transcribes it again
+        if is_final:
+            if session.seam:
+                session.seam = False
+                text = _trim_seam_overlap(self._last_final_text, text)
+            self._last_final_end_ms = end_ms
+            self._last_final_text = text
+            while self._unfinalized and self._unfinalized[0][0] < end_ms:
+                self._unfinalized.popleft()
+        if text and self._callback is not None:
+            self._callback(text, is_final)
+
+    async def _response_loop(self, session: _StreamSession) -> None:
+        # Each stream multiplexes over a pooled long-lived channel instead of dialing its own
+        lease = await self._pool.lease()
+        error: Optional[BaseException] = None
+        first = True
+        try:
+            stream = await lease.client.streaming_recognize(requests=self._requests(session))
+            async for response in stream:
+                if first:
+                    first = False
+                    lease.ok()
+                    STT_SESSION_START_SECONDS.observe(
+                        asyncio.get_running_loop().time() - session.activated_at,
+                        session="rotation" if session.seam else "first",
+                    )
+                self._consecutive_errors = 0
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    end_ms = session.start_ms + _duration_ms(getattr(result, "result_end_time", None))
+                    self._on_result(session, result.alternatives[0].transcript, result.is_final, end_ms)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            log.error("STT response loop error", error=str(exc))
+            self._consecutive_errors += 1
+            error = exc
+        finally:
+            lease.release(error)
+        if session is self._next:
+            self._next = None  # the standby failed; the handover opens a fresh one
+            return
+        if session is self._session and not self._closed:
+            # The provider ended the stream (limit or error) before we rotated it.
+            if self._consecutive_errors >= _MAX_CONSECUTIVE_STREAM_ERRORS:
+                log.error("STT giving up after repeated stream errors", errors=self._consecutive_errors)
+                return
+            if self._consecutive_errors > 1:
+                await asyncio.sleep(min(0.25 * 2 ** self._consecutive_errors, 5.0))
+            self._rotate("stream ended by provider")
+
+    def start(self, callback: Callable[[str, bool], None]) -> None:
+        """Begin recognition. Must be called from the event loop."""
+        self._callback = callback
+        self._activate(self._open_session(seam=False))
+
+    async def write(self, audio_bytes: bytes) -> None:
+        """Queue an audio chunk; returns immediately unless the policy is "block" and the queue is full."""
+        await self._queue.put(audio_bytes)
+
+    def close(self, timeout: float = 2.0) -> None:
+        """
+        End the audio stream without waiting for it.
+
+        Google flushes final results after the request stream ends; reader
+        tasks still running `timeout` seconds later are cancelled.
+        """
+        self._closed = True
+        self._queue.close()
+        for session in (self._session, self._next):
+            if session is not None:
+                for timer in session.timers:
+                    timer.cancel()
+        if self._next is not None:
+            self._retire(self._next)
+            self._next = None
+        loop = asyncio.get_running_loop()
+        for task in list(self._sessions):
+            if not task.done():
+                handle = loop.call_later(timeout, task.cancel)
+                task.add_done_callback(lambda _, h=handle: h.cancel())
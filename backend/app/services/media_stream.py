@@ -0,0 +1,101 @@
+"""
+Decoder for Twilio Media Streams WebSocket messages.
+
+Nearly every message on /media is a "media" event carrying 20ms of base64
+μ-law, and Twilio always serializes it with "event" first:
+
+  {"event":"media","sequenceNumber":"4","media":{"track":"inbound",
+   "chunk":"3","timestamp":"60","payload":"<base64>"},"streamSid":"MZ..."}
+
+For those, the payload is sliced straight out of the text and base64-decoded
+without building a dict. The slice is only trusted when the text has exactly
+that shape around it: "payload" is the last key of the "media" object (no
+other object closes in between, and `"}` follows the value) and the message
+ends with the streamSid. Everything else (connected/start/stop/mark/dtmf),
+and any media message that doesn't match the expected shape, goes through a
+full JSON parse (orjson when installed, else the stdlib).
+"""
+import binascii
+import json
+from typing import Any, Dict, NamedTuple, Optional
+
+try:  # optional, faster JSON for the slow path
+    import orjson
+
+    _loads = orjson.loads
+    _DecodeErrors: tuple = (orjson.JSONDecodeError,)
+except ImportError:  # pragma: no cover - depends on environment
+    _loads = json.loads
+    _DecodeErrors = (json.JSONDecodeError,)
+
+_MEDIA_PREFIX = '{"event":"media"'
+_MEDIA_KEY = '"media":{'
+_PAYLOAD_KEY = '"payload":"'
+_STREAM_SID_KEY = '},"streamSid":"'
+
+
+class MediaStreamError(ValueError):
+    """A message that is not valid JSON or carries an undecodable payload."""
+
+
+class MediaMessage(NamedTuple):
+    event: Optional[str]
+    audio: Optional[bytes]  # decoded μ-law for "media" events
+    data: Optional[Dict[str, Any]]  # full message for non-media events (None on the fast path)
+
+
+def _decode_payload(payload_b64: str) -> bytes:
+    # A fresh bytes per frame on purpose. binascii has no decode-into call, so a reused buffer
+    # means decoding to bytes anyway and copying once more: bench_media_parse measures that
+    # variant slower (4.7 vs 3.0 us/msg). The 160 bytes are short-lived either way: the
+    # ring buffer, VAD and STT batch each copy the frame before the next one is read.
+    try:
+        return binascii.a2b_base64(payload_b64)
+    except (binascii.Error, ValueError) as exc:
+        raise MediaStreamError(f"invalid base64 payload: {exc}") from exc
+
+
+def _fast_payload(raw: str) -> Optional[str]:
+    """The base64 payload of a media message in Twilio's exact layout, or None to parse it fully."""
+    media = raw.find(_MEDIA_KEY, len(_MEDIA_PREFIX))
+    if media == -1:
+        return None
+    start = raw.find(_PAYLOAD_KEY, media)
+    # The key must belong to the media object itself, not to something nested in or after it
+    if start == -1 or "{" in raw[media + len(_MEDIA_KEY):start] or "}" in raw[media:start]:
+        return None
+    start += len(_PAYLOAD_KEY)
+    end = raw.find('"', start)
+    if end == -1 or not raw.startswith(_STREAM_SID_KEY, end + 1) or not raw.endswith('"}'):
+        return None
+    payload = raw[start:end]
+    # Base64 never needs JSON escapes; a backslash means something unusual, so parse fully.
+    if "\\" in payload or '"' in raw[end + 1 + len(_STREAM_SID_KEY):-2]:
+        return None
+    return payload
+
+
+def parse_message(raw: str) -> MediaMessage:
+    """
+    Parse one text frame from Twilio.
+
+    Raises MediaStreamError for invalid JSON or an invalid base64 payload.
+    A media event without a payload yields audio=None.
+    """
+    if raw.startswith(_MEDIA_PREFIX):
+        payload = _fast_payload(raw)
+        if payload is not None:
+            return MediaMessage("media", _decode_payload(payload) if payload else None, None)
+
+    try:
+        msg = _loads(raw)
+    except _DecodeErrors as exc:
+        raise MediaStreamError(f"invalid JSON: {exc}") from exc
+    if not isinstance(msg, dict):
+        raise MediaStreamError("message is not a JSON object")
+
+    event = msg.get("event")
+    if event == "media":
+        payload = (msg.get("media") or {}).get("payload")
+        return MediaMessage("media", _decode_payload(payload) if payload else None, msg)
+    return MediaMessage(event, None, msg)
@@ -1,34 +1,279 @@
-from typing import Optional
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from app.core.config import settings
-from twilio.rest import Client
+from app.core.logging import bind_call_sid, get_logger
+from app.core.metrics import REGISTRY, get_call_trace
+
+if TYPE_CHECKING:
+    from twilio.rest import Client
+
+_client: Optional["Client"] = None
+log = get_logger(__name__)
+
+SMS_TOTAL = REGISTRY.counter(
+    "trustline_sms_total", "Outbound SMS by outcome (sent, failed, retried, coalesced, dropped)", ("result",)
+)
+SMS_DELIVERY_SECONDS = REGISTRY.histogram("trustline_sms_delivery_seconds", "Seconds from submit() to Twilio accepting the SMS")
+# Stage recorded on the call's trace when its SMS goes out, by key prefix
+_TRACE_STAGES = {"verdict": "sms_sent", "phrases": "phrase_sms_sent"}
+
+
+def _twilio_configured() -> bool:
+    return bool(settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER)
+
+
+def _get_client() -> "Client":
+    """One Twilio REST client per process, so its HTTP session (and TLS connections) is reused."""
+    global _client
+    if _client is None:
+        from twilio.rest import Client  # heavy import: deferred until the first SMS (or warm-up)
+
+        _client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    return _client
+
+
+def _send_once(to_number: str, body: str) -> str:
+    """Send one SMS (blocking); returns the Message SID, raises on failure."""
+    msg = _get_client().messages.create(
+        to=to_number,
+        from_=settings.TWILIO_PHONE_NUMBER,
+        body=body,
+    )
+    return msg.sid
 
 
 def send_sms(to_number: str, body: str) -> Optional[str]:
-    """Send an SMS using Twilio. Returns the Message SID on success, None on failure."""
-    if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN or not settings.TWILIO_PHONE_NUMBER:
-        print("Notifier: Missing Twilio credentials in environment")
+    """Send an SMS using Twilio. Returns the Message SID on success, None on failure.
+
+    Blocks for a full HTTPS round-trip; from async code use get_notifier().submit().
+    """
+    if not _twilio_configured():
+        log.warning("missing Twilio credentials in environment")
         return None
 
     try:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        msg = client.messages.create(
-            to=to_number,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            body=body,
-        )
-        print(f"Notifier: SMS sent to {to_number}, sid={msg.sid}")
-        return msg.sid
+        sid = _send_once(to_number, body)
+        log.info("SMS sent", to=to_number, sid=sid)
+        return sid
     except Exception as exc:  # pragma: no cover
-        print(f"Notifier: Failed to send SMS to {to_number}: {exc}")
+        log.error("SMS failed", to=to_number, error=str(exc))
         return None
 
 
-def notify_scam_call(to_number: str, call_sid: str, score: Optional[float]) -> Optional[str]:
-    """Send a concise scam alert SMS to the callee when a call is flagged as MANIPULATED."""
+def _is_retryable(exc: Exception) -> bool:
+    # TwilioRestException carries the HTTP status; 4xx other than 429 (bad number,
+    # unverified recipient, ...) will fail the same way again.
+    status = getattr(exc, "status", None)
+    return not isinstance(status, int) or status == 429 or status >= 500
+
+
+class _Outbound:
+    __slots__ = ("to", "body", "key", "attempts", "not_before", "queued_at")
+
+    def __init__(self, to: str, body: str, key: str, queued_at: float) -> None:
+        self.to = to
+        self.body = body
+        self.key = key
+        self.attempts = 0
+        self.not_before = 0.0
+        self.queued_at = queued_at
+
+
+def _call_sid_of(key: str) -> Optional[str]:
+    prefix, _, rest = key.partition(":")
+    return rest if prefix in _TRACE_STAGES else None
+
+
+class SMSDispatcher:
+    """
+    Long-lived, non-blocking SMS sender.
+
+    submit() only queues; worker tasks send through one shared Twilio client
+    in a thread, so the event loop never waits on Twilio.
+
+    - Bounded: at most SMS_MAX_PENDING messages wait; the oldest is dropped beyond that.
+    - Coalescing: messages share a key (e.g. one per call). A newer message for a
+      key that hasn't gone out yet replaces the queued one, and a message whose
+      body matches what was last sent for its key is skipped, so a call only
+      ever sends its latest verdict.
+    - Rate limited: at most one SMS per recipient every SMS_MIN_INTERVAL_SECONDS.
+    - Retried: transient failures are re-queued with exponential backoff, unless
+      a newer message for the same key arrived meanwhile.
+    """
+
+    def __init__(
+        self,
+        max_pending: Optional[int] = None,
+        min_interval: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        self._max_pending = max_pending or settings.SMS_MAX_PENDING
+        self._min_interval = settings.SMS_MIN_INTERVAL_SECONDS if min_interval is None else min_interval
+        self._max_retries = settings.SMS_MAX_RETRIES if max_retries is None else max_retries
+        self._worker_count = max(1, workers or settings.SMS_WORKERS)
+
+        self._pending: "OrderedDict[str, _Outbound]" = OrderedDict()
+        self._in_flight: Set[str] = set()
+        self._next_allowed: Dict[str, float] = {}
+        self._last_sent: "OrderedDict[str, str]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self._closing = False
+        self._ids = itertools.count()
+
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, to_number: str, body: str, key: Optional[str] = None) -> bool:
+        """Queue an SMS. Returns False if it was skipped (duplicate, closing, or no credentials)."""
+        if self._closing:
+            return False
+        if not _twilio_configured():
+            log.warning("missing Twilio credentials in environment")
+            return False
+        key = key or f"msg:{next(self._ids)}"
+        if key not in self._pending and self._last_sent.get(key) == body:
+            return False
+        queued = self._pending.get(key)
+        if queued is not None:
+            queued.to, queued.body, queued.attempts, queued.not_before = to_number, body, 0, 0.0
+            self.coalesced += 1
+            SMS_TOTAL.inc(result="coalesced")
+        else:
+            if len(self._pending) >= self._max_pending:
+                _, oldest = self._pending.popitem(last=False)
+                self.dropped += 1
+                SMS_TOTAL.inc(result="dropped")
+                log.warning("SMS queue full, dropping oldest", to=oldest.to)
+            self._pending[key] = _Outbound(to_number, body, key, asyncio.get_running_loop().time())
+        self._ensure_workers()
+        self._wakeup.set()
+        return True
+
+    def _ensure_workers(self) -> None:
+        self._workers = [t for t in self._workers if not t.done()]
+        while len(self._workers) < self._worker_count:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def _take_ready(self, now: float) -> Tuple[Optional[_Outbound], Optional[float]]:
+        """Pop the oldest message that may be sent now, else report how long until one can."""
+        wait: Optional[float] = None
+        for key, msg in self._pending.items():
+            if key in self._in_flight:
+                continue  # an older body for this key is being sent; send the newer one after
+            ready_at = max(msg.not_before, self._next_allowed.get(msg.to, 0.0))
+            if ready_at <= now:
+                del self._pending[key]
+                self._next_allowed[msg.to] = now + self._min_interval
+                return msg, None
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            msg, wait = self._take_ready(loop.time())
+            if msg is None:
+                if self._closing and not self._pending:
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._in_flight.add(msg.key)
+            call_sid = _call_sid_of(msg.key)
+            bind_call_sid(call_sid)  # workers are shared; tag log lines with this message's call
+            try:
+                sid = await asyncio.to_thread(_send_once, msg.to, msg.body)
+            except Exception as exc:
+                self._on_failure(msg, exc, loop.time())
+            else:
+                self.sent += 1
+                SMS_TOTAL.inc(result="sent")
+                SMS_DELIVERY_SECONDS.observe(loop.time() - msg.queued_at)
+                self._last_sent[msg.key] = msg.body
+                if len(self._last_sent) > self._max_pending * 4:
+                    self._last_sent.popitem(last=False)
+                trace = get_call_trace(call_sid)
+                if trace is not None:
+                    trace.mark(_TRACE_STAGES[msg.key.partition(":")[0]])
+                log.info("SMS sent", to=msg.to, sid=sid)
+            finally:
+                self._in_flight.discard(msg.key)
+                self._wakeup.set()
+
+    def _on_failure(self, msg: _Outbound, exc: Exception, now: float) -> None:
+        msg.attempts += 1
+        if msg.key in self._pending:
+            log.warning("SMS failed, superseded by a newer message", to=msg.to, error=str(exc))
+            return
+        if not _is_retryable(exc) or msg.attempts > self._max_retries or self._closing:
+            self.failed += 1
+            SMS_TOTAL.inc(result="failed")
+            log.error("SMS failed", to=msg.to, error=str(exc))
+            return
+        delay = min(settings.SMS_RETRY_BACKOFF_SECONDS * 2 ** (msg.attempts - 1), 60.0)
+        msg.not_before = now + delay
+        self._pending[msg.key] = msg
+        SMS_TOTAL.inc(result="retried")
+        log.warning("SMS failed, retrying", to=msg.to, error=str(exc), attempt=msg.attempts, delay_s=delay)
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Stop accepting messages and give queued ones up to `timeout` seconds to go out."""
+        self._closing = True
+        self._wakeup.set()
+        workers = [t for t in self._workers if not t.done()]
+        if not workers:
+            return
+        _, still_running = await asyncio.wait(workers, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if self._pending:
+            log.warning("shutting down with unsent SMS", pending=len(self._pending))
+
+
+_dispatcher: Optional[SMSDispatcher] = None
+
+REGISTRY.gauge(
+    "trustline_sms_queue_depth", "SMS waiting in the dispatcher",
+    fn=lambda: {(): float(_dispatcher.queue_depth if _dispatcher is not None else 0)},
+)
+
+
+def get_notifier() -> SMSDispatcher:
+    """Return the process-wide dispatcher, creating it on first use."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = SMSDispatcher()
+    return _dispatcher
+
+
+async def shutdown_notifier(timeout: float = 5.0) -> None:
+    """Drain and stop the dispatcher (called from the app lifespan)."""
+    global _dispatcher
+    if _dispatcher is not None:
+        dispatcher, _dispatcher = _dispatcher, None
+        await dispatcher.aclose(timeout)
+
+
+def notify_scam_call(to_number: str, call_sid: str, score: Optional[float]) -> bool:
+    """Queue a concise scam alert SMS to the callee when a call is flagged as MANIPULATED."""
     score_text = f" (score {score:.2f})" if isinstance(score, (float, int)) else ""
     body = f"Alert: Potential scam call detected{score_text}. Call SID: {call_sid}."
-    return send_sms(to_number, body)
+    return get_notifier().submit(to_number, body, key=f"verdict:{call_sid}")
 
 
 def notify_detection_result(
@@ -36,13 +281,26 @@ def notify_detection_result(
     call_sid: str,
     status: str,
     score: Optional[float],
-) -> Optional[str]:
-    """Notify outcome regardless of status (AUTHENTIC or MANIPULATED)."""
+) -> bool:
+    """Queue the outcome regardless of status (AUTHENTIC or MANIPULATED).
+
+    Non-blocking: must be called from the event loop. Verdicts for the same call
+    coalesce, so only the latest one is sent if several arrive close together.
+    """
     status_up = (status or "").upper()
     label = "Potential scam detected" if status_up == "MANIPULATED" else "Call appears authentic"
     score_text = f" (score {score:.2f})" if isinstance(score, (float, int)) else ""
     body = f"{label}{score_text}. Call SID: {call_sid}."
-    return send_sms(to_number, body)
+    return get_notifier().submit(to_number, body, key=f"verdict:{call_sid}")
 
 
+def notify_transcript_risk(to_number: str, call_sid: str, score: float, phrases: List[str]) -> bool:
+    """Queue a warning when scam phrases are heard on the call.
 
+    Keyed separately from the deepfake verdict so neither supersedes the other;
+    later risk updates for the same call coalesce.
+    """
+    heard = ", ".join(f'"{p}"' for p in phrases[:3])
+    more = f" and {len(phrases) - 3} more" if len(phrases) > 3 else ""
+    body = f"Warning: caller used common scam phrases ({heard}{more}), risk {score:.2f}. Call SID: {call_sid}."
+    return get_notifier().submit(to_number, body, key=f"phrases:{call_sid}")
@@ -0,0 +1,228 @@
+"""
+Streaming scam-phrase detection over STT transcripts.
+
+Phrases ("gift card", "don't tell anyone", "your pin", ...) come from a
+weighted dictionary file (SCAM_PHRASES_PATH) that is reloaded when it
+changes. They are compiled into a word-level Aho-Corasick automaton, so
+scanning a transcript costs O(words in the transcript) no matter how many
+phrases the dictionary holds.
+
+Interim results are revisions of the current utterance, so each one is
+rescanned in full and only phrases not already counted are reported. The
+call's risk score combines the weights of distinct matched phrases as
+independent evidence: 1 - prod(1 - w).
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+log = get_logger(__name__)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words with apostrophes folded in ("Don't" -> "dont") and other punctuation dropped."""
+    return _WORD_RE.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over word tokens; each pattern is a phrase id."""
+
+    __slots__ = ("_goto", "_fail", "_out", "phrases", "weights")
+
+    def __init__(self, phrases: Dict[str, float]) -> None:
+        self.phrases: List[str] = []
+        self.weights: List[float] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        for phrase, weight in phrases.items():
+            words = tokenize(phrase)
+            if not words:
+                continue
+            node = 0
+            for w in words:
+                nxt = self._goto[node].get(w)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][w] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (len(self.phrases),)
+            self.phrases.append(phrase)
+            self.weights.append(weight)
+
+        # Failure links (BFS), with outputs merged along them
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for w, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and w not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(w, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def scan(self, words: List[str]) -> List[Tuple[int, int]]:
+        """(phrase_id, end_word_index) for every occurrence in `words`."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        hits: List[Tuple[int, int]] = []
+        for i, w in enumerate(words):
+            while node and w not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(w, 0)
+            for pid in out[node]:
+                hits.append((pid, i))
+        return hits
+
+
+def load_phrases(path: str) -> Dict[str, float]:
+    """Parse `<weight>\\t<phrase>` lines; blank lines and '#' comments are skipped."""
+    phrases: Dict[str, float] = {}
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            weight, sep, phrase = line.partition("\t")
+            try:
+                w = float(weight)
+            except ValueError:
+                w, phrase = settings.SCAM_PHRASE_DEFAULT_WEIGHT, line  # bare phrase
+            else:
+                if not sep:
+                    raise ValueError(f"{path}:{lineno}: expected '<weight>\\t<phrase>'")
+            phrases[phrase.strip()] = min(max(w, 0.0), 0.99)
+    return phrases
+
+
+class PhraseDictionary:
+    """Holds the current automaton and swaps in a rebuilt one when the file changes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mtime: Optional[float] = None
+        self.automaton = PhraseAutomaton({})
+        self._task: Optional[asyncio.Task] = None
+
+    def _changed(self) -> Optional[float]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        return mtime if mtime != self._mtime else None
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the automaton if the file changed (blocking; see watch())."""
+        mtime = self._changed()
+        if mtime is None:
+            return False
+        try:
+            automaton = PhraseAutomaton(load_phrases(self.path))
+        except (OSError, ValueError) as exc:
+            log.error("failed to load phrase dictionary", path=self.path, error=str(exc))
+            return False
+        self.automaton, self._mtime = automaton, mtime
+        log.info("phrase dictionary loaded", path=self.path, phrases=len(automaton))
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Poll the file and rebuild off the event loop when it changes."""
+        while True:
+            if self._changed() is not None:
+                await asyncio.to_thread(self.reload_if_changed)
+            await asyncio.sleep(interval)
+
+    def start_watching(self) -> None:
+        if self._task is None and settings.SCAM_PHRASES_RELOAD_SECONDS > 0:
+            self._task = asyncio.create_task(self.watch(settings.SCAM_PHRASES_RELOAD_SECONDS))
+
+    def stop_watching(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_dictionary: Optional[PhraseDictionary] = None
+
+
+def get_phrase_dictionary() -> PhraseDictionary:
+    """Process-wide dictionary, loaded on first use."""
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = PhraseDictionary(settings.SCAM_PHRASES_PATH)
+        _dictionary.reload_if_changed()
+    return _dictionary
+
+
+class RiskUpdate(NamedTuple):
+    score: float
+    new_phrases: List[str]
+    crossed_alert: bool  # score reached a new alert tier with this update
+
+
+class TranscriptRiskTracker:
+    """
+    Per-call phrase matcher fed with every interim and final transcript.
+
+    update() returns a RiskUpdate when new phrases were found, else None.
+    crossed_alert is set the first time the score reaches each tier in
+    SCAM_PHRASE_ALERT_TIERS, which is when the notifier should be told.
+    """
+
+    def __init__(self, dictionary: Optional[PhraseDictionary] = None) -> None:
+        self._dictionary = dictionary or get_phrase_dictionary()
+        self._matched: Set[str] = set()  # distinct phrases for the whole call
+        self._utterance: Set[Tuple[str, int]] = set()  # (phrase, nth occurrence) in the current utterance
+        self._not_risk = 1.0
+        self._tiers = sorted(settings.SCAM_PHRASE_ALERT_TIERS)
+        self._next_tier = 0
+        self.score = 0.0
+        self.first_match_at: Optional[float] = None
+
+    @property
+    def matched_phrases(self) -> List[str]:
+        return sorted(self._matched)
+
+    def update(self, text: str, is_final: bool) -> Optional[RiskUpdate]:
+        automaton = self._dictionary.automaton
+        seen: Dict[str, int] = {}
+        new: List[str] = []
+        for pid, _ in automaton.scan(tokenize(text)):
+            phrase = automaton.phrases[pid]
+            nth = seen.get(phrase, 0)
+            seen[phrase] = nth + 1
+            if (phrase, nth) in self._utterance:
+                continue  # already counted from an earlier interim of this utterance
+            self._utterance.add((phrase, nth))
+            if phrase not in self._matched:
+                self._matched.add(phrase)
+                self._not_risk *= 1.0 - automaton.weights[pid]
+                new.append(phrase)
+        if is_final:
+            self._utterance.clear()
+        if not new:
+            return None
+
+        if self.first_match_at is None:
+            self.first_match_at = time.monotonic()
+        self.score = 1.0 - self._not_risk
+        crossed = False
+        while self._next_tier < len(self._tiers) and self.score >= self._tiers[self._next_tier]:
+            self._next_tier += 1
+            crossed = True
+        return RiskUpdate(self.score, new, crossed)
@@ -2,18 +2,57 @@ from typing import Any, Dict, Optional
 import asyncio
 import sys
 import os
+import tempfile
 
 from app.core.config import settings
-from realitydefender import RealityDefender
-from app.services.notifier import notify_detection_result
+from app.core.logging import get_logger
+from app.services.audio_pipeline import BytesLike
+from app.services.notifier import notify_detection_result, shutdown_notifier
+
+# The SDK (and aiohttp under it) is imported on first use, not at worker boot; see load_sdk()
+RealityDefender = RealityDefenderError = get_signed_url = None
+# Network-level failures (connection reset, DNS, TLS) raised by aiohttp rather than wrapped by the SDK
+_TRANSIENT_ERRORS: tuple = ()
+
+# SDK error codes not worth retrying (not_found is handled by the poll loop itself)
+_NO_RETRY_ERRORS = {"unauthorized", "invalid_request", "invalid_file", "file_too_large", "not_found"}
+_IN_PROGRESS = {"ANALYZING", "DOWNLOADING"}
+_MAX_AUDIO_UPLOAD_BYTES = 20 * 1024 * 1024  # SDK limit for audio files
+
+log = get_logger(__name__)
+
+
+def load_sdk() -> None:
+    """Import the Reality Defender SDK once; safe to call from a worker thread during warm-up."""
+    global RealityDefender, RealityDefenderError, get_signed_url, _TRANSIENT_ERRORS
+    if RealityDefender is None:
+        from aiohttp import ClientError
+        from realitydefender import RealityDefender, RealityDefenderError
+
+        # Internal helper used for in-memory uploads (checked against the version pinned in
+        # requirements.txt); without it upload_bytes() goes through a temp file and the public API.
+        try:
+            from realitydefender.detection.upload import get_signed_url
+        except ImportError:
+            get_signed_url = None
+        _TRANSIENT_ERRORS = (ClientError, OSError)
 
 
 class RealityDefenderService:
     """
-    Minimal wrapper around the Reality Defender Python SDK.
+    Wrapper around the Reality Defender Python SDK.
+
+    One instance is meant to live for the whole application (see
+    get_reality_defender()): the SDK client keeps a single aiohttp session, so
+    reusing it reuses pooled TLS connections across calls.
+
+    Uploads and result polling draw from separate bounded pools, so a burst of
+    calls waiting on verdicts never blocks new uploads (and vice versa). Every
+    HTTP round-trip has its own timeout, and transient failures are retried
+    with exponential backoff.
 
     Usage:
-      svc = RealityDefenderService()
+      svc = get_reality_defender()
       result = await svc.analyze_file("/path/to/audio_or_video.ext")
     """
 
@@ -21,7 +60,109 @@ class RealityDefenderService:
         key = api_key or settings.REALITY_DEFENDER_API_KEY
         if not key:
             raise RuntimeError("REALITY_DEFENDER_API_KEY is not set in environment or passed explicitly")
+        load_sdk()
         self._client = RealityDefender(api_key=key)
+        self._direct_upload = get_signed_url is not None and hasattr(getattr(self._client, "client", None), "ensure_session")
+        if not self._direct_upload:
+            log.warning("Reality Defender SDK internals changed; in-memory uploads go through a temp file")
+        self._upload_slots = asyncio.Semaphore(max(1, settings.RD_MAX_CONCURRENT_UPLOADS))
+        self._poll_slots = asyncio.Semaphore(max(1, settings.RD_MAX_CONCURRENT_POLLS))
+
+    async def _with_retries(self, slots: asyncio.Semaphore, op: str, make_call):
+        """Run make_call() under a pool slot with a per-attempt timeout and backoff between attempts."""
+        delay = settings.RD_BACKOFF_BASE_SECONDS
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with slots:
+                    return await asyncio.wait_for(make_call(), timeout=settings.RD_REQUEST_TIMEOUT_SECONDS)
+            except RealityDefenderError as exc:
+                if exc.code in _NO_RETRY_ERRORS or attempt > settings.RD_MAX_RETRIES:
+                    raise
+                err: Exception = exc
+            except asyncio.TimeoutError as exc:
+                if attempt > settings.RD_MAX_RETRIES:
+                    raise RealityDefenderError(f"{op} timed out after {attempt} attempts", "timeout") from exc
+                err = exc
+            except _TRANSIENT_ERRORS as exc:
+                if attempt > settings.RD_MAX_RETRIES:
+                    raise RealityDefenderError(f"{op} failed after {attempt} attempts: {exc!r}", "server_error") from exc
+                err = exc
+            log.warning("Reality Defender call failed, retrying", op=op, attempt=attempt, error=repr(err), delay_s=delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.RD_BACKOFF_MAX_SECONDS)
+
+    async def upload(self, file_path: str) -> str:
+        """Upload a media file and return its request_id."""
+        resp = await self._with_retries(
+            self._upload_slots, "upload", lambda: self._client.upload(file_path=file_path)
+        )
+        return resp["request_id"]
+
+    async def _put_bytes(self, data: BytesLike, filename: str, content_type: str) -> str:
+        # Same two steps as the SDK's upload_file(), minus reading the file from disk.
+        http = self._client.client
+        signed = await get_signed_url(http, filename)
+        request_id = signed.get("requestId", "")
+        signed_url = signed.get("response", {}).get("signedUrl", "")
+        if not request_id or not signed_url:
+            raise RealityDefenderError("Invalid response from API - missing requestId or signedUrl", "server_error")
+        session = await http.ensure_session()
+        body = data if isinstance(data, (bytes, bytearray)) else bytes(data)
+        async with session.put(signed_url, data=body, headers={"Content-Type": content_type}) as resp:
+            if resp.status >= 400:
+                text = await resp.text()
+                raise RealityDefenderError(f"Upload failed with status {resp.status}: {text}", "upload_failed")
+        return request_id
+
+    async def _put_via_file(self, data: BytesLike, filename: str) -> str:
+        # Public API only: spill to a temp file (off the loop) and let the SDK upload it.
+        path = await asyncio.to_thread(_write_temp, data, os.path.splitext(filename)[1])
+        try:
+            resp = await self._client.upload(file_path=path)
+        finally:
+            await asyncio.to_thread(os.unlink, path)
+        return resp["request_id"]
+
+    async def upload_bytes(self, data: BytesLike, filename: str, content_type: str = "audio/wav") -> str:
+        """Upload an in-memory media file (e.g. a WAV built by mulaw_to_wav) and return its request_id."""
+        if len(data) > _MAX_AUDIO_UPLOAD_BYTES:
+            raise RealityDefenderError(f"{filename} is {len(data)} bytes; limit is {_MAX_AUDIO_UPLOAD_BYTES}", "file_too_large")
+        if not self._direct_upload:
+            return await self._with_retries(self._upload_slots, "upload", lambda: self._put_via_file(data, filename))
+        return await self._with_retries(
+            self._upload_slots, "upload", lambda: self._put_bytes(data, filename, content_type)
+        )
+
+    async def wait_for_result(self, request_id: str) -> Dict[str, Any]:
+        """
+        Poll until analysis finishes (or RD_RESULT_TIMEOUT_SECONDS elapses).
+
+        Each poll is a single GET that holds a poll slot only for the round-trip;
+        the wait between polls starts short and backs off, so quick verdicts
+        come back sooner than the SDK's fixed 2s interval.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.RD_RESULT_TIMEOUT_SECONDS
+        interval = settings.RD_POLL_INTERVAL_SECONDS
+        while True:
+            try:
+                # max_attempts=1: return the current state instead of sleeping inside the SDK
+                result = await self._with_retries(
+                    self._poll_slots,
+                    "get_result",
+                    lambda: self._client.get_result(request_id, max_attempts=1),
+                )
+                if result.get("status") not in _IN_PROGRESS:
+                    return result
+            except RealityDefenderError as exc:
+                if exc.code != "not_found":  # not visible yet right after upload
+                    raise
+            if loop.time() + interval > deadline:
+                raise RealityDefenderError(f"No result for {request_id} within timeout", "timeout")
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, settings.RD_POLL_INTERVAL_MAX_SECONDS)
 
     async def analyze_file(self, file_path: str) -> Dict[str, Any]:
         """
@@ -29,14 +170,42 @@ class RealityDefenderService:
 
         Returns the SDK result dict, e.g. {"status": str, "score": float, "models": [...]}
         """
-        resp = await self._client.upload(file_path=file_path)
-        request_id = resp["request_id"]
-        result = await self._client.get_result(request_id)
-        return result
+        request_id = await self.upload(file_path)
+        return await self.wait_for_result(request_id)
+
+    async def aclose(self) -> None:
+        """Close the SDK's HTTP session."""
+        await self._client.cleanup()
+
+
+def _write_temp(data: BytesLike, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+_service: Optional[RealityDefenderService] = None
+
+
+def get_reality_defender() -> RealityDefenderService:
+    """Return the application-wide service, creating it on first use."""
+    global _service
+    if _service is None:
+        _service = RealityDefenderService()
+    return _service
+
+
+async def shutdown_reality_defender() -> None:
+    """Release the shared client (called from the app lifespan)."""
+    global _service
+    if _service is not None:
+        svc, _service = _service, None
+        await svc.aclose()
 
 # For testing...
 async def main(file_path: str) -> None:
-    svc = RealityDefenderService()
+    svc = get_reality_defender()
     print(f"Submitting file to Reality Defender: {file_path}")
     result = await svc.analyze_file(file_path)
     # Pretty-print a concise summary
@@ -63,6 +232,8 @@ async def main(file_path: str) -> None:
             status=status or "",
             score=score,
         )
+    await shutdown_reality_defender()
+    await shutdown_notifier()
 
 
 if __name__ == "__main__":
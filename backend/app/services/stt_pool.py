@@ -0,0 +1,244 @@
+"""
+Process-wide pool of Google Speech gRPC channels shared by all STT sessions.
+
+Building a SpeechAsyncClient per call costs a credentials lookup, a new
+channel and a TLS handshake before the first audio can go out. Instead,
+STT_POOL_SIZE long-lived clients are created once, each on its own channel
+(no shared subchannels, so the HTTP/2 streams really spread out), with the
+credentials loaded once, in a thread: the lookup can block on the GCE
+metadata server. Every streaming_recognize session leases the healthy
+client with the fewest active streams and multiplexes over its channel.
+
+Health: a background check reads each channel's connectivity state
+(asking idle channels to connect) every STT_POOL_HEALTH_SECONDS. A
+channel that stays in TRANSIENT_FAILURE, is shut down, or has sessions
+fail STT_POOL_MAX_FAILURES times in a row is replaced with a fresh one.
+The old channel is closed once its last session ends.
+"""
+import asyncio
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+STT_CHANNEL_REPLACEMENTS = REGISTRY.counter(
+    "trustline_stt_channel_replacements_total", "Speech gRPC channels replaced by the pool, by reason", ("reason",)
+)
+
+# Separate subchannels per pool slot; keepalives detect dead connections between calls
+_CHANNEL_OPTIONS = [
+    ("grpc.use_local_subchannel_pool", 1),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.max_receive_message_length", -1),
+]
+
+
+# What SpeechGrpcAsyncIOTransport.AUTH_SCOPES asks for
+_AUTH_SCOPES = ("https://www.googleapis.com/auth/cloud-platform",)
+
+
+def _default_credentials():
+    """Application default credentials for Speech (blocking: may query the GCE metadata server)."""
+    import google.auth
+
+    credentials, _ = google.auth.default(scopes=_AUTH_SCOPES)
+    return credentials
+
+
+class _Slot:
+    __slots__ = ("index", "client", "active", "failures", "bad_checks")
+
+    def __init__(self, index: int, client) -> None:
+        self.index = index
+        self.client = client
+        self.active = 0
+        self.failures = 0
+        self.bad_checks = 0
+
+
+class SpeechLease:
+    """One session's use of a pooled client; release() exactly once when the stream ends."""
+
+    __slots__ = ("_pool", "_slot", "client", "_released")
+
+    def __init__(self, pool: "SpeechClientPool", slot: _Slot) -> None:
+        self._pool = pool
+        self._slot = slot
+        self.client = slot.client
+        self._released = False
+
+    def ok(self) -> None:
+        """The stream got a response: its channel works."""
+        self._slot.failures = 0
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        if not self._released:
+            self._released = True
+            self._pool._release(self._slot, error)
+
+
+def _channel(client):
+    return getattr(getattr(client, "transport", None), "grpc_channel", None)
+
+
+async def _close_client(client) -> None:
+    try:
+        await client.transport.close()
+    except Exception as exc:
+        log.debug("closing retired speech channel failed", error=repr(exc))
+
+
+class SpeechClientPool:
+    def __init__(self, size: int, health_seconds: float, max_failures: int) -> None:
+        self._size = max(1, size)
+        self._health_seconds = health_seconds
+        self._max_failures = max(1, max_failures)
+        self._slots: List[_Slot] = []
+        self._retired: List[_Slot] = []
+        self._credentials = None
+        self._credentials_lookup: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active_streams(self) -> int:
+        return sum(s.active for s in self._slots) + sum(s.active for s in self._retired)
+
+    async def _load_credentials(self) -> None:
+        """Resolve the credentials once, off the loop; concurrent first leases share the lookup."""
+        if self._credentials is not None:
+            return
+        if self._credentials_lookup is None:
+            self._credentials_lookup = asyncio.ensure_future(asyncio.to_thread(_default_credentials))
+        lookup = self._credentials_lookup
+        try:
+            credentials = await asyncio.shield(lookup)  # a cancelled caller doesn't cancel it for the others
+        except Exception:
+            if self._credentials_lookup is lookup:
+                self._credentials_lookup = None  # the next lease tries again
+            raise
+        self._credentials = credentials
+
+    def _new_client(self):
+        """A SpeechAsyncClient on a channel of its own (on the event loop, after _load_credentials)."""
+        from app.services.google_stt import load_speech_sdk  # google_stt imports this module
+
+        speech = load_speech_sdk()
+        try:
+            from google.cloud.speech_v1.services.speech.transports import SpeechGrpcAsyncIOTransport
+
+            channel = SpeechGrpcAsyncIOTransport.create_channel(credentials=self._credentials, options=_CHANNEL_OPTIONS)
+            return speech.SpeechAsyncClient(transport=SpeechGrpcAsyncIOTransport(channel=channel))
+        except (ImportError, TypeError) as exc:
+            # Older/newer SDK layouts: fall back to the default transport (shared subchannels)
+            log.debug("custom speech transport unavailable; using default", error=repr(exc))
+            return speech.SpeechAsyncClient(credentials=self._credentials)
+
+    async def _fill(self) -> None:
+        await self._load_credentials()
+        while len(self._slots) < self._size:
+            self._slots.append(_Slot(len(self._slots), self._new_client()))
+        self._start_health_checks()
+
+    async def lease(self) -> SpeechLease:
+        """Lease the least-busy client for one streaming_recognize session (channels with recent failures last)."""
+        if len(self._slots) < self._size:
+            await self._fill()
+        slot = min(self._slots, key=lambda s: (s.failures > 0, s.active))
+        slot.active += 1
+        return SpeechLease(self, slot)
+
+    def _release(self, slot: _Slot, error: Optional[BaseException]) -> None:
+        slot.active -= 1
+        if error is not None and slot in self._slots:
+            slot.failures += 1
+            if slot.failures >= self._max_failures:
+                self._replace(slot, "session errors")
+        if slot in self._retired and slot.active == 0:
+            self._retired.remove(slot)
+            asyncio.get_running_loop().create_task(_close_client(slot.client))
+
+    def _replace(self, slot: _Slot, reason: str) -> None:
+        STT_CHANNEL_REPLACEMENTS.inc(reason=reason)
+        log.warning("replacing speech channel", slot=slot.index, reason=reason, active=slot.active)
+        fresh = _Slot(slot.index, self._new_client())
+        self._slots[self._slots.index(slot)] = fresh
+        if slot.active:
+            self._retired.append(slot)  # closed when its last session ends
+        else:
+            asyncio.get_running_loop().create_task(_close_client(slot.client))
+
+    async def warm_up(self, timeout: float = 10.0) -> None:
+        """Create every channel and wait for them to connect (TLS + auth done before the first call)."""
+        await self._fill()
+        ready = [ch.channel_ready() for ch in map(_channel, (s.client for s in self._slots)) if ch is not None]
+        if ready:
+            await asyncio.wait_for(asyncio.gather(*ready), timeout)
+
+    def check_health(self) -> None:
+        """One pass over the channels' connectivity states; replaces ones that stay broken."""
+        import grpc
+
+        states = grpc.ChannelConnectivity
+        for slot in list(self._slots):
+            channel = _channel(slot.client)
+            if channel is None:
+                continue
+            state = channel.get_state(try_to_connect=True)
+            if state == states.SHUTDOWN:
+                self._replace(slot, "shutdown")
+            elif state == states.TRANSIENT_FAILURE:
+                slot.bad_checks += 1
+                if slot.bad_checks >= 2:
+                    self._replace(slot, "transient failure")
+            else:
+                slot.bad_checks = 0
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._health_seconds)
+            try:
+                self.check_health()
+            except Exception as exc:
+                log.warning("speech channel health check failed", error=repr(exc))
+
+    def _start_health_checks(self) -> None:
+        if self._task is None and self._health_seconds > 0:
+            self._task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        slots, self._slots, self._retired = self._slots + self._retired, [], []
+        await asyncio.gather(*(_close_client(s.client) for s in slots))
+
+
+_pool: Optional[SpeechClientPool] = None
+
+REGISTRY.gauge(
+    "trustline_stt_pool_streams", "STT streams per pooled Speech channel", ("slot",),
+    fn=lambda: {(str(s.index),): float(s.active) for s in (_pool._slots if _pool is not None else [])},
+)
+
+
+def get_stt_pool() -> SpeechClientPool:
+    """The process-wide pool (clients are created on first lease or warm_up(), on the event loop)."""
+    global _pool
+    if _pool is None:
+        _pool = SpeechClientPool(
+            size=settings.STT_POOL_SIZE,
+            health_seconds=settings.STT_POOL_HEALTH_SECONDS,
+            max_failures=settings.STT_POOL_MAX_FAILURES,
+        )
+    return _pool
+
+
+async def shutdown_stt_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.aclose()
@@ -0,0 +1,152 @@
+"""
+Supervisor for per-call background tasks, and graceful drain on shutdown.
+
+Work that outlives the media loop iteration that started it (detection
+windows, capture archiving, STT readers flushing their last results) is
+registered here instead of being a bare create_task, so the worker knows
+what is in flight:
+
+- spawn() starts a task and counts it by kind, refusing new ones past
+  TASKS_MAX_IN_FLIGHT (callers treat a refusal like a dropped window);
+  track() registers a task that something else already bounds.
+- On SIGTERM (chained in front of the server's own handler) the worker
+  starts draining: /media refuses new sockets with 1012 ("service
+  restart") so Twilio's next stream lands on another worker, while calls
+  already connected keep running.
+- At lifespan shutdown drain() waits up to SHUTDOWN_DRAIN_SECONDS for the
+  registered tasks, before the Reality Defender / SMS / persistence
+  clients they use are closed, so verdicts in flight still get scored,
+  texted and saved. Whatever is left at the deadline is cancelled.
+
+Counts by kind are exported as trustline_tasks_in_flight{kind}.
+"""
+import asyncio
+import os
+import signal
+import time
+from typing import Any, Coroutine, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+TASKS_REJECTED = REGISTRY.counter(
+    "trustline_tasks_rejected_total", "Background tasks refused because the worker was at TASKS_MAX_IN_FLIGHT", ("kind",)
+)
+
+
+class TaskSupervisor:
+    def __init__(self, max_in_flight: int) -> None:
+        self._max_in_flight = max(1, max_in_flight)
+        self._tasks: Dict[asyncio.Task, str] = {}
+        self._counts: Dict[str, int] = {}
+        self._capped: Set[asyncio.Task] = set()  # spawn()ed tasks, counted against the cap
+        self.draining = False
+        self._previous_handler: Any = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def _register(self, task: asyncio.Task, kind: str) -> None:
+        self._tasks[task] = kind
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        kind = self._tasks.pop(task, None)
+        if kind is not None:
+            self._counts[kind] -= 1
+        self._capped.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("background task failed", kind=kind, error=repr(task.exception()))
+
+    def spawn(self, coro: Coroutine, kind: str) -> Optional[asyncio.Task]:
+        """Run `coro` as a supervised task, or close it and return None when at the cap."""
+        if len(self._capped) >= self._max_in_flight:
+            coro.close()
+            TASKS_REJECTED.inc(kind=kind)
+            return None
+        task = asyncio.create_task(coro)
+        self._capped.add(task)
+        self._register(task, kind)
+        return task
+
+    def track(self, task: asyncio.Task, kind: str) -> asyncio.Task:
+        """Register an already-created task (not counted against the cap)."""
+        if not task.done():
+            self._register(task, kind)
+        return task
+
+    # --- shutdown ---
+
+    def begin_drain(self) -> None:
+        if not self.draining:
+            self.draining = True
+            log.info("draining: refusing new media streams", in_flight=self.counts())
+
+    def install_signal_handler(self) -> None:
+        """Start draining on SIGTERM, then hand the signal on to the server's handler."""
+
+        def on_sigterm(signum, frame) -> None:
+            self.begin_drain()
+            if callable(self._previous_handler):
+                self._previous_handler(signum, frame)
+            elif self._previous_handler == signal.SIG_DFL:
+                # Nobody else handles it: terminate as the default action would
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+
+        try:
+            self._previous_handler = signal.signal(signal.SIGTERM, on_sigterm)
+        except ValueError:
+            log.warning("not in the main thread; SIGTERM will not start an early drain")
+
+    def restore_signal_handler(self) -> None:
+        if self._previous_handler is not None:
+            signal.signal(signal.SIGTERM, self._previous_handler)
+            self._previous_handler = None
+
+    async def drain(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds for registered tasks, then cancel the rest."""
+        self.begin_drain()
+        t = time.monotonic()
+        # Tasks may register more work as they finish (an STT reader's last transcript, say)
+        while self._tasks and time.monotonic() - t < timeout:
+            await asyncio.wait(list(self._tasks), timeout=timeout - (time.monotonic() - t))
+        left = list(self._tasks)
+        if left:
+            log.warning("drain deadline reached; cancelling tasks", remaining=self.counts())
+            for task in left:
+                task.cancel()
+            await asyncio.gather(*left, return_exceptions=True)
+        log.info("drain finished", seconds=round(time.monotonic() - t, 2), cancelled=len(left))
+
+
+_supervisor: Optional[TaskSupervisor] = None
+
+REGISTRY.gauge(
+    "trustline_tasks_in_flight", "Supervised per-call background tasks by kind", ("kind",),
+    fn=lambda: {(k,): float(n) for k, n in (_supervisor.counts() if _supervisor is not None else {}).items()},
+)
+
+
+def get_task_supervisor() -> TaskSupervisor:
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = TaskSupervisor(settings.TASKS_MAX_IN_FLIGHT)
+    return _supervisor
+
+
+async def shutdown_task_supervisor(timeout: float) -> None:
+    """Drain (see TaskSupervisor.drain) and put the server's SIGTERM handler back."""
+    global _supervisor
+    if _supervisor is not None:
+        _supervisor.restore_signal_handler()
+        await _supervisor.drain(timeout)  # still the live instance: tasks finishing may spawn follow-ups
+        _supervisor = None
@@ -0,0 +1,89 @@
+"""
+Prebuilt TwiML for the voice webhook.
+
+The webhook's answer only depends on whether detection is on, the media
+WebSocket URL, and (with forwarding on) which number the call is forwarded
+to, so every variant is rendered once and inbound calls get a cached XML
+string instead of a fresh VoiceResponse tree per call.
+
+Variants are keyed by (detection enabled, forward target). Flipping
+detection just selects the other prebuilt document. Settings are read once
+at startup, so nothing else can make a document stale.
+
+Forwarding (FORWARD_CALLS_ENABLED) dials the tenant number configured for
+the called number in FORWARD_NUMBERS ("+1555...=+1666...,..."), falling
+back to FORWARD_TO_NUMBER.
+"""
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app.core.config import settings
+
+MONITORING_NOTICE = "This call may be monitored and transcribed for demo purposes."
+DISABLED_NOTICE = "Streaming is currently disabled."
+HOLD_SECONDS = 60
+
+
+def forward_target(called: Optional[str]) -> str:
+    """The number to dial for a call to `called` ("" when forwarding is off or unconfigured)."""
+    if not settings.FORWARD_CALLS_ENABLED:
+        return ""
+    return settings.FORWARD_NUMBERS.get(called or "", settings.FORWARD_TO_NUMBER or "")
+
+
+def called_number(body: bytes) -> Optional[str]:
+    """The "To" field of Twilio's form-encoded webhook body."""
+    values = parse_qs(body.decode("utf-8", "replace")).get("To")
+    return values[0] if values else None
+
+
+def build_twiml(enabled: bool, forward_to: str = "") -> str:
+    from twilio.twiml.voice_response import Dial, Say, Start, Stream, VoiceResponse  # only when (re)building
+
+    vr = VoiceResponse()
+    if enabled:
+        # Start media streaming to our /media WebSocket, with a brief notice for compliance
+        start = Start()
+        start.append(Stream(url=settings.PUBLIC_WS_MEDIA_URL))
+        vr.append(start)
+        vr.append(Say(MONITORING_NOTICE))
+    elif not forward_to:
+        vr.append(Say(DISABLED_NOTICE))
+    if forward_to:
+        dial = Dial(caller_id=settings.TWILIO_PHONE_NUMBER)
+        dial.number(forward_to)
+        vr.append(dial)
+    elif enabled:
+        # No forwarding (testing): keep the call open so there is audio to analyze
+        vr.pause(length=HOLD_SECONDS)
+    return str(vr)
+
+
+class TwimlCache:
+    def __init__(self) -> None:
+        self._docs: Dict[Tuple[bool, str], str] = {}
+
+    def get(self, enabled: bool, forward_to: str = "") -> str:
+        doc = self._docs.get((enabled, forward_to))
+        if doc is None:
+            # Forward targets come from settings, so the number of variants is bounded
+            doc = self._docs[(enabled, forward_to)] = build_twiml(enabled, forward_to)
+        return doc
+
+    def warm(self) -> int:
+        """Render every configured variant up front; returns how many there are."""
+        targets = {forward_target(None)} | {forward_target(n) for n in settings.FORWARD_NUMBERS}
+        for target in targets:
+            for enabled in (True, False):
+                self.get(enabled, target)
+        return len(self._docs)
+
+
+_cache: Optional[TwimlCache] = None
+
+
+def get_twiml_cache() -> TwimlCache:
+    global _cache
+    if _cache is None:
+        _cache = TwimlCache()
+    return _cache
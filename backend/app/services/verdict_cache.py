@@ -0,0 +1,264 @@
+"""
+Verdict cache for repeat robocall audio.
+
+Scam campaigns replay the same synthetic prompts to many numbers. Each
+detection window is fingerprinted (audio_pipeline.audio_fingerprint) and
+looked up here before it is uploaded; a hit returns the earlier verdict in
+milliseconds with no Reality Defender call.
+
+Lookups are by word votes, not by exact key: every fingerprint word of
+the query that also appears in a stored fingerprint votes for that entry
+at the implied time offset. An entry wins when enough votes agree on one
+offset, so a capture that starts a few seconds into the same recording
+(or is quieter, or noisier) still hits.
+
+Backends (VERDICT_CACHE_BACKEND):
+- "memory": in-process, LRU + TTL eviction
+- "sqlite": local file (VERDICT_CACHE_PATH), shared by workers on one host
+- "off": disabled
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+Verdict = Dict[str, Any]
+
+# Words carrying no spectral information (steady tones, digital silence)
+_DEGENERATE_WORDS = {0, 0xFFFFFF}
+# Words seen in more stored fingerprints than this are not discriminative
+_MAX_POSTINGS_PER_WORD = 64
+# Only definite outcomes are worth reusing
+_CACHEABLE_STATUSES = {"AUTHENTIC", "MANIPULATED"}
+
+
+def _usable_words(words: List[int]) -> Iterable[Tuple[int, int]]:
+    return ((pos, w) for pos, w in enumerate(words) if w not in _DEGENERATE_WORDS)
+
+
+def _best_match(votes: Counter, min_votes: int) -> Optional[int]:
+    """Entry id with the most votes at one offset (merging adjacent offsets), if above min_votes."""
+    best_id, best = None, 0
+    for (entry_id, offset), n in votes.items():
+        n += votes.get((entry_id, offset + 1), 0)  # misaligned captures split across neighbours
+        if n > best:
+            best_id, best = entry_id, n
+    return best_id if best >= min_votes else None
+
+
+def _min_votes(query_words: int) -> int:
+    return max(settings.VERDICT_CACHE_MIN_MATCHES, int(query_words * settings.VERDICT_CACHE_MIN_MATCH_RATIO))
+
+
+class InMemoryVerdictStore:
+    """Process-local store: LRU order in an OrderedDict plus an inverted word index."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Verdict, List[int]]]" = OrderedDict()
+        self._index: Dict[int, List[Tuple[int, int]]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, entry_id: int) -> None:
+        _, _, words = self._entries.pop(entry_id)
+        for w in set(words):
+            postings = self._index.get(w)
+            if postings is None:
+                continue
+            postings[:] = [p for p in postings if p[0] != entry_id]
+            if not postings:
+                del self._index[w]
+
+    def match(self, words: List[int]) -> Optional[Verdict]:
+        votes: Counter = Counter()
+        for pos, w in _usable_words(words):
+            postings = self._index.get(w)
+            if postings and len(postings) <= _MAX_POSTINGS_PER_WORD:
+                for entry_id, entry_pos in postings:
+                    votes[(entry_id, entry_pos - pos)] += 1
+        entry_id = _best_match(votes, _min_votes(len(words)))
+        if entry_id is None:
+            return None
+        created, verdict, _ = self._entries[entry_id]
+        if time.time() - created > self._ttl:
+            self._remove(entry_id)
+            return None
+        self._entries.move_to_end(entry_id)
+        return verdict
+
+    def add(self, words: List[int], verdict: Verdict) -> None:
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (time.time(), verdict, words)
+        for pos, w in _usable_words(words):
+            self._index.setdefault(w, []).append((entry_id, pos))
+        while len(self._entries) > self._max:
+            self._remove(next(iter(self._entries)))
+
+
+class SQLiteVerdictStore:
+    """
+    File-backed store (one SQLite database per host). Access is serialized by a
+    lock; VerdictCache runs these calls in a worker thread.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float) -> None:
+        self._max = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fp_entries (
+                id INTEGER PRIMARY KEY,
+                created REAL NOT NULL,
+                last_hit REAL NOT NULL,
+                verdict TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fp_words (
+                word INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL REFERENCES fp_entries(id) ON DELETE CASCADE,
+                pos INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_fp_words_word ON fp_words(word);
+            CREATE INDEX IF NOT EXISTS ix_fp_words_entry ON fp_words(entry_id);
+            CREATE INDEX IF NOT EXISTS ix_fp_entries_last_hit ON fp_entries(last_hit);
+            """
+        )
+        self._db.execute("PRAGMA foreign_keys=ON")
+
+    def match(self, words: List[int]) -> Optional[Verdict]:
+        positions: Dict[int, List[int]] = {}
+        for pos, w in _usable_words(words):
+            positions.setdefault(w, []).append(pos)
+        if not positions:
+            return None
+        votes: Counter = Counter()
+        uniq = list(positions)
+        with self._lock:
+            for i in range(0, len(uniq), 500):  # stay under SQLite's bound-parameter limit
+                batch = uniq[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT word, entry_id, pos FROM fp_words WHERE word IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                per_word = Counter(r[0] for r in rows)
+                for w, entry_id, entry_pos in rows:
+                    if per_word[w] <= _MAX_POSTINGS_PER_WORD:
+                        for pos in positions[w]:
+                            votes[(entry_id, entry_pos - pos)] += 1
+            entry_id = _best_match(votes, _min_votes(len(words)))
+            if entry_id is None:
+                return None
+            row = self._db.execute("SELECT created, verdict FROM fp_entries WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[0] > self._ttl:
+                self._db.execute("DELETE FROM fp_entries WHERE id = ?", (entry_id,))
+                return None
+            self._db.execute("UPDATE fp_entries SET last_hit = ? WHERE id = ?", (now, entry_id))
+            return json.loads(row[1])
+
+    def add(self, words: List[int], verdict: Verdict) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                cur = self._db.execute(
+                    "INSERT INTO fp_entries (created, last_hit, verdict) VALUES (?, ?, ?)",
+                    (now, now, json.dumps(verdict)),
+                )
+                entry_id = cur.lastrowid
+                self._db.executemany(
+                    "INSERT INTO fp_words (word, entry_id, pos) VALUES (?, ?, ?)",
+                    ((w, entry_id, pos) for pos, w in _usable_words(words)),
+                )
+                # TTL first, then LRU down to the size cap
+                self._db.execute("DELETE FROM fp_entries WHERE created < ?", (now - self._ttl,))
+                self._db.execute(
+                    "DELETE FROM fp_entries WHERE id IN ("
+                    " SELECT id FROM fp_entries ORDER BY last_hit DESC LIMIT -1 OFFSET ?)",
+                    (self._max,),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class VerdictCache:
+    """Async facade over a store; SQLite work runs in a thread so the loop never blocks on disk."""
+
+    def __init__(self, store) -> None:
+        self._store = store
+        self._threaded = isinstance(store, SQLiteVerdictStore)
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, words: List[int]) -> Optional[Verdict]:
+        if not words:
+            return None
+        if self._threaded:
+            verdict = await asyncio.to_thread(self._store.match, words)
+        else:
+            verdict = self._store.match(words)
+        if verdict is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(verdict, cached=True)
+
+    async def store(self, words: List[int], verdict: Verdict) -> None:
+        if not words or (verdict.get("status") or "").upper() not in _CACHEABLE_STATUSES:
+            return
+        entry = {k: verdict.get(k) for k in ("status", "score", "request_id")}
+        if self._threaded:
+            await asyncio.to_thread(self._store.add, words, entry)
+        else:
+            self._store.add(words, entry)
+
+    def close(self) -> None:
+        if self._threaded:
+            self._store.close()
+
+
+_cache: Optional[VerdictCache] = None
+
+
+def get_verdict_cache() -> Optional[VerdictCache]:
+    """The process-wide cache per VERDICT_CACHE_BACKEND, or None when disabled."""
+    global _cache
+    backend = settings.VERDICT_CACHE_BACKEND
+    if _cache is None and backend != "off":
+        if backend == "sqlite":
+            store = SQLiteVerdictStore(
+                settings.VERDICT_CACHE_PATH, settings.VERDICT_CACHE_MAX_ENTRIES, settings.VERDICT_CACHE_TTL_SECONDS
+            )
+        elif backend == "memory":
+            store = InMemoryVerdictStore(settings.VERDICT_CACHE_MAX_ENTRIES, settings.VERDICT_CACHE_TTL_SECONDS)
+        else:
+            raise ValueError(f"unknown VERDICT_CACHE_BACKEND {backend!r}; expected memory, sqlite or off")
+        _cache = VerdictCache(store)
+    return _cache
+
+
+def shutdown_verdict_cache() -> None:
+    global _cache
+    if _cache is not None:
+        cache, _cache = _cache, None
+        cache.close()
@@ -0,0 +1,71 @@
+"""
+Background warm-up of the external SDK clients after worker start.
+
+The SDKs are imported lazily (see load_speech_sdk, reality_defender.load_sdk,
+notifier._get_client), so a worker starts serving almost at once. The
+lifespan then starts warm_up_clients() in the background: each SDK is
+imported in a thread (keeping the loop free), its shared client is
+built, and the pooled Speech gRPC channels are connected, so the first call does
+not pay for imports, credential loading or the TLS handshake.
+
+Each step is timed into trustline_startup_step_seconds{step}; a step that
+fails (no credentials, network) is logged and retried lazily by the
+first call that needs it.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import REGISTRY
+from app.services import google_stt, notifier, reality_defender
+from app.services.stt_pool import get_stt_pool
+
+log = get_logger(__name__)
+
+STARTUP_STEP_SECONDS = REGISTRY.gauge(
+    "trustline_startup_step_seconds", "Duration of each client warm-up step at worker start", ("step",)
+)
+
+
+async def _step(name: str, fn: Callable[[], Awaitable[None]]) -> None:
+    t = time.perf_counter()
+    try:
+        await fn()
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        log.warning("warm-up step failed; the first call will retry it", step=name, error=repr(exc))
+        return
+    elapsed = time.perf_counter() - t
+    STARTUP_STEP_SECONDS.set(elapsed, step=name)
+    log.info("warm-up step done", step=name, elapsed_ms=round(elapsed * 1e3, 1))
+
+
+async def _warm_speech() -> None:
+    await asyncio.to_thread(google_stt.load_speech_sdk)
+    await get_stt_pool().warm_up(timeout=10.0)  # on the loop: grpc.aio channels bind to it
+
+
+async def _warm_reality_defender() -> None:
+    await asyncio.to_thread(reality_defender.load_sdk)
+    reality_defender.get_reality_defender()
+
+
+async def _warm_twilio() -> None:
+    await asyncio.to_thread(notifier._get_client)
+
+
+async def warm_up_clients() -> None:
+    """Import SDKs and build the shared clients; meant to run as a background task."""
+    t = time.perf_counter()
+    if settings.validate_google_config():
+        await _step("speech", _warm_speech)
+    if settings.REALITY_DEFENDER_API_KEY:
+        await _step("reality_defender", _warm_reality_defender)
+    else:
+        log.warning("REALITY_DEFENDER_API_KEY not set; detection uploads will fail")
+    if notifier._twilio_configured():
+        await _step("twilio", _warm_twilio)
+    STARTUP_STEP_SECONDS.set(time.perf_counter() - t, step="total")
@@ -0,0 +1,64 @@
+"""
+Benchmark: event-loop lag while a burst of detection windows is prepared.
+
+Simulates N calls whose 10s windows come due at the same moment: each is
+WAV-encoded and fingerprinted through AudioWorkExecutor while a 20ms
+ticker (standing in for live media frames) measures how late the loop runs.
+
+Run from backend/:
+  python -m benchmarks.bench_audio_executor [--windows 16] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+from app.services.audio_pipeline import BYTES_PER_SECOND, AudioWorkExecutor
+
+WINDOW_SECONDS = 10
+
+
+async def _ticker(lag: List[float], stop: asyncio.Event, period: float = 0.02) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(period)
+        lag.append(max(0.0, loop.time() - t - period))
+
+
+async def run(kind: str, workers: int, windows: List[bytes]) -> dict:
+    executor = AudioWorkExecutor(kind, workers)
+    executor.warm_up()
+    await executor.wav_and_fingerprint(windows[0])  # workers fully started
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lag, stop))
+    await asyncio.sleep(0.1)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(executor.wav_and_fingerprint(w) for w in windows))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await ticker
+    executor.shutdown()
+    lag.sort()
+    return {"elapsed": elapsed, "max_lag": lag[-1], "p99_lag": lag[int(len(lag) * 0.99)]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--windows", type=int, default=16, help="windows due at once")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    args = parser.parse_args()
+
+    windows = [os.urandom(WINDOW_SECONDS * BYTES_PER_SECOND) for _ in range(args.windows)]
+    print(f"{args.windows} x {WINDOW_SECONDS}s windows, {args.workers} workers")
+    print(f"{'executor':>8} {'burst':>9} {'p99 lag':>9} {'max lag':>9}")
+    for kind in AudioWorkExecutor.KINDS:
+        r = asyncio.run(run(kind, args.workers, windows))
+        print(f"{kind:>8} {r['elapsed'] * 1e3:7.0f}ms {r['p99_lag'] * 1e3:7.1f}ms {r['max_lag'] * 1e3:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: per-frame cost of parsing Twilio media-stream messages.
+
+Compares the old path (json.loads + nested .get + base64.b64decode) with
+app.services.media_stream.parse_message on a Twilio message sequence, and
+with parse_message copying each payload into one preallocated buffer (the
+"decode into a reusable buffer" variant, kept here to show it does not pay).
+
+By default a synthetic call is generated in Twilio's exact wire format
+(connected/start, 20ms media frames with periodic marks, stop). To use
+recorded traffic, pass a file with one raw WebSocket text message per line:
+  python -m benchmarks.bench_media_parse [--file capture.jsonl] [--seconds 60]
+"""
+import argparse
+import base64
+import binascii
+import json
+import os
+import time
+from typing import List
+
+from app.services.media_stream import _fast_payload, parse_message
+
+
+def synthetic_call(seconds: int, call_sid: str = "CA" + "0" * 32, stream_sid: str = "MZ" + "0" * 32) -> List[str]:
+    """Twilio message sequence for one call, serialized the way Twilio sends it."""
+    msgs = [
+        json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}, separators=(",", ":")),
+        json.dumps(
+            {
+                "event": "start",
+                "sequenceNumber": "1",
+                "start": {
+                    "accountSid": "AC" + "0" * 32,
+                    "streamSid": stream_sid,
+                    "callSid": call_sid,
+                    "tracks": ["inbound"],
+                    "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+                },
+                "streamSid": stream_sid,
+            },
+            separators=(",", ":"),
+        ),
+    ]
+    seq = 2
+    for chunk in range(1, seconds * 50 + 1):
+        payload = base64.b64encode(os.urandom(160)).decode()
+        msgs.append(
+            json.dumps(
+                {
+                    "event": "media",
+                    "sequenceNumber": str(seq),
+                    "media": {"track": "inbound", "chunk": str(chunk), "timestamp": str(chunk * 20), "payload": payload},
+                    "streamSid": stream_sid,
+                },
+                separators=(",", ":"),
+            )
+        )
+        seq += 1
+        if chunk % 250 == 0:
+            msgs.append(json.dumps({"event": "mark", "sequenceNumber": str(seq), "streamSid": stream_sid,
+                                    "mark": {"name": f"m{chunk}"}}, separators=(",", ":")))
+            seq += 1
+    msgs.append(json.dumps({"event": "stop", "sequenceNumber": str(seq), "streamSid": stream_sid,
+                            "stop": {"accountSid": "AC" + "0" * 32, "callSid": call_sid}}, separators=(",", ":")))
+    return msgs
+
+
+def legacy_parse(raw: str):
+    """What media_ws did per message before the fast path."""
+    msg = json.loads(raw)
+    event = msg.get("event")
+    if event == "media":
+        payload_b64 = msg.get("media", {}).get("payload")
+        return event, base64.b64decode(payload_b64)
+    return event, msg
+
+
+def reusable_buffer_parse(raw: str, _buf: memoryview = memoryview(bytearray(4096))):
+    """The fast path, but handing out a view of one reused buffer instead of a fresh bytes.
+
+    binascii has no decode-into call, so this still allocates the decoded bytes and
+    then copies them once more into the buffer.
+    """
+    payload = _fast_payload(raw)
+    if payload is None:
+        return parse_message(raw)
+    decoded = binascii.a2b_base64(payload)
+    n = len(decoded)
+    _buf[:n] = decoded
+    return "media", _buf[:n], None
+
+
+def _time(fn, msgs: List[str], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for raw in msgs:
+            fn(raw)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="recorded messages, one raw WebSocket text frame per line")
+    parser.add_argument("--seconds", type=int, default=60, help="length of the synthetic call")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            msgs = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        msgs = synthetic_call(args.seconds)
+
+    for raw in msgs:  # both paths must agree on event and audio
+        old, new = legacy_parse(raw), parse_message(raw)
+        assert old[0] == new.event
+        if new.event == "media":
+            assert old[1] == new.audio
+
+    t_old = _time(legacy_parse, msgs)
+    t_new = _time(parse_message, msgs)
+    t_buf = _time(reusable_buffer_parse, msgs)
+    n = len(msgs)
+    print(f"{n} messages")
+    print(f"legacy: {t_old / n * 1e6:6.2f} us/msg")
+    print(f"fast:   {t_new / n * 1e6:6.2f} us/msg  ({t_old / t_new:.1f}x)")
+    print(f"buffer: {t_buf / n * 1e6:6.2f} us/msg  ({t_old / t_buf:.1f}x, fast path + copy into a reused buffer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: worker import / startup time, and which SDKs load eagerly.
+
+Each run is a fresh interpreter (as a new uvicorn worker would be):
+- import time of the app module (median of --runs)
+- heavy SDKs present in sys.modules right after import; these should only
+  load during lifespan warm-up or on first use
+- the modules with the highest own import time (python -X importtime)
+- with --lifespan, time until the app's lifespan reaches `yield` (ready to serve)
+
+Exits non-zero when --max-import-ms is exceeded or an SDK is imported
+eagerly, so it can gate CI.
+
+Run from backend/:
+  python -m benchmarks.bench_startup [--runs 5] [--lifespan] [--max-import-ms 1500]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Imported lazily by the app; finding one of these after `import app.main` is a regression
+HEAVY_MODULES = ("google.cloud.speech", "grpc", "realitydefender", "twilio.rest", "aiohttp")
+
+_IMPORT_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_LIFESPAN_PROBE = """
+import asyncio, json, time
+t = time.perf_counter()
+from app.main import app, lifespan
+imported = time.perf_counter() - t
+
+async def ready_after():
+    t = time.perf_counter()
+    async with lifespan(app):
+        ready = time.perf_counter() - t
+    return ready
+
+ready = asyncio.run(ready_after())
+print(json.dumps({"import": imported, "ready": ready}))
+"""
+
+
+def _run(code: str, *flags: str) -> Tuple[dict, str]:
+    proc = subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"probe failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def _slowest(importtime_log: str, top: int) -> List[Tuple[int, int, str]]:
+    """(self us, cumulative us, module) for the modules that cost the most to import themselves."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.partition(":")[2].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--lifespan", action="store_true", help="also time lifespan start-up (needs app.main)")
+    parser.add_argument("--max-import-ms", type=float, default=0, help="fail above this median import time")
+    args = parser.parse_args()
+
+    probe = _IMPORT_PROBE.format(module=args.module, heavy=HEAVY_MODULES)
+    results = [_run(probe)[0] for _ in range(args.runs)]
+    median_ms = statistics.median(r["seconds"] for r in results) * 1e3
+    eager = sorted({m for r in results for m in r["loaded"]})
+    print(f"import {args.module}: median {median_ms:.0f}ms over {args.runs} runs")
+    print(f"SDKs loaded eagerly: {', '.join(eager) if eager else 'none'}")
+
+    _, log = _run(probe, "-X", "importtime")
+    print(f"{'self':>10} {'cumulative':>10}  module")
+    for self_us, cumulative_us, name in _slowest(log, args.top):
+        print(f"{self_us / 1e3:8.1f}ms {cumulative_us / 1e3:8.1f}ms  {name}")
+
+    if args.lifespan:
+        r, _ = _run(_LIFESPAN_PROBE)
+        print(f"lifespan ready: {r['ready'] * 1e3:.0f}ms after a {r['import'] * 1e3:.0f}ms import")
+
+    failed = bool(eager) or (args.max_import_ms and median_ms > args.max_import_ms)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
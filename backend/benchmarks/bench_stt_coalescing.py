@@ -0,0 +1,67 @@
+"""
+Benchmark: STT request volume and cost with and without frame coalescing.
+
+Replays one minute of 20ms Twilio frames through FrameCoalescer and the
+AsyncGoogleSTTStreamer queue, builds the StreamingRecognizeRequest each
+chunk would become, and reports request count, CPU time and on-the-wire
+bytes (protobuf + gRPC/HTTP2 per-message framing).
+
+Run from backend/ (needs google-cloud-speech installed, no credentials):
+  python -m benchmarks.bench_stt_coalescing
+"""
+import asyncio
+import os
+import time
+
+from google.cloud import speech
+
+from app.services.audio_pipeline import FrameCoalescer
+from app.services.google_stt import _BoundedAudioQueue
+
+FRAME_BYTES = 160  # 20ms of μ-law at 8 kHz
+SECONDS = 60
+# 5-byte gRPC length prefix + 9-byte HTTP/2 DATA frame header per message
+GRPC_FRAMING_BYTES = 5 + 9
+
+
+async def run(chunk_ms: int, frames) -> dict:
+    coalescer = FrameCoalescer(chunk_ms=chunk_ms, max_delay_ms=250)
+    queue = _BoundedAudioQueue(max_chunks=len(frames) + 1, policy="drop_oldest")
+    requests = 0
+    wire = 0
+
+    t0 = time.process_time()
+    for frame in frames:
+        chunk = coalescer.push(frame)
+        if chunk is not None:
+            await queue.put(chunk)
+    tail = coalescer.flush()
+    if tail is not None:
+        await queue.put(tail)
+    queue.close()
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            break
+        req = speech.StreamingRecognizeRequest(audio_content=chunk)
+        wire += len(speech.StreamingRecognizeRequest.serialize(req)) + GRPC_FRAMING_BYTES
+        requests += 1
+    cpu = time.process_time() - t0
+    return {"requests": requests, "cpu_ms": cpu * 1e3, "wire_bytes": wire}
+
+
+def main() -> None:
+    frames = [os.urandom(FRAME_BYTES) for _ in range(SECONDS * 50)]
+    print(f"{SECONDS}s call, {len(frames)} frames")
+    print(f"{'chunk':>8} {'requests':>9} {'req/s':>6} {'cpu':>9} {'wire bytes':>11}")
+    for chunk_ms in (0, 100, 160, 250):
+        r = asyncio.run(run(chunk_ms, frames))
+        label = "per-frame" if chunk_ms == 0 else f"{chunk_ms}ms"
+        print(
+            f"{label:>8} {r['requests']:>9} {r['requests'] / SECONDS:>6.0f} "
+            f"{r['cpu_ms']:>7.1f}ms {r['wire_bytes']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: STT session-start latency, per-call clients vs the shared channel pool.
+
+Opens --sessions streaming_recognize sessions (--concurrency at a time),
+feeding each one 20ms frames of audio in real time, and times each
+one from the moment it opens (the Twilio `start` event in production) to
+its first response. The measurement matches
+trustline_stt_session_start_seconds.
+
+- per-call: a new SpeechAsyncClient per session, which is how the streamer
+  used to work (credentials, channel and TLS handshake on every call)
+- pool: sessions lease a client from SpeechClientPool, warmed up first as
+  the lifespan does
+
+Needs google-cloud-speech, GOOGLE_APPLICATION_CREDENTIALS and network.
+--file is raw 8 kHz μ-law, or an 8 kHz 16-bit WAV such as an archived
+capture, of someone speaking; Google only answers once it hears speech,
+so use a recording that starts with it.
+
+Run from backend/:
+  python -m benchmarks.bench_stt_session_start --file speech.wav [--mode both] [--sessions 20] [--concurrency 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import wave
+from typing import List, Tuple
+
+from app.services.google_stt import _encoding, load_speech_sdk
+from app.services.stt_pool import SpeechClientPool
+
+
+def _load_audio(path: str) -> Tuple[str, bytes]:
+    """(encoding, audio): .wav files are read as LINEAR16, anything else as raw μ-law."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as w:
+            return "LINEAR16", w.readframes(w.getnframes())
+    with open(path, "rb") as f:
+        return "MULAW", f.read()
+
+
+async def _session(client, encoding: str, audio: bytes) -> float:
+    speech = load_speech_sdk()
+    config = speech.StreamingRecognitionConfig(
+        config=speech.RecognitionConfig(encoding=_encoding(encoding), sample_rate_hertz=8000, language_code="en-US"),
+        interim_results=True,
+    )
+    frame_bytes = 160 if encoding == "MULAW" else 320  # 20ms at 8 kHz
+
+    async def requests():
+        yield speech.StreamingRecognizeRequest(streaming_config=config)
+        for i in range(0, len(audio), frame_bytes):
+            yield speech.StreamingRecognizeRequest(audio_content=audio[i : i + frame_bytes])
+            await asyncio.sleep(0.02)
+
+    t = time.perf_counter()
+    stream = await client.streaming_recognize(requests=requests())
+    try:
+        async for _ in stream:
+            return time.perf_counter() - t
+    finally:
+        stream.cancel()
+    raise RuntimeError("stream ended without a response (no speech in --file?)")
+
+
+async def run(mode: str, audio: Tuple[str, bytes], sessions: int, concurrency: int, timeout: float) -> List[float]:
+    speech = load_speech_sdk()
+    pool = None
+    if mode == "pool":
+        pool = SpeechClientPool(size=2, health_seconds=0, max_failures=3)
+        await pool.warm_up()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one() -> float:
+        async with gate:
+            if pool is not None:
+                lease = await pool.lease()
+                try:
+                    return await asyncio.wait_for(_session(lease.client, *audio), timeout)
+                finally:
+                    lease.release()
+            # The per-call timing includes building the client, as the old streamer did
+            t = time.perf_counter()
+            client = speech.SpeechAsyncClient()
+            try:
+                return time.perf_counter() - t + await asyncio.wait_for(_session(client, *audio), timeout)
+            finally:
+                await client.transport.close()
+
+    try:
+        return await asyncio.gather(*(one() for _ in range(sessions)))
+    finally:
+        if pool is not None:
+            await pool.aclose()
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", required=True, help="8 kHz μ-law speech (raw or .wav)")
+    parser.add_argument("--mode", choices=("per-call", "pool", "both"), default="both")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    args = parser.parse_args()
+
+    audio = _load_audio(args.file)
+    modes = ("per-call", "pool") if args.mode == "both" else (args.mode,)
+    print(f"{'mode':>9} {'sessions':>9} {'p50':>8} {'p95':>8} {'max':>8}")
+    for mode in modes:
+        times = asyncio.run(run(mode, audio, args.sessions, args.concurrency, args.timeout))
+        print(
+            f"{mode:>9} {len(times):>9} {statistics.median(times) * 1e3:>6.0f}ms "
+            f"{_pct(times, 0.95) * 1e3:>6.0f}ms {max(times) * 1e3:>6.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
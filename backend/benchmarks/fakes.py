@@ -0,0 +1,194 @@
+"""
+Local stand-ins for the external services the /media pipeline talks to.
+
+Each fake keeps the real class's interface and only adds latency (mean
+seconds, +/- `jitter` as a fraction), so the load tool exercises the real
+scheduling, queueing and notification code without credentials or network:
+
+- FakeSTTStreamer: AsyncGoogleSTTStreamer (and the threaded GoogleSTTStreamer's
+  start/write/close surface); emits interim results per second of audio and
+  a final result per utterance
+- FakeRealityDefenderService: RealityDefenderService (upload + verdict latency)
+- fake_send_sms_factory: notifier._send_once, used by the SMS dispatcher and send_sms (Twilio REST round-trip)
+
+install() patches them into the app modules and returns a FakeRecorder that
+collects per-call timings.
+"""
+import asyncio
+import itertools
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.audio_pipeline import BYTES_PER_SECOND, BytesLike
+
+_SENTENCES = [
+    "hello this is a courtesy call about your account",
+    "we noticed some suspicious activity on your account",
+    "can you confirm your date of birth for me",
+    "you will need to buy a gift card to settle the balance",
+    "please don't tell anyone about this call",
+    "thank you for your time have a nice day",
+]
+_CALL_SID_RE = re.compile(r"CA[0-9a-fA-F]{32}")
+
+
+def _jittered(mean: float, jitter: float) -> float:
+    return max(0.0, mean * random.uniform(1.0 - jitter, 1.0 + jitter))
+
+
+class FakeRecorder:
+    """Wall-clock times (time.time(), comparable across processes) of the first verdict / SMS per call SID."""
+
+    def __init__(self) -> None:
+        self.verdicts: Dict[str, float] = {}
+        self.sms: Dict[str, float] = {}
+        self.analyses = 0
+        self.sms_sent = 0
+        self.stt_chunks = 0
+
+    def verdict(self, call_sid: str) -> None:
+        self.analyses += 1
+        self.verdicts.setdefault(call_sid, time.time())
+
+    def sent(self, body: str) -> None:
+        self.sms_sent += 1
+        m = _CALL_SID_RE.search(body)
+        if m:
+            self.sms.setdefault(m.group(0), time.time())
+
+
+class FakeSTTStreamer:
+    """Drop-in for AsyncGoogleSTTStreamer: results arrive `latency` s after the audio that produced them."""
+
+    latency = 0.3
+    jitter = 0.3
+    recorder: Optional[FakeRecorder] = None
+    queue_depth = 0
+    dropped_bytes = 0
+
+    def __init__(self, **_: Any) -> None:
+        self._callback: Optional[Callable[[str, bool], None]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._audio = 0
+        self._words: List[str] = []
+        self._sentences = itertools.cycle(random.sample(_SENTENCES, len(_SENTENCES)))
+        self._closed = False
+
+    def start(self, callback: Callable[[str, bool], None]) -> None:
+        self._callback = callback
+        self._loop = asyncio.get_running_loop()
+
+    def _emit(self, text: str, is_final: bool) -> None:
+        if not self._closed and self._callback is not None:
+            self._callback(text, is_final)
+
+    async def write(self, audio_bytes: bytes) -> None:
+        if self._loop is None:
+            return
+        if self.recorder is not None:
+            self.recorder.stt_chunks += 1
+        before = self._audio // BYTES_PER_SECOND
+        self._audio += len(audio_bytes)
+        if self._audio // BYTES_PER_SECOND == before:
+            return
+        # One more word-group per second of audio; every third second ends the utterance
+        if not self._words:
+            self._words = next(self._sentences).split()
+        seconds = self._audio // BYTES_PER_SECOND
+        is_final = seconds % 3 == 0
+        shown = self._words if is_final else self._words[: max(1, len(self._words) * (seconds % 3) // 3)]
+        text = " ".join(shown)
+        if is_final:
+            self._words = []
+        self._loop.call_later(_jittered(self.latency, self.jitter), self._emit, text, is_final)
+
+    def close(self, timeout: float = 2.0) -> None:
+        self._closed = True
+
+
+class FakeRealityDefenderService:
+    """Drop-in for RealityDefenderService with a fixed share of MANIPULATED verdicts."""
+
+    def __init__(
+        self,
+        upload_latency: float = 0.4,
+        result_latency: float = 2.0,
+        jitter: float = 0.3,
+        manipulated_ratio: float = 0.3,
+        recorder: Optional[FakeRecorder] = None,
+    ) -> None:
+        self.upload_latency = upload_latency
+        self.result_latency = result_latency
+        self.jitter = jitter
+        self.manipulated_ratio = manipulated_ratio
+        self.recorder = recorder
+        self._ids = itertools.count(1)
+
+    async def upload_bytes(self, data: BytesLike, filename: str) -> str:
+        await asyncio.sleep(_jittered(self.upload_latency, self.jitter))
+        return f"fake-{next(self._ids)}:{filename}"
+
+    async def upload(self, file_path: str) -> str:
+        return await self.upload_bytes(b"", file_path)
+
+    async def wait_for_result(self, request_id: str) -> Dict[str, Any]:
+        await asyncio.sleep(_jittered(self.result_latency, self.jitter))
+        manipulated = random.random() < self.manipulated_ratio
+        score = random.uniform(0.85, 0.99) if manipulated else random.uniform(0.01, 0.3)
+        if self.recorder is not None:
+            m = _CALL_SID_RE.search(request_id)
+            self.recorder.verdict(m.group(0) if m else request_id)
+        return {"status": "MANIPULATED" if manipulated else "AUTHENTIC", "score": score, "request_id": request_id}
+
+    async def analyze_file(self, file_path: str) -> Dict[str, Any]:
+        return await self.wait_for_result(await self.upload(file_path))
+
+    async def aclose(self) -> None:
+        pass
+
+
+def fake_send_sms_factory(latency: float, jitter: float, recorder: Optional[FakeRecorder]):
+    """A blocking stand-in for notifier._send_once (it runs in a worker thread, like Twilio's client)."""
+    sids = itertools.count(1)
+
+    def fake_send(to_number: str, body: str) -> str:
+        time.sleep(_jittered(latency, jitter))
+        if recorder is not None:
+            recorder.sent(body)
+        return f"SMfake{next(sids)}"
+
+    return fake_send
+
+
+def install(
+    *,
+    stt_latency: float = 0.3,
+    rd_upload_latency: float = 0.4,
+    rd_result_latency: float = 2.0,
+    sms_latency: float = 0.3,
+    jitter: float = 0.3,
+    manipulated_ratio: float = 0.3,
+) -> FakeRecorder:
+    """Patch the fakes into the modules the app resolves them from; call before the app starts."""
+    from app import main
+    from app.api import ws_media
+    from app.core.config import settings
+    from app.services import notifier, reality_defender
+
+    recorder = FakeRecorder()
+    FakeSTTStreamer.latency, FakeSTTStreamer.jitter, FakeSTTStreamer.recorder = stt_latency, jitter, recorder
+    ws_media.AsyncGoogleSTTStreamer = FakeSTTStreamer
+
+    rd = FakeRealityDefenderService(rd_upload_latency, rd_result_latency, jitter, manipulated_ratio, recorder)
+    reality_defender._service = rd
+    for module in (ws_media, main, reality_defender):
+        module.get_reality_defender = lambda: rd
+
+    fake_send = fake_send_sms_factory(sms_latency, jitter, recorder)
+    notifier._send_once = fake_send
+    notifier._twilio_configured = lambda: True
+    if not settings.FORWARD_TO_NUMBER:
+        settings.FORWARD_TO_NUMBER = "+15550000000"
+    return recorder
@@ -0,0 +1,286 @@
+"""
+Load generator: N concurrent Twilio media streams against /media.
+
+Runs the real FastAPI app (uvicorn, in this process) with Google STT,
+Reality Defender and Twilio SMS replaced by the latency-injecting fakes in
+benchmarks.fakes, then replays Twilio start/media/stop sequences over N
+WebSockets from a separate client process so client CPU does not skew the
+server's numbers.
+
+Audio is synthetic speech-like μ-law (voiced bursts with pauses, so the VAD
+gate sees realistic speech/silence) or a recording: one raw WebSocket text
+frame per line, as captured from Twilio (see bench_media_parse). Each
+replayed call gets its own callSid.
+
+Reports:
+- frames/s sent and the worst pacing slip (how far behind schedule a frame went out)
+- server event-loop lag (p50/p99/max)
+- time from "start" to the first verdict and to the first SMS, per call (percentiles)
+- server RSS growth per concurrent call
+
+Run from backend/:
+  python -m benchmarks.load_media --calls 50 --seconds 60 --speed 1
+  python -m benchmarks.load_media --calls 200 --seconds 30 --speed 4 --rd-result-latency 3
+  python -m benchmarks.load_media --file capture.jsonl --calls 20
+
+--speed > 1 replays faster than real time (frames every 20ms / speed). The
+verdict cache is off unless --verdict-cache is given, since synthetic calls
+share audio and would otherwise mostly hit it.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+FRAME_BYTES = 160  # 20ms of μ-law at 8 kHz
+FRAME_SECONDS = 0.02
+
+
+def _lin2ulaw(sample: int) -> int:
+    """G.711 μ-law encode one 16-bit sample."""
+    sign = 0x80 if sample < 0 else 0
+    magnitude = min(abs(sample), 32635) + 0x84
+    exponent = max(0, min(7, magnitude.bit_length() - 8))
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def synthetic_speech(seconds: float, seed: int = 0) -> bytes:
+    """Speech-like μ-law: harmonic bursts of 0.8-3s with a wandering pitch, separated by 0.3-1.2s of quiet noise."""
+    rnd = random.Random(seed)
+    total = int(seconds * 8000)
+    out = bytearray()
+    while len(out) < total:
+        n = int(rnd.uniform(0.8, 3.0) * 8000)
+        f0 = rnd.uniform(100, 220)
+        amp = rnd.uniform(3000, 9000)
+        phase = 0.0
+        for i in range(n):
+            f = f0 * (1 + 0.1 * math.sin(2 * math.pi * 3 * i / 8000))
+            phase += 2 * math.pi * f / 8000
+            env = math.sin(math.pi * i / n) * (0.6 + 0.4 * math.sin(2 * math.pi * 4 * i / 8000))
+            s = math.sin(phase) + 0.5 * math.sin(2 * phase) + 0.3 * math.sin(3 * phase)
+            out.append(_lin2ulaw(int(amp * env * s + rnd.gauss(0, 60))))
+        for _ in range(int(rnd.uniform(0.3, 1.2) * 8000)):
+            out.append(_lin2ulaw(int(rnd.gauss(0, 60))))
+    return bytes(out[:total])
+
+
+def synthetic_payloads(seconds: float, seed: int = 0) -> List[str]:
+    audio = synthetic_speech(seconds, seed)
+    return [base64.b64encode(audio[i:i + FRAME_BYTES]).decode() for i in range(0, len(audio), FRAME_BYTES)]
+
+
+def recorded_payloads(path: str) -> List[str]:
+    """Media payloads (base64) from a capture file, in order."""
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            if msg.get("event") == "media" and (msg.get("media") or {}).get("payload"):
+                payloads.append(msg["media"]["payload"])
+    if not payloads:
+        raise SystemExit(f"{path}: no media messages found")
+    return payloads
+
+
+def _percentiles(values: Sequence[float], points=(50, 90, 99)) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+    parts = [f"p{p}={ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]:.3f}s" for p in points]
+    return " ".join(parts) + f" max={ordered[-1]:.3f}s (n={len(ordered)})"
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # not Linux: peak RSS is the best available
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- client side (runs in a child process) ---------------------------------
+
+
+async def _one_call(url: str, payloads: List[str], n_frames: int, speed: float, delay: float) -> Dict:
+    import websockets
+
+    await asyncio.sleep(delay)
+    call_sid = "CA" + uuid.uuid4().hex
+    stream_sid = "MZ" + uuid.uuid4().hex
+    offset = random.randrange(len(payloads))
+    interval = FRAME_SECONDS / speed
+    worst_slip = 0.0
+
+    async with websockets.connect(url, max_queue=None) as ws:
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        started = time.time()
+        await ws.send(json.dumps({
+            "event": "start",
+            "sequenceNumber": "1",
+            "start": {
+                "streamSid": stream_sid,
+                "callSid": call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+            },
+            "streamSid": stream_sid,
+        }))
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for i in range(n_frames):
+            due = t0 + i * interval
+            now = loop.time()
+            if due > now:
+                await asyncio.sleep(due - now)
+            else:
+                worst_slip = max(worst_slip, now - due)
+            payload = payloads[(offset + i) % len(payloads)]
+            await ws.send(
+                f'{{"event":"media","sequenceNumber":"{i + 2}","media":{{"track":"inbound","chunk":"{i + 1}",'
+                f'"timestamp":"{(i + 1) * 20}","payload":"{payload}"}},"streamSid":"{stream_sid}"}}'
+            )
+        await ws.send(json.dumps({"event": "stop", "sequenceNumber": str(n_frames + 2), "streamSid": stream_sid,
+                                  "stop": {"callSid": call_sid}}))
+        ended = time.time()
+    return {"call_sid": call_sid, "started": started, "ended": ended, "frames": n_frames, "slip": worst_slip}
+
+
+async def _run_clients(url: str, calls: int, seconds: float, speed: float, ramp: float, file: Optional[str]) -> Dict:
+    payloads = recorded_payloads(file) if file else synthetic_payloads(min(seconds, 30.0), seed=1)
+    n_frames = int(seconds / FRAME_SECONDS)
+    t0 = time.time()
+    results = await asyncio.gather(
+        *(_one_call(url, payloads, n_frames, speed, ramp * i / max(1, calls)) for i in range(calls)),
+        return_exceptions=True,
+    )
+    elapsed = time.time() - t0
+    ok = [r for r in results if isinstance(r, dict)]
+    errors = [repr(r) for r in results if not isinstance(r, dict)]
+    return {"calls": ok, "errors": errors, "elapsed": elapsed}
+
+
+def run_clients(url: str, calls: int, seconds: float, speed: float, ramp: float, file: Optional[str]) -> Dict:
+    return asyncio.run(_run_clients(url, calls, seconds, speed, ramp, file))
+
+
+# --- server side ------------------------------------------------------------
+
+
+async def _monitor(lag: List[float], rss: List[int], period: float = 0.05) -> None:
+    """Event-loop lag: how late a `period` sleep wakes up. RSS is sampled every ~0.5s."""
+    loop = asyncio.get_running_loop()
+    ticks = 0
+    while True:
+        t = loop.time()
+        await asyncio.sleep(period)
+        lag.append(max(0.0, loop.time() - t - period))
+        ticks += 1
+        if ticks % 10 == 0:
+            rss.append(_rss_bytes())
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from app.core.config import settings
+    from benchmarks import fakes
+
+    settings.CAPTURE_ARCHIVE_ENABLED = args.archive
+    if not args.verdict_cache:
+        settings.VERDICT_CACHE_BACKEND = "off"
+    recorder = fakes.install(
+        stt_latency=args.stt_latency,
+        rd_upload_latency=args.rd_upload_latency,
+        rd_result_latency=args.rd_result_latency,
+        sms_latency=args.sms_latency,
+        jitter=args.jitter,
+        manipulated_ratio=args.manipulated_ratio,
+    )
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", ws="websockets"))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            serve_task.result()
+        await asyncio.sleep(0.05)
+
+    lag: List[float] = []
+    rss: List[int] = []
+    baseline_rss = _rss_bytes()
+    monitor = asyncio.create_task(_monitor(lag, rss))
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        client = await loop.run_in_executor(
+            pool, run_clients, f"ws://127.0.0.1:{args.port}/media",
+            args.calls, args.seconds, args.speed, args.ramp, args.file,
+        )
+
+    # Windows submitted at "stop" are still being scored; give them time to land
+    deadline = loop.time() + args.drain
+    sids = {c["call_sid"] for c in client["calls"]}
+    while loop.time() < deadline and not sids <= recorder.verdicts.keys():
+        await asyncio.sleep(0.1)
+
+    monitor.cancel()
+    server.should_exit = True
+    await serve_task
+
+    calls = client["calls"]
+    frames = sum(c["frames"] for c in calls)
+    peak_rss = max(rss, default=baseline_rss)
+    to_verdict = [recorder.verdicts[c["call_sid"]] - c["started"] for c in calls if c["call_sid"] in recorder.verdicts]
+    to_sms = [recorder.sms[c["call_sid"]] - c["started"] for c in calls if c["call_sid"] in recorder.sms]
+
+    print(f"calls:            {len(calls)} ok, {len(client['errors'])} failed"
+          f" ({args.seconds:.0f}s audio each at {args.speed:g}x)")
+    for err in client["errors"][:5]:
+        print(f"  error: {err}")
+    print(f"frames/s:         {frames / client['elapsed']:.0f} (target {args.calls * 50 * args.speed:.0f})")
+    print(f"pacing slip:      max {max((c['slip'] for c in calls), default=0.0) * 1e3:.1f}ms")
+    print(f"event-loop lag:   {_percentiles(lag)}")
+    print(f"time-to-verdict:  {_percentiles(to_verdict)}")
+    print(f"time-to-SMS:      {_percentiles(to_sms)}")
+    print(f"analyses:         {recorder.analyses}, SMS sent: {recorder.sms_sent}, STT chunks: {recorder.stt_chunks}")
+    print(f"server RSS:       baseline {baseline_rss / 2**20:.1f} MiB, peak {peak_rss / 2**20:.1f} MiB, "
+          f"{(peak_rss - baseline_rss) / max(1, args.calls) / 2**10:.0f} KiB/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="concurrent WebSocket streams")
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio per call")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed (1 = real time)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="spread call starts over this many seconds")
+    parser.add_argument("--file", help="recorded Twilio messages, one raw WebSocket text frame per line")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--drain", type=float, default=15.0, help="max seconds to wait for trailing verdicts")
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--rd-upload-latency", type=float, default=0.4)
+    parser.add_argument("--rd-result-latency", type=float, default=2.0)
+    parser.add_argument("--sms-latency", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.3, help="+/- fraction applied to every fake latency")
+    parser.add_argument("--manipulated-ratio", type=float, default=0.3)
+    parser.add_argument("--archive", action="store_true", help="keep CAPTURE_ARCHIVE_ENABLED writes on")
+    parser.add_argument("--verdict-cache", action="store_true", help="leave the verdict cache on")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
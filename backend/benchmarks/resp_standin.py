@@ -0,0 +1,101 @@
+"""
+Minimal Redis-protocol server for running several uvicorn workers locally.
+
+Serves the commands the "redis" detection-state backend uses (GET, SET, DEL,
+PUBLISH, SUBSCRIBE, plus PING/AUTH/SELECT as no-ops), from memory, with no
+persistence. Not a Redis replacement; just enough for development and
+multi-worker load tests without installing one.
+
+Run from backend/:
+  python -m benchmarks.resp_standin [--port 6379]
+  DETECTION_STATE_BACKEND=redis uvicorn app.main:app --workers 4
+"""
+import argparse
+import asyncio
+from typing import Dict, List, Set
+
+
+def _bulk(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    data = value if isinstance(value, bytes) else str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def _array(items: List) -> bytes:
+    return b"*%d\r\n" % len(items) + b"".join(
+        b":%d\r\n" % i if isinstance(i, int) else _bulk(i) for i in items
+    )
+
+
+class RespStandIn:
+    def __init__(self) -> None:
+        self.values: Dict[bytes, bytes] = {}
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> List[bytes]:
+        line = await reader.readuntil(b"\r\n")
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(n + 2))[:-2])
+        return args
+
+    def _execute(self, args: List[bytes], writer: asyncio.StreamWriter) -> bytes:
+        cmd = args[0].upper()
+        if cmd in (b"PING", b"AUTH", b"SELECT"):
+            return b"+PONG\r\n" if cmd == b"PING" else b"+OK\r\n"
+        if cmd == b"GET":
+            return _bulk(self.values.get(args[1]))
+        if cmd == b"SET":
+            self.values[args[1]] = args[2]
+            return b"+OK\r\n"
+        if cmd == b"DEL":
+            return b":%d\r\n" % sum(self.values.pop(k, None) is not None for k in args[1:])
+        if cmd == b"PUBLISH":
+            subscribers = self.channels.get(args[1], set())
+            for sub in list(subscribers):
+                sub.write(_array([b"message", args[1], args[2]]))
+            return b":%d\r\n" % len(subscribers)
+        if cmd == b"SUBSCRIBE":
+            out = b""
+            for i, channel in enumerate(args[1:], 1):
+                self.channels.setdefault(channel, set()).add(writer)
+                out += _array([b"subscribe", channel, i])
+            return out
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args:
+                    writer.write(self._execute(args, writer))
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, IndexError):
+            pass
+        finally:
+            for subscribers in self.channels.values():
+                subscribers.discard(writer)
+            writer.close()
+
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(RespStandIn().handle, host, port)
+    print(f"RESP stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import pytest
+
+from app.services import admission
+from app.services.admission import DECLINE, LONG_HOP, NO_STT, NORMAL, AdmissionController
+
+
+@pytest.fixture
+def lag(monkeypatch):
+    value = [0.0]
+    monkeypatch.setattr(admission, "recent_loop_lag", lambda: value[0])
+    monkeypatch.setattr(admission, "windows_in_flight", lambda: 0)
+    return value
+
+
+def _controller(**kwargs) -> AdmissionController:
+    params = dict(max_sessions=2, max_stt_streams=10, max_detections=10, lag_tiers=[0.1, 0.25, 1.0], hop_factor=3, recover_seconds=10)
+    params.update(kwargs)
+    return AdmissionController(**params)
+
+
+def test_session_cap_declines_only_while_it_is_reached(lag):
+    ctl = _controller()
+    first, second = ctl.admit(), ctl.admit()
+    assert first and second
+    assert ctl.admit() is None and not ctl.accepting_streams
+    first.release()
+    first.release()  # idempotent
+    assert ctl.accepting_streams and ctl.admit() is not None  # no recovery delay after the cap
+    assert ctl.evaluate(now=0) == NORMAL  # the cap never raised the tier
+
+
+def test_load_tiers_rise_at_once_and_fall_one_step_per_recovery_period(lag):
+    ctl = _controller(max_sessions=100)
+    lag[0] = 2.0
+    assert ctl.evaluate(now=0) == DECLINE and ctl.admit() is None
+    lag[0] = 0.0
+    assert ctl.evaluate(now=1) == DECLINE
+    assert ctl.evaluate(now=11) == LONG_HOP and ctl.hop_factor() == 3
+    ticket = ctl.admit()
+    assert ticket is not None and not ticket.allow_stt
+    assert ctl.evaluate(now=21) == NO_STT
+    assert ctl.evaluate(now=31) == NORMAL and ticket.allow_stt
+
+
+def test_stt_stream_count_sheds_transcription(lag):
+    ctl = _controller(max_sessions=100, max_stt_streams=1)
+    ticket = ctl.admit()
+    ticket.stt_started()
+    assert ctl.evaluate(now=0) == NO_STT
+    ticket.release()
+    assert ctl.stt_streams == 0 and ctl.sessions == 0
@@ -0,0 +1,205 @@
+import struct
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import audio_pipeline
+from app.services.audio_pipeline import (
+    MULAW_TO_LINEAR16,
+    AudioWorkExecutor,
+    CallAudioBuffer,
+    FrameCoalescer,
+    SpeechTimeline,
+    VoiceActivityGate,
+    WAV_HEADER_BYTES,
+    mulaw_to_linear16,
+    mulaw_to_linear16_into,
+    mulaw_to_wav,
+    wav_and_fingerprint,
+)
+from benchmarks.bench_mulaw import legacy_mulaw_to_linear16
+
+ALL_BYTES = bytes(range(256))
+
+
+def test_decode_table_matches_legacy_loop_for_every_byte():
+    legacy = legacy_mulaw_to_linear16(ALL_BYTES)
+    assert bytes(mulaw_to_linear16(ALL_BYTES)) == legacy
+    assert list(MULAW_TO_LINEAR16) == list(struct.unpack("<256h", legacy))
+
+
+def test_decode_into_bytearray_offset_and_memoryview():
+    data = ALL_BYTES * 3
+    expected = legacy_mulaw_to_linear16(data)
+
+    out = bytearray(10 + len(data) * 2)
+    assert mulaw_to_linear16_into(data, out, offset=10) == len(data) * 2
+    assert out[:10] == bytearray(10) and bytes(out[10:]) == expected
+
+    target = bytearray(len(data) * 2)
+    mulaw_to_linear16_into(memoryview(data), memoryview(target))
+    assert bytes(target) == expected
+
+
+def test_decode_into_rejects_short_buffer():
+    with pytest.raises(ValueError):
+        mulaw_to_linear16_into(b"\x00\x01", bytearray(3))
+
+
+def test_wav_is_header_plus_decoded_samples():
+    wav = mulaw_to_wav(ALL_BYTES)
+    assert wav[:4] == b"RIFF" and wav[8:12] == b"WAVE"
+    assert struct.unpack_from("<I", wav, 40)[0] == 512
+    assert bytes(wav[WAV_HEADER_BYTES:]) == legacy_mulaw_to_linear16(ALL_BYTES)
+
+
+def _stream(n: int, start: int = 0) -> bytes:
+    """Bytes whose value encodes their absolute offset, so windows can be checked exactly."""
+    return bytes((start + i) % 251 for i in range(n))
+
+
+def test_ring_windows_across_wrap_around():
+    buf = CallAudioBuffer(capacity=100)
+    written = 0
+    for size in (30, 45, 50, 17, 99, 3):  # several wraps, at uneven positions
+        buf.write(_stream(size, written))
+        written += size
+        assert buf.total_written == written
+        assert buf.oldest_offset == max(0, written - 100)
+        for start, end in ((buf.oldest_offset, written), (written - min(written, 60), written - 5)):
+            view = buf.window(start, end)
+            assert isinstance(view, memoryview)
+            assert bytes(view) == _stream(end - start, start)
+
+
+def test_ring_write_larger_than_capacity_keeps_the_tail():
+    buf = CallAudioBuffer(capacity=64)
+    buf.write(_stream(10))
+    buf.write(_stream(200, 10))
+    assert buf.total_written == 210 and len(buf) == 64
+    assert bytes(buf.latest(64)) == _stream(64, 146)
+    assert bytes(buf.latest(1000)) == _stream(64, 146)
+
+
+def test_ring_rejects_overwritten_or_unwritten_ranges():
+    buf = CallAudioBuffer(capacity=50)
+    buf.write(_stream(80))
+    with pytest.raises(ValueError):
+        buf.window(29, 40)  # overwritten
+    with pytest.raises(ValueError):
+        buf.window(70, 81)  # not written yet
+    with pytest.raises(ValueError):
+        CallAudioBuffer(seconds=0)
+
+
+FRAME = 160  # 20 ms at 8 kHz
+SILENCE = b"\xff" * FRAME  # μ-law zero level
+SPEECH = bytes([0x10, 0x90]) * (FRAME // 2)  # loud, alternating sign at a speech-like rate
+
+
+def test_vad_gates_silence_and_releases_preroll_with_speech():
+    vad = VoiceActivityGate(preroll_ms=40, hangover_ms=40, keepalive_ms=0)
+    for _ in range(5):
+        assert vad.push(SILENCE) == (None, False)
+    audio, is_speech = vad.push(SPEECH)
+    assert is_speech and audio == SILENCE * 2 + SPEECH  # 40 ms of pre-roll, then the onset
+    assert vad.push(SPEECH) == (SPEECH, True)
+
+
+def test_vad_hangover_keeps_the_pause_after_speech():
+    vad = VoiceActivityGate(preroll_ms=0, hangover_ms=40, keepalive_ms=0)
+    vad.push(SILENCE)
+    vad.push(SPEECH)
+    assert vad.push(SILENCE) == (SILENCE, True)
+    assert vad.push(SILENCE) == (SILENCE, True)
+    assert vad.push(SILENCE) == (None, False)
+
+
+def test_vad_keepalive_lets_a_frame_through_during_long_silence():
+    vad = VoiceActivityGate(keepalive_ms=100)
+    passed = [vad.push(SILENCE)[0] for _ in range(10)]
+    assert passed == [None, None, None, None, SILENCE] * 2
+
+
+def test_coalescer_flushes_on_size_and_on_age():
+    now = [0.0]
+    chunks = FrameCoalescer(chunk_ms=60, max_delay_ms=100, clock=lambda: now[0])
+    assert chunks.push(b"a" * FRAME) is None
+    assert chunks.push(b"b" * FRAME) is None
+    assert chunks.push(b"c" * FRAME) == b"a" * FRAME + b"b" * FRAME + b"c" * FRAME
+    assert chunks.push(b"d" * FRAME) is None
+    now[0] = 0.1  # the batch's first frame is now max_delay old
+    assert chunks.push(b"e" * FRAME) == b"d" * FRAME + b"e" * FRAME
+    assert len(chunks) == 0 and chunks.flushes == 2
+
+
+def test_coalescer_flush_returns_the_partial_batch_and_zero_disables_batching():
+    chunks = FrameCoalescer(chunk_ms=100)
+    chunks.push(b"x" * FRAME)
+    assert chunks.flush() == b"x" * FRAME
+    assert chunks.flush() is None
+    passthrough = FrameCoalescer(chunk_ms=0)
+    assert passthrough.push(b"y" * FRAME) == b"y" * FRAME
+
+
+def test_speech_timeline_maps_speech_offsets_to_call_time():
+    timeline = SpeechTimeline()
+    assert timeline.to_call(500) == 500  # nothing gated yet: the clocks agree
+    # Speech runs at call offsets 1000-1800 and 5000-5400 (800 and 400 bytes of speech)
+    for speech, call in ((0, 1000), (160, 1160), (320, 1320), (800, 5000), (960, 5160)):
+        timeline.add(speech, call)
+    assert timeline.to_call(0) == 1000
+    assert timeline.to_call(700) == 1700
+    assert timeline.to_call(800) == 5000
+    assert timeline.to_call(800, end=True) == 1800  # a window ending at the run boundary ends with the first run
+    assert timeline.to_call(1200, end=True) == 5400
+
+
+class BrokenPool(Executor):
+    """A process pool whose worker died: every job fails with BrokenProcessPool."""
+
+    def __init__(self) -> None:
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("a worker died"))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.mark.asyncio
+async def test_broken_process_pool_is_shut_down_and_replaced(monkeypatch):
+    fresh = []
+
+    def new_pool(*args, **kwargs):
+        fresh.append(ThreadPoolExecutor(1))  # shared memory works the same from a thread
+        return fresh[-1]
+
+    monkeypatch.setattr(audio_pipeline, "ProcessPoolExecutor", new_pool)
+    executor = AudioWorkExecutor("process", workers=1)
+    broken = executor._pool = BrokenPool()
+    mulaw = _stream(8000)
+    assert await executor.wav_and_fingerprint(mulaw) == (bytes(mulaw_to_wav(mulaw)), wav_and_fingerprint(mulaw)[1])
+    assert broken.shut_down and executor.pool_restarts == 1
+    assert executor._pool is fresh[0]  # the retry ran on the new pool, which is kept
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_job_falls_back_to_a_thread_when_the_fresh_pool_breaks_too(monkeypatch):
+    pools = []
+
+    def new_pool(*args, **kwargs):
+        pools.append(BrokenPool())
+        return pools[-1]
+
+    monkeypatch.setattr(audio_pipeline, "ProcessPoolExecutor", new_pool)
+    executor = AudioWorkExecutor("process", workers=1)
+    mulaw = _stream(4000)
+    wav, words = await executor.wav_and_fingerprint(mulaw, fingerprint=False)
+    assert bytes(wav) == bytes(mulaw_to_wav(mulaw)) and words == []
+    assert executor.pool_restarts == 2 and all(pool.shut_down for pool in pools)
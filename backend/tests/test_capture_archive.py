@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services.capture_archive import CaptureArchive
+
+
+def _stream(n: int, start: int = 0) -> bytes:
+    return bytes((start + i) % 251 for i in range(n))
+
+
+def _archive(tmp_path, **kwargs) -> CaptureArchive:
+    archive = CaptureArchive(
+        str(tmp_path), segment_bytes=1 << 20, segment_seconds=3600, flush_seconds=0, max_pending=64, **kwargs
+    )
+    archive.start()
+    return archive
+
+
+def _audio(archive: CaptureArchive, call_sid: str) -> bytes:
+    return b"".join(bytes(chunk) for chunk in archive.call_audio(call_sid))
+
+
+@pytest.mark.asyncio
+async def test_overlapping_windows_are_archived_once(tmp_path):
+    archive = _archive(tmp_path)
+    for start in (0, 50, 100, 100):  # 100-byte windows every 50 bytes, then a repeat
+        archive.append("CA1", _stream(100, start), start)
+    await archive.aclose()
+    assert [(r.pos, r.length) for r in archive.captures("CA1")] == [(0, 100), (100, 50), (150, 50)]
+    assert _audio(archive, "CA1") == _stream(200)
+
+
+@pytest.mark.asyncio
+async def test_new_stream_for_a_call_is_archived_from_its_start(tmp_path):
+    archive = _archive(tmp_path)
+    archive.append("CA1", _stream(100), 0)
+    archive.new_stream("CA1")
+    archive.append("CA1", _stream(60), 0)
+    await archive.aclose()
+    assert _audio(archive, "CA1") == _stream(100) + _stream(60)
+
+
+@pytest.mark.asyncio
+async def test_calls_evicted_from_the_index_are_found_again(tmp_path):
+    archive = _archive(tmp_path, max_calls=2)
+    for i in range(4):
+        archive.append(f"CA{i}", _stream(10, i), 0)
+    await archive.aclose()
+    for i in (3, 0, 1, 0, 2):  # each lookup of an evicted call rescans the index files
+        assert _audio(archive, f"CA{i}") == _stream(10, i)
+    assert len(archive._calls) == 2
+    assert archive.captures("CA9") == []
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_an_unexpected_error(tmp_path, monkeypatch):
+    archive = _archive(tmp_path)
+    write = archive._write_batch
+    failures = []
+
+    def flaky(batch):
+        if not failures:
+            failures.append(batch)
+            raise ValueError("bad capture")
+        write(batch)
+
+    monkeypatch.setattr(archive, "_write_batch", flaky)
+    archive.append("CA1", _stream(10), 0)
+    while not failures:
+        await asyncio.sleep(0.01)
+    archive.append("CA2", _stream(20), 0)
+    await archive.aclose()
+    assert archive.captures("CA1") == [] and _audio(archive, "CA2") == _stream(20)
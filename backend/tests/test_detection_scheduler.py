@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from app.services import detection_scheduler
+from app.services.audio_pipeline import BYTES_PER_SECOND, CallAudioBuffer
+from app.services.detection_scheduler import DetectionScheduler
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter(monkeypatch):
+    # The process-wide semaphore binds to the loop that first waits on it; each test has its own loop
+    monkeypatch.setattr(detection_scheduler, "_global_slots", None)
+
+
+class Detector:
+    """analyze() stand-in: records windows, answers with `status` once released."""
+
+    def __init__(self, status="AUTHENTIC", score=0.1, hold=False):
+        self.windows = []
+        self.result = {"status": status, "score": score}
+        self.release = asyncio.Event()
+        if not hold:
+            self.release.set()
+
+    async def analyze(self, window, start):
+        self.windows.append(len(window))
+        await self.release.wait()
+        return self.result
+
+
+def _scheduler(detector, verdicts, seconds=30, **kwargs):
+    buf = CallAudioBuffer(seconds)
+    sched = DetectionScheduler(
+        buf,
+        analyze=detector.analyze,
+        on_verdict=lambda result, start, end: verdicts.append((start, end, result["status"])),
+        window_seconds=kwargs.pop("window_seconds", 2),
+        hop_seconds=kwargs.pop("hop_seconds", 1),
+        **kwargs,
+    )
+    return buf, sched
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_windows_submitted_at_each_hop():
+    detector, verdicts = Detector(), []
+    buf, sched = _scheduler(detector, verdicts)
+    for _ in range(4):
+        buf.write(b"\x7f" * BYTES_PER_SECOND)
+        sched.poll()
+        await _settle()
+    second = BYTES_PER_SECOND
+    assert [(s, e) for s, e, _ in verdicts] == [(0, 2 * second), (second, 3 * second), (2 * second, 4 * second)]
+    assert sched.submitted == 3 and sched.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_windows_dropped_while_detector_is_busy():
+    detector, verdicts = Detector(hold=True), []
+    buf, sched = _scheduler(detector, verdicts, per_call_limit=1)
+    for _ in range(5):  # windows due at 2s, 3s, 4s, 5s while the first is still in flight
+        buf.write(b"\x7f" * BYTES_PER_SECOND)
+        sched.poll()
+        await _settle()
+    assert sched.in_flight == 1 and sched.submitted == 1
+    detector.release.set()
+    await _settle()
+    # Only the newest pending window (ending at 5s) was scored after the first; 3s and 4s were dropped
+    assert [e for _, e, _ in verdicts] == [2 * BYTES_PER_SECOND, 5 * BYTES_PER_SECOND]
+    assert sched.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_confident_manipulated_verdict_stops_scheduling():
+    detector, verdicts = Detector(status="MANIPULATED", score=0.95), []
+    buf, sched = _scheduler(detector, verdicts)
+    buf.write(b"\x7f" * 2 * BYTES_PER_SECOND)
+    sched.poll()
+    await _settle()
+    assert sched.done
+    for _ in range(3):
+        buf.write(b"\x7f" * BYTES_PER_SECOND)
+        sched.poll()
+    sched.finish()
+    await _settle()
+    assert sched.submitted == 1 and len(verdicts) == 1
+
+
+@pytest.mark.asyncio
+async def test_low_score_manipulated_does_not_stop_scheduling():
+    detector, verdicts = Detector(status="MANIPULATED", score=0.3), []
+    buf, sched = _scheduler(detector, verdicts)
+    for _ in range(3):
+        buf.write(b"\x7f" * BYTES_PER_SECOND)
+        sched.poll()
+        await _settle()
+    assert not sched.done and sched.submitted == 2
+
+
+@pytest.mark.asyncio
+async def test_finish_scores_a_call_shorter_than_one_window():
+    detector, verdicts = Detector(), []
+    buf, sched = _scheduler(detector, verdicts, window_seconds=10, hop_seconds=5)
+    buf.write(b"\x7f" * 3 * BYTES_PER_SECOND)
+    sched.poll()
+    await _settle()
+    assert verdicts == []
+    sched.finish()
+    await _settle()
+    assert verdicts == [(0, 3 * BYTES_PER_SECOND, "AUTHENTIC")]
+    sched.finish()  # nothing new since: no second submission
+    await _settle()
+    assert sched.submitted == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_window_is_counted_and_scheduling_continues():
+    calls = []
+
+    async def flaky(window, start):
+        calls.append(len(window))
+        if len(calls) == 1:
+            raise RuntimeError("upload failed")
+        return {"status": "AUTHENTIC", "score": 0.1}
+
+    verdicts = []
+    buf = CallAudioBuffer(30)
+    sched = DetectionScheduler(buf, analyze=flaky, on_verdict=lambda r, s, e: verdicts.append(e), window_seconds=2, hop_seconds=1)
+    for _ in range(3):
+        buf.write(b"\x7f" * BYTES_PER_SECOND)
+        sched.poll()
+        await _settle()
+    assert len(calls) == 2 and verdicts == [3 * BYTES_PER_SECOND]
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.services.detection_state import (
+    DetectionState,
+    RedisStateBackend,
+    RespError,
+    SQLiteStateBackend,
+    _RespConnection,
+)
+from benchmarks.resp_standin import RespStandIn
+
+
+class BufferWriter:
+    def __init__(self) -> None:
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+
+def _reading(data: bytes) -> _RespConnection:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return _RespConnection(reader, BufferWriter())
+
+
+async def _until(predicate, timeout: float = 3.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_commands_are_sent_as_arrays_of_bulk_strings():
+    conn = _RespConnection(None, BufferWriter())
+    conn.send("SET", "trustline:détection", "1")  # lengths count UTF-8 bytes, not characters
+    assert conn._writer.data == b"*3\r\n$3\r\nSET\r\n$20\r\ntrustline:d\xc3\xa9tection\r\n$1\r\n1\r\n"
+
+
+@pytest.mark.asyncio
+async def test_replies_of_every_type_are_parsed():
+    conn = _reading(b"+OK\r\n:42\r\n$5\r\nhe\r\nl\r\n$-1\r\n*3\r\n$7\r\nmessage\r\n$2\r\nch\r\n:1\r\n*-1\r\n")
+    assert await conn.read_reply() == "OK"
+    assert await conn.read_reply() == 42
+    assert await conn.read_reply() == "he\r\nl"  # bulk strings are length-prefixed, not line-delimited
+    assert await conn.read_reply() is None
+    assert await conn.read_reply() == ["message", "ch", 1]
+    assert await conn.read_reply() is None
+
+
+@pytest.mark.asyncio
+async def test_error_replies_and_garbage_raise():
+    conn = _reading(b"-ERR unknown command 'FOO'\r\n?what\r\n")
+    with pytest.raises(RespError, match="unknown command"):
+        await conn.read_reply()
+    with pytest.raises(RespError, match="unexpected reply"):
+        await conn.read_reply()
+    with pytest.raises(asyncio.IncompleteReadError):
+        await conn.read_reply()
+
+
+@pytest_asyncio.fixture
+async def standin():
+    """A RESP stand-in server; drop() closes every client connection from the server side."""
+    server_state = RespStandIn()
+    writers = []
+
+    async def handle(reader, writer):
+        writers.append(writer)
+        await server_state.handle(reader, writer)
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    server.url = "redis://127.0.0.1:%d/0" % server.sockets[0].getsockname()[1]
+    server.state = server_state
+
+    def drop() -> None:
+        for writer in writers:
+            writer.close()
+        writers.clear()
+
+    server.drop = drop
+    yield server
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_redis_flag_reaches_every_worker_over_pubsub(standin):
+    workers = [DetectionState(RedisStateBackend(standin.url), default_enabled=False) for _ in range(2)]
+    for state in workers:
+        await state.start()
+    await _until(lambda: len(standin.state.channels.get(b"trustline:state", ())) == 2)
+    await workers[0].set_enabled(True)
+    await _until(workers[1].is_enabled)
+    await workers[1].set_enabled(False)
+    await _until(lambda: not workers[0].is_enabled())
+    for state in workers:
+        await state.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_and_dropped_connections(standin):
+    backend = RedisStateBackend(standin.url)
+    with pytest.raises(RespError):
+        await backend._command("FLUSHALL")  # the connection stays usable after an error reply
+    assert await backend._command("SET", "k", "v") == "OK"
+    standin.drop()
+    await asyncio.sleep(0.05)
+    with pytest.raises((OSError, asyncio.IncompleteReadError)):
+        await backend._command("GET", "k")
+    assert await backend._command("GET", "k") == "v"  # the next command reconnects
+    await backend.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_subscriber_rereads_the_flag_after_reconnecting(standin):
+    follower = DetectionState(RedisStateBackend(standin.url), default_enabled=False)
+    await follower.start()
+    await _until(lambda: standin.state.channels.get(b"trustline:state"))
+    standin.drop()
+    # Written while the follower is disconnected: it only hears about it by re-reading
+    standin.state.values[b"trustline:detection_enabled"] = b"1"
+    await _until(follower.is_enabled)
+    await follower.aclose()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_poller_propagates_the_flag_between_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    workers = [DetectionState(SQLiteStateBackend(path, poll_seconds=0.01), default_enabled=False) for _ in range(2)]
+    for state in workers:
+        await state.start()
+    await workers[0].set_enabled(True)
+    assert workers[0].is_enabled()
+    await _until(workers[1].is_enabled)
+    await workers[1].set_enabled(False)
+    await _until(lambda: not workers[0].is_enabled())
+
+    late = DetectionState(SQLiteStateBackend(path, poll_seconds=0.01), default_enabled=True)
+    await late.start()
+    assert not late.is_enabled()  # the shared value wins over the env default
+    for state in workers + [late]:
+        await state.aclose()
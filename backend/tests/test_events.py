@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.api import events
+from app.core import security
+from app.core.config import settings
+from app.services.event_hub import EventHub
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_API_TOKEN", "s3cret")
+    app = FastAPI()
+    app.include_router(events.router)
+    return TestClient(app)
+
+
+def test_token_checks(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_API_TOKEN", "s3cret")
+    assert security.bearer_token("Bearer s3cret") == "s3cret" and security.bearer_token("Basic abc") is None
+    assert security.events_token_ok("s3cret") and not security.events_token_ok("nope")
+    assert security.may_subscribe("CA123", None) and not security.may_subscribe(None, None)
+    monkeypatch.setattr(settings, "EVENTS_API_TOKEN", "")
+    assert not security.events_token_ok("")  # no token configured: the all-calls stream is off
+
+
+@pytest.mark.parametrize("headers, params", [({}, {}), ({"Authorization": "Bearer wrong"}, {}), ({}, {"token": "wrong"})])
+def test_all_calls_sse_needs_the_token(client, headers, params):
+    assert client.get("/events", headers=headers, params=params).status_code == 401
+
+
+def test_all_calls_ws_needs_the_token(client):
+    with pytest.raises(WebSocketDisconnect) as info:
+        with client.websocket_connect("/events/ws"):
+            pass
+    assert info.value.code == 1008
+
+
+def test_ws_subscription_with_call_sid_or_token_is_accepted(client):
+    with client.websocket_connect("/events/ws?call_sid=CA123"):
+        pass
+    with client.websocket_connect("/events/ws", headers={"Authorization": "Bearer s3cret"}):
+        pass
+
+
+async def _drain(sub):
+    events = []
+    while (event := await sub.get(timeout=0)) is not None:
+        events.append(event)
+    return events
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_to_all_calls_and_matching_call_subscribers():
+    hub = EventHub(max_queue=10)
+    everything, also_everything, ca1, ca2 = hub.subscribe(), hub.subscribe(), hub.subscribe("CA1"), hub.subscribe("CA2")
+    assert hub.publish("verdict", "CA1", status="MANIPULATED", score=0.9) == 3
+    assert hub.publish("transcript", "CA2", text="hello") == 3
+
+    (verdict,) = await _drain(ca1)
+    assert json.loads(verdict.json)["status"] == "MANIPULATED" and verdict.sse.startswith(b"event: verdict\ndata: {")
+    assert [e.type for e in await _drain(ca2)] == ["transcript"]
+    first, second = await _drain(everything), await _drain(also_everything)
+    assert [e.type for e in first] == ["verdict", "transcript"]
+    assert first[0] is second[0] is verdict  # serialized once, shared by every subscriber
+
+
+def test_publish_without_subscribers_for_the_call_is_skipped():
+    hub = EventHub(max_queue=10)
+    sub = hub.subscribe("CA1")
+    assert hub.publish("verdict", "CA2", status="AUTHENTIC") == 0
+    sub.close()
+    assert hub.subscriber_count == 0 and hub.publish("verdict", "CA1") == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_evicted_without_holding_back_the_others():
+    hub = EventHub(max_queue=2)
+    slow, fast = hub.subscribe(), hub.subscribe("CA1")
+    delivered = []
+    for i in range(4):
+        delivered.append(hub.publish("risk", "CA1", score=i / 10))
+        assert (await fast.get(timeout=0)).type == "risk"
+    assert delivered == [2, 2, 1, 1]  # the third event found the slow queue full
+    assert hub.subscriber_count == 1
+    assert [e.type for e in await _drain(slow)] == ["evicted"]  # queued events are dropped, then the stream ends
+    assert slow.closed and await slow.get() is None
+
+
+@pytest.mark.asyncio
+async def test_waiting_subscriber_is_woken_by_publish_and_by_shutdown():
+    hub = EventHub(max_queue=10)
+    sub = hub.subscribe("CA1")
+    waiting = asyncio.create_task(sub.get())
+    await asyncio.sleep(0)
+    hub.publish("call_ended", "CA1", frames=10)
+    assert (await waiting).type == "call_ended"
+    assert await sub.get(timeout=0.01) is None  # heartbeat timeout
+    waiting = asyncio.create_task(sub.get())
+    await asyncio.sleep(0)
+    hub.close()
+    assert await waiting is None and hub.subscriber_count == 0
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.cloud.speech")
+
+from app.core.config import settings
+from app.services import google_stt
+from app.services.google_stt import AsyncGoogleSTTStreamer
+
+CHUNK = b"\xff" * 800  # 100 ms of μ-law
+
+
+class FakeStream:
+    """One streaming_recognize call: records the requests it was sent, answers with pushed responses."""
+
+    def __init__(self, requests) -> None:
+        self.config_sent = False
+        self.audio = []
+        self.half_closed = False
+        self.responses: "asyncio.Queue" = asyncio.Queue()
+        self._reader = asyncio.create_task(self._read(requests))
+
+    async def _read(self, requests) -> None:
+        async for request in requests:
+            if request.audio_content:
+                self.audio.append(bytes(request.audio_content))
+            else:
+                self.config_sent = True
+        self.half_closed = True
+
+    def final(self, text: str, end_ms: float) -> None:
+        alt = SimpleNamespace(transcript=text)
+        result = SimpleNamespace(alternatives=[alt], is_final=True, result_end_time=timedelta(milliseconds=end_ms))
+        self.responses.put_nowait(SimpleNamespace(results=[result]))
+
+    def end(self) -> None:
+        self.responses.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        response = await self.responses.get()
+        if response is None:
+            raise StopAsyncIteration
+        return response
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.streams = []
+
+    async def lease(self):
+        pool = self
+
+        async def streaming_recognize(requests):
+            stream = FakeStream(requests)
+            pool.streams.append(stream)
+            return stream
+
+        client = SimpleNamespace(streaming_recognize=streaming_recognize)
+        return SimpleNamespace(client=client, ok=lambda: None, release=lambda error=None: None)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = FakePool()
+    monkeypatch.setattr(google_stt, "get_stt_pool", lambda: fake)
+    monkeypatch.setattr(settings, "STT_STREAM_ROTATE_SECONDS", 0.6)
+    monkeypatch.setattr(settings, "STT_STREAM_PREOPEN_SECONDS", 0.3)
+    return fake
+
+
+def _streamer(results):
+    stt = AsyncGoogleSTTStreamer(language_code="en-US", sample_rate_hz=8000, audio_encoding="MULAW")
+    stt.start(callback=lambda text, is_final: results.append(text))
+    return stt
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_next_stream_is_opened_ahead_and_rotated_without_audio(pool):
+    stt = _streamer([])
+    await stt.write(CHUNK)
+    await asyncio.sleep(0.45)  # past the pre-open point, before the deadline
+    assert len(pool.streams) == 2
+    first, standby = pool.streams
+    assert standby.config_sent and standby.audio == [] and stt.rotations == 0
+
+    await asyncio.sleep(0.3)  # the deadline passes with no chunk arriving
+    await _settle()
+    assert stt.rotations == 1
+    assert first.half_closed  # the retired stream ended its requests right away
+    assert standby.audio == [CHUNK]  # replayed: nothing was finalized yet
+    await stt.write(CHUNK)
+    await _settle()
+    assert standby.audio == [CHUNK, CHUNK] and first.audio == [CHUNK]
+    stt.close()
+
+
+@pytest.mark.asyncio
+async def test_retiring_stream_results_past_the_replay_start_are_dropped(pool, monkeypatch):
+    monkeypatch.setattr(settings, "STT_STREAM_ROTATE_SECONDS", 60)
+    results = []
+    stt = _streamer(results)
+    await stt.write(CHUNK)
+    await _settle()
+    first = pool.streams[0]
+    first.final("hello there", 100)
+    await _settle()
+    await stt.write(CHUNK)  # unfinalized: replayed into the next stream from 100 ms
+    await _settle()
+
+    stt._rotate("test")
+    await _settle()
+    second = pool.streams[1]
+    assert second.audio == [CHUNK]
+    first.final("how are", 200)  # late final from the retiring stream, over audio the next one was replayed
+    second.final("how are you", 100)  # the new stream's own result for it (ends at 200 ms on the call)
+    await _settle()
+    assert results == ["hello there", "how are you"]
+    first.end()
+    second.end()
+    stt.close()
@@ -0,0 +1,75 @@
+import base64
+import json
+
+import pytest
+
+from app.services.media_stream import MediaStreamError, parse_message
+
+AUDIO = bytes(range(256))
+B64 = base64.b64encode(AUDIO).decode()
+assert "/" in B64  # used for the escaped-payload case
+
+
+def twilio_media(payload: str = B64) -> str:
+    """A media event laid out exactly as Twilio sends it."""
+    return (
+        '{"event":"media","sequenceNumber":"4","media":{"track":"inbound","chunk":"3",'
+        f'"timestamp":"60","payload":"{payload}"}},"streamSid":"MZ123"}}'
+    )
+
+
+def test_fast_path_decodes_twilio_layout_without_building_a_dict():
+    event, audio, data = parse_message(twilio_media())
+    assert event == "media" and audio == AUDIO
+    assert data is None  # fast path: nothing else parsed
+
+
+def test_media_without_payload_has_no_audio():
+    event, audio, _ = parse_message(twilio_media(payload=""))
+    assert event == "media" and audio is None
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        # key order differs from Twilio's
+        json.dumps({"event": "media", "streamSid": "MZ123", "media": {"payload": B64, "track": "inbound"}}),
+        # pretty-printed
+        json.dumps({"event": "media", "media": {"payload": B64}, "streamSid": "MZ123"}, indent=1),
+        # JSON escapes inside the payload
+        twilio_media(payload=B64.replace("/", "\\/")),
+    ],
+)
+def test_other_layouts_fall_back_to_full_parse(raw):
+    event, audio, data = parse_message(raw)
+    assert event == "media" and data is not None
+    assert audio == base64.b64decode(json.loads(raw)["media"]["payload"])
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        # "payload" outside the media object
+        '{"event":"media","media":{"track":"inbound"},"extra":{"payload":"AAAA"},"streamSid":"MZ123"}',
+        # "payload" in an object nested inside media
+        '{"event":"media","media":{"meta":{"payload":"AAAA"},"track":"inbound"},"streamSid":"MZ123"}',
+        # no streamSid after the media object
+        '{"event":"media","media":{"payload":"AAAA"}}',
+    ],
+)
+def test_payload_not_in_media_object_is_not_taken_as_audio(raw):
+    event, audio, data = parse_message(raw)
+    assert data is not None  # went through the full parse
+    assert audio == (base64.b64decode(data["media"]["payload"]) if data["media"].get("payload") else None)
+
+
+def test_non_media_events_return_the_parsed_message():
+    raw = json.dumps({"event": "start", "start": {"callSid": "CA1", "streamSid": "MZ1"}})
+    event, audio, data = parse_message(raw)
+    assert event == "start" and audio is None and data["start"]["callSid"] == "CA1"
+
+
+@pytest.mark.parametrize("raw", ["not json", "[1, 2]", twilio_media(payload="AAAAA")])
+def test_invalid_messages_raise(raw):
+    with pytest.raises(MediaStreamError):
+        parse_message(raw)
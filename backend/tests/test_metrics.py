@@ -0,0 +1,56 @@
+import math
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import metrics
+from app.core.metrics import REGISTRY, Registry
+
+
+@pytest.fixture
+def scrape():
+    app = FastAPI()
+    app.include_router(metrics.router)
+    client = TestClient(app)
+    return lambda: client.get("/metrics")
+
+
+def test_metrics_endpoint_escapes_label_values(scrape):
+    counter = REGISTRY.counter("trustline_test_escaping_total", "Label escaping test", ("reason",))
+    counter.inc(reason='said "hi"\\n\nthen hung up')
+    response = scrape()
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE trustline_test_escaping_total counter\n" in response.text
+    assert 'trustline_test_escaping_total{reason="said \\"hi\\"\\\\n\\nthen hung up"} 1\n' in response.text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    hist = registry.histogram("step_seconds", "Step durations", ("step",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        hist.observe(value, step="upload")
+    assert registry.render().splitlines()[2:] == [
+        'step_seconds_bucket{step="upload",le="0.1"} 1',
+        'step_seconds_bucket{step="upload",le="1"} 3',
+        'step_seconds_bucket{step="upload",le="+Inf"} 4',
+        'step_seconds_sum{step="upload"} 4.25',
+        'step_seconds_count{step="upload"} 4',
+    ]
+
+
+def test_broken_gauge_callback_does_not_break_the_scrape():
+    registry = Registry()
+    registry.gauge("depth", "Queue depth", fn=lambda: 1 / 0)
+    registry.gauge("calls", "Calls", fn=lambda: {(): 3.0})
+    registry.counter("frames_total", "Frames").inc(math.inf)
+    assert registry.render().splitlines() == [
+        "# HELP depth Queue depth",
+        "# TYPE depth gauge",
+        "# HELP calls Calls",
+        "# TYPE calls gauge",
+        "calls 3",
+        "# HELP frames_total Frames",
+        "# TYPE frames_total counter",
+        "frames_total +Inf",
+    ]
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import notifier
+from app.services.notifier import SMSDispatcher
+
+
+class _TwilioError(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Replace the Twilio call with a recorder: [(to, body, monotonic time)]."""
+    calls = []
+
+    def fake_send(to, body):
+        calls.append((to, body, time.monotonic()))
+        return f"SM{len(calls)}"
+
+    monkeypatch.setattr(notifier, "_twilio_configured", lambda: True)
+    monkeypatch.setattr(notifier, "_send_once", fake_send)
+    return calls
+
+
+async def _drain(dispatcher: SMSDispatcher) -> None:
+    await dispatcher.aclose(timeout=2.0)
+
+
+@pytest.mark.asyncio
+async def test_newer_message_for_a_key_replaces_the_queued_one(sent):
+    d = SMSDispatcher(min_interval=0, workers=1)
+    assert d.submit("+15550001", "AUTHENTIC", key="verdict:CA1")
+    assert d.submit("+15550001", "MANIPULATED", key="verdict:CA1")
+    await _drain(d)
+    assert [body for _, body, _ in sent] == ["MANIPULATED"]
+    assert d.coalesced == 1 and d.sent == 1
+
+
+@pytest.mark.asyncio
+async def test_body_already_sent_for_a_key_is_skipped(sent):
+    d = SMSDispatcher(min_interval=0, workers=1)
+    d.submit("+15550001", "MANIPULATED", key="verdict:CA1")
+    await asyncio.sleep(0.05)
+    assert not d.submit("+15550001", "MANIPULATED", key="verdict:CA1")
+    assert d.submit("+15550001", "AUTHENTIC", key="verdict:CA1")
+    await _drain(d)
+    assert [body for _, body, _ in sent] == ["MANIPULATED", "AUTHENTIC"]
+
+
+@pytest.mark.asyncio
+async def test_one_message_per_recipient_per_interval(sent):
+    d = SMSDispatcher(min_interval=0.2, workers=2)
+    d.submit("+15550001", "first", key="verdict:CA1")
+    d.submit("+15550001", "second", key="verdict:CA2")
+    d.submit("+15550002", "other recipient", key="verdict:CA3")
+    await asyncio.sleep(0.5)
+    await _drain(d)
+    times = {body: t for _, body, t in sent}
+    assert set(times) == {"first", "second", "other recipient"}
+    assert times["second"] - times["first"] >= 0.19
+    assert times["other recipient"] - times["first"] < 0.1  # other numbers aren't held back
+
+
+@pytest.mark.asyncio
+async def test_pending_queue_drops_oldest_when_full(sent):
+    d = SMSDispatcher(max_pending=2, min_interval=0, workers=1)
+    for i in range(3):
+        d.submit("+15550001", f"msg {i}", key=f"k{i}")
+    assert d.dropped == 1 and d.queue_depth == 2
+    await _drain(d)
+    assert [body for _, body, _ in sent] == ["msg 1", "msg 2"]
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_but_client_errors_are_not(monkeypatch):
+    monkeypatch.setattr(notifier, "_twilio_configured", lambda: True)
+    monkeypatch.setattr(settings, "SMS_RETRY_BACKOFF_SECONDS", 0.01)
+    attempts = []
+
+    def flaky(to, body):
+        attempts.append(body)
+        if body == "bad number":
+            raise _TwilioError(400)
+        if attempts.count(body) == 1:
+            raise _TwilioError(503)
+        return "SM1"
+
+    monkeypatch.setattr(notifier, "_send_once", flaky)
+    d = SMSDispatcher(min_interval=0, max_retries=3, workers=1)
+    d.submit("+15550001", "hello", key="a")
+    d.submit("+15550002", "bad number", key="b")
+    await asyncio.sleep(0.2)
+    await _drain(d)
+    assert attempts.count("hello") == 2 and d.sent == 1
+    assert attempts.count("bad number") == 1 and d.failed == 1
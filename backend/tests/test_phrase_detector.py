@@ -0,0 +1,85 @@
+import pytest
+
+from app.core.config import settings
+from app.services.phrase_detector import PhraseAutomaton, PhraseDictionary, TranscriptRiskTracker, load_phrases, tokenize
+
+
+def _matches(automaton, text):
+    return sorted((automaton.phrases[pid], end) for pid, end in automaton.scan(tokenize(text)))
+
+
+def test_tokenize_folds_apostrophes_and_drops_punctuation():
+    assert tokenize("Don't tell ANYONE, it’s fine!") == ["dont", "tell", "anyone", "its", "fine"]
+
+
+def test_automaton_finds_overlapping_and_nested_phrases():
+    automaton = PhraseAutomaton({"gift card": 0.5, "card": 0.1, "buy a gift": 0.4, "a gift card number": 0.6})
+    assert _matches(automaton, "please buy a gift card number now") == [
+        ("a gift card number", 5),
+        ("buy a gift", 3),
+        ("card", 4),
+        ("gift card", 4),
+    ]
+
+
+def test_automaton_recovers_after_a_partial_match():
+    # "your pin" starts inside the failed "your social security" prefix
+    automaton = PhraseAutomaton({"your social security number": 0.9, "your pin": 0.7})
+    assert _matches(automaton, "read me your social your pin") == [("your pin", 5)]
+    assert _matches(automaton, "nothing to see") == []
+
+
+def test_automaton_skips_phrases_without_words():
+    automaton = PhraseAutomaton({"!!!": 0.5, "wire transfer": 0.6})
+    assert len(automaton) == 1 and automaton.phrases == ["wire transfer"]
+
+
+def test_load_phrases_parses_weights_comments_and_bare_phrases(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCAM_PHRASE_DEFAULT_WEIGHT", 0.3)
+    path = tmp_path / "phrases.txt"
+    path.write_text("# comment\n\n0.8\tgift card\nbank account\n5\tyour pin\n", encoding="utf-8")
+    assert load_phrases(str(path)) == {"gift card": 0.8, "bank account": 0.3, "your pin": 0.99}
+    path.write_text("0.8\n", encoding="utf-8")  # a weight with no phrase
+    with pytest.raises(ValueError):
+        load_phrases(str(path))
+
+
+def _tracker(tmp_path, lines):
+    path = tmp_path / "phrases.txt"
+    path.write_text("".join(f"{w}\t{p}\n" for w, p in lines), encoding="utf-8")
+    dictionary = PhraseDictionary(str(path))
+    assert dictionary.reload_if_changed()
+    return TranscriptRiskTracker(dictionary)
+
+
+def test_tracker_counts_a_phrase_once_across_interim_revisions(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCAM_PHRASE_ALERT_TIERS", [0.8])
+    tracker = _tracker(tmp_path, [(0.5, "gift card"), (0.6, "dont tell anyone")])
+    update = tracker.update("buy a gift card", is_final=False)
+    assert update.new_phrases == ["gift card"] and update.score == pytest.approx(0.5) and not update.crossed_alert
+    assert tracker.update("buy a gift card today", is_final=False) is None
+    update = tracker.update("buy a gift card today and don't tell anyone", is_final=True)
+    assert update.new_phrases == ["dont tell anyone"]
+    assert update.score == pytest.approx(1 - 0.5 * 0.4) and update.crossed_alert
+    # A later utterance repeating a phrase adds nothing to the call's score
+    assert tracker.update("the gift card", is_final=True) is None
+    assert tracker.matched_phrases == ["dont tell anyone", "gift card"]
+
+
+def test_tracker_reports_each_alert_tier_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCAM_PHRASE_ALERT_TIERS", [0.5, 0.9])
+    tracker = _tracker(tmp_path, [(0.6, "gift card"), (0.1, "wire"), (0.9, "your pin")])
+    assert tracker.update("gift card", is_final=True).crossed_alert
+    assert not tracker.update("wire", is_final=True).crossed_alert
+    assert tracker.update("your pin", is_final=True).crossed_alert
+
+
+def test_dictionary_keeps_the_last_good_automaton_on_a_bad_reload(tmp_path):
+    path = tmp_path / "phrases.txt"
+    path.write_text("0.5\tgift card\n", encoding="utf-8")
+    dictionary = PhraseDictionary(str(path))
+    assert dictionary.reload_if_changed() and not dictionary.reload_if_changed()
+    path.write_text("0.5\n", encoding="utf-8")
+    dictionary._mtime = None  # mtime resolution can hide a rewrite within the same tick
+    assert not dictionary.reload_if_changed()
+    assert dictionary.automaton.phrases == ["gift card"]
@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("realitydefender")
+from aiohttp import ClientConnectionError
+
+from app.core.config import settings
+from app.services import reality_defender
+from app.services.reality_defender import RealityDefenderService
+
+
+@pytest.fixture
+def svc(monkeypatch):
+    monkeypatch.setattr(settings, "RD_BACKOFF_BASE_SECONDS", 0)
+    monkeypatch.setattr(settings, "RD_MAX_RETRIES", 2)
+    return RealityDefenderService(api_key="test-key")
+
+
+def _failing(*errors, result="ok"):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return call, calls
+
+
+@pytest.mark.asyncio
+async def test_network_errors_are_retried(svc):
+    call, calls = _failing(ClientConnectionError("reset"), ConnectionResetError(), asyncio.TimeoutError())
+    with pytest.raises(reality_defender.RealityDefenderError) as info:
+        await svc._with_retries(asyncio.Semaphore(1), "upload", call)
+    assert info.value.code == "timeout" and len(calls) == 3
+
+    call, calls = _failing(ClientConnectionError("reset"), OSError("unreachable"))
+    assert await svc._with_retries(asyncio.Semaphore(1), "upload", call) == "ok"
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_exhausted_network_retries_raise_an_sdk_error(svc):
+    call, calls = _failing(*[ClientConnectionError("reset")] * 3)
+    with pytest.raises(reality_defender.RealityDefenderError) as info:
+        await svc._with_retries(asyncio.Semaphore(1), "upload", call)
+    assert info.value.code == "server_error" and len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(svc):
+    call, calls = _failing(reality_defender.RealityDefenderError("bad key", "unauthorized"))
+    with pytest.raises(reality_defender.RealityDefenderError):
+        await svc._with_retries(asyncio.Semaphore(1), "upload", call)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_upload_bytes_falls_back_to_the_public_upload(svc, monkeypatch):
+    uploaded = []
+
+    async def upload(file_path):
+        with open(file_path, "rb") as f:
+            uploaded.append((file_path, f.read()))
+        return {"request_id": "req-1"}
+
+    monkeypatch.setattr(svc, "_direct_upload", False)
+    monkeypatch.setattr(svc._client, "upload", upload)
+    assert await svc.upload_bytes(memoryview(b"RIFF....WAVE"), "call_CA1.wav") == "req-1"
+    (path, body), = uploaded
+    assert path.endswith(".wav") and body == b"RIFF....WAVE"
+    assert not os.path.exists(path)  # temp file removed
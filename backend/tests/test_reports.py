@@ -0,0 +1,30 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import reports
+from app.core.config import settings
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_API_TOKEN", "s3cret")
+    monkeypatch.setattr(reports, "get_engine", lambda: None)
+    monkeypatch.setattr(reports, "get_capture_archive", lambda: None)
+    app = FastAPI()
+    app.include_router(reports.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/reports/calls", "/reports/calls/CA1", "/reports/calls/CA1/audio", "/reports/summary"])
+def test_reports_need_the_token(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    # Past the check, persistence and the archive are off in this test
+    assert client.get(path, headers={"Authorization": "Bearer s3cret"}).status_code == 503
+    assert client.get(path, params={"token": "s3cret"}).status_code == 503
+
+
+def test_reports_are_closed_when_no_token_is_configured(client, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_API_TOKEN", "")
+    assert client.get("/reports/calls", params={"token": ""}).status_code == 401
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import stt_pool
+from app.services.stt_pool import SpeechClientPool
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.state = None
+
+    def get_state(self, try_to_connect=False):
+        return self.state
+
+    async def channel_ready(self) -> None:
+        pass
+
+
+class FakeClient:
+    def __init__(self, n: int) -> None:
+        self.n = n
+        self.closed = False
+
+        async def close() -> None:
+            self.closed = True
+
+        self.transport = SimpleNamespace(grpc_channel=FakeChannel(), close=close)
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Credential lookups, by the thread that ran them."""
+    threads = []
+
+    def default_credentials():
+        threads.append(threading.current_thread())
+        return "creds"
+
+    monkeypatch.setattr(stt_pool, "_default_credentials", default_credentials)
+    return threads
+
+
+def _pool(size: int = 3, max_failures: int = 2) -> SpeechClientPool:
+    pool = SpeechClientPool(size=size, health_seconds=0, max_failures=max_failures)
+    clients = []
+
+    def new_client():
+        assert pool._credentials == "creds"  # resolved before any channel is built
+        clients.append(FakeClient(len(clients)))
+        return clients[-1]
+
+    pool._new_client = new_client
+    pool.clients = clients
+    return pool
+
+
+@pytest.mark.asyncio
+async def test_credentials_are_resolved_once_off_the_loop(lookups):
+    pool = _pool()
+    leases = await asyncio.gather(*(pool.lease() for _ in range(4)))
+    assert len(lookups) == 1 and lookups[0] is not threading.main_thread()
+    assert len(pool.clients) == 3 and pool.active_streams == 4
+    for lease in leases:
+        lease.release()
+    assert pool.active_streams == 0
+
+
+@pytest.mark.asyncio
+async def test_sessions_spread_over_the_channels(lookups):
+    pool = _pool()
+    leases = [await pool.lease() for _ in range(3)]
+    assert [lease.client.n for lease in leases] == [0, 1, 2]  # one stream per channel before any doubles up
+    leases[1].release()
+    leases[1].release()  # a second release is a no-op
+    assert (await pool.lease()).client.n == 1
+    assert pool.active_streams == 3
+
+
+@pytest.mark.asyncio
+async def test_failing_channel_is_avoided_then_replaced_after_its_last_session(lookups):
+    pool = _pool(size=2, max_failures=2)
+    first, second = await pool.lease(), await pool.lease()
+    busy = await pool.lease()  # shares channel 0 with `first`
+    assert busy.client is first.client
+    first.release(RuntimeError("stream reset"))
+    assert (await pool.lease()).client.n == 1  # channels with recent failures go last
+    busy.release(RuntimeError("stream reset"))  # second failure in a row: replaced
+    await asyncio.sleep(0)
+    assert first.client.closed and (await pool.lease()).client.n == 2
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_replaced_channel_stays_open_for_its_active_sessions(lookups):
+    pool = _pool(size=1, max_failures=1)
+    failed, still_streaming = await pool.lease(), await pool.lease()
+    failed.release(RuntimeError("stream reset"))
+    await asyncio.sleep(0)
+    assert not still_streaming.client.closed and (await pool.lease()).client.n == 1
+    still_streaming.release()
+    await asyncio.sleep(0)
+    assert still_streaming.client.closed
+
+
+@pytest.mark.asyncio
+async def test_health_check_replaces_a_channel_stuck_in_transient_failure(lookups):
+    grpc = pytest.importorskip("grpc")
+    pool = _pool(size=2)
+    await pool.warm_up()
+    broken = pool.clients[0]
+    broken.transport.grpc_channel.state = grpc.ChannelConnectivity.TRANSIENT_FAILURE
+    pool.check_health()
+    assert len(pool.clients) == 2  # one bad reading is tolerated
+    pool.check_health()
+    await asyncio.sleep(0)
+    assert len(pool.clients) == 3 and broken.closed
+
+
+@pytest.mark.asyncio
+async def test_aclose_closes_every_channel_including_retired_ones(lookups):
+    pool = _pool(size=1, max_failures=1)
+    failed = await pool.lease()
+    await pool.lease()  # keeps the replaced channel retired rather than closed
+    failed.release(RuntimeError("stream reset"))
+    await pool.aclose()
+    assert [client.closed for client in pool.clients] == [True, True]
+    assert pool.active_streams == 0
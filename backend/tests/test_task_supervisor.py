@@ -0,0 +1,73 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from app.services.task_supervisor import TaskSupervisor
+
+
+@pytest.fixture
+def previous_sigterm():
+    """A Python-level SIGTERM handler standing in for the server's, recording each call."""
+    calls = []
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: calls.append(signum))
+    yield calls
+    signal.signal(signal.SIGTERM, original)
+
+
+def test_sigterm_starts_draining_and_chains_to_the_previous_handler(previous_sigterm):
+    sup = TaskSupervisor(max_in_flight=10)
+    sup.install_signal_handler()
+    os.kill(os.getpid(), signal.SIGTERM)
+    deadline = time.monotonic() + 2
+    while not previous_sigterm and time.monotonic() < deadline:
+        time.sleep(0.01)  # Python runs the handler between bytecodes on the main thread
+    assert sup.draining
+    assert previous_sigterm == [signal.SIGTERM]
+
+    sup.restore_signal_handler()
+    os.kill(os.getpid(), signal.SIGTERM)
+    deadline = time.monotonic() + 2
+    while len(previous_sigterm) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert previous_sigterm == [signal.SIGTERM, signal.SIGTERM]  # the server's handler is back in place
+
+
+@pytest.mark.asyncio
+async def test_drain_awaits_tasks_that_finish_in_time_and_cancels_the_rest():
+    sup = TaskSupervisor(max_in_flight=10)
+    finished, follow_up = [], []
+
+    async def verdict():
+        await asyncio.sleep(0.05)
+        finished.append("verdict")
+        sup.spawn(notify(), "notify")  # work registered while draining is still awaited
+
+    async def notify():
+        await asyncio.sleep(0.05)
+        follow_up.append("sms")
+
+    stuck = sup.spawn(asyncio.sleep(60), "detection")
+    sup.spawn(verdict(), "detection")
+
+    t = time.monotonic()
+    await sup.drain(timeout=0.5)
+    elapsed = time.monotonic() - t
+
+    assert sup.draining
+    assert finished == ["verdict"] and follow_up == ["sms"]
+    assert stuck.cancelled()
+    assert sup.in_flight == 0 and sup.counts() == {"detection": 0, "notify": 0}
+    assert 0.5 <= elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_drain_returns_at_once_when_nothing_is_in_flight():
+    sup = TaskSupervisor(max_in_flight=10)
+    done = sup.spawn(asyncio.sleep(0), "archive")
+    await done
+    t = time.monotonic()
+    await sup.drain(timeout=5)
+    assert time.monotonic() - t < 0.1 and sup.in_flight == 0
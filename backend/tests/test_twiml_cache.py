@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("twilio")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from twilio.twiml.voice_response import Dial, Say, Start, Stream, VoiceResponse
+
+from app.api import twilio_webhook
+from app.core.config import settings
+from app.services.twiml_cache import TwimlCache
+
+
+def _fresh(enabled: bool, forward_to: str) -> str:
+    """The response built from scratch for one call, as the webhook did before the cache."""
+    vr = VoiceResponse()
+    if enabled:
+        start = Start()
+        start.append(Stream(url=settings.PUBLIC_WS_MEDIA_URL))
+        vr.append(start)
+        vr.append(Say("This call may be monitored and transcribed for demo purposes."))
+    if forward_to:
+        dial = Dial(caller_id=settings.TWILIO_PHONE_NUMBER)
+        dial.number(forward_to)
+        vr.append(dial)
+    elif enabled:
+        vr.pause(length=60)
+    else:
+        vr.append(Say("Streaming is currently disabled."))
+    return str(vr)
+
+
+@pytest.fixture
+def forwarding(monkeypatch):
+    monkeypatch.setattr(settings, "PUBLIC_WS_MEDIA_URL", "wss://example.test/media")
+    monkeypatch.setattr(settings, "TWILIO_PHONE_NUMBER", "+15550000000")
+    monkeypatch.setattr(settings, "FORWARD_CALLS_ENABLED", True)
+    monkeypatch.setattr(settings, "FORWARD_TO_NUMBER", "+15551111111")
+    monkeypatch.setattr(settings, "FORWARD_NUMBERS", {"+15552222222": "+15553333333"})
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+@pytest.mark.parametrize("forward_to", ["", "+15551111111", "+15553333333"])
+def test_cached_documents_match_a_fresh_render(forwarding, enabled, forward_to):
+    cache = TwimlCache()
+    assert cache.warm() == 4  # on/off for the default target and the one mapped number
+    doc = cache.get(enabled, forward_to)
+    assert doc == _fresh(enabled, forward_to)
+    assert cache.get(enabled, forward_to) is doc  # rendered once
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_webhook_answers_with_the_document_for_the_called_number(forwarding, monkeypatch, enabled):
+    monkeypatch.setattr(twilio_webhook, "get_twiml_cache", lambda cache=TwimlCache(): cache)
+    monkeypatch.setattr(twilio_webhook, "is_enabled", lambda: enabled)
+    monkeypatch.setattr(twilio_webhook, "get_admission", lambda: SimpleNamespace(accepting_streams=True, tier=0))
+    app = FastAPI()
+    app.include_router(twilio_webhook.router)
+    client = TestClient(app)
+    for called, target in (("+15552222222", "+15553333333"), ("+15559999999", "+15551111111")):
+        response = client.post("/twilio/voice", data={"To": called, "From": "+15554444444"})
+        assert response.headers["content-type"] == "application/xml"
+        assert response.text == _fresh(enabled, target)
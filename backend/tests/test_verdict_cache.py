@@ -0,0 +1,110 @@
+import math
+import random
+import struct
+
+import pytest
+
+from app.services import verdict_cache
+from app.services.audio_pipeline import SAMPLE_RATE_HZ, audio_fingerprint
+from app.services.verdict_cache import InMemoryVerdictStore, SQLiteVerdictStore, VerdictCache
+
+MANIPULATED = {"status": "MANIPULATED", "score": 0.97, "request_id": "req-1"}
+
+
+def _recording(seconds: float, seed: int):
+    """Two tones that jump every 50 ms: a stand-in for a replayed synthetic prompt."""
+    rng = random.Random(seed)
+    samples = []
+    for i in range(int(seconds * SAMPLE_RATE_HZ)):
+        if i % 400 == 0:
+            low, high = rng.uniform(200, 1200), rng.uniform(1200, 3500)
+        t = 2 * math.pi * i / SAMPLE_RATE_HZ
+        samples.append(8000 * math.sin(low * t) + 4000 * math.sin(high * t))
+    return samples
+
+
+def _fingerprint(samples, gain: float = 1.0, noise: float = 0.0):
+    rng = random.Random(7)
+    pcm = [max(-32768, min(32767, int(s * gain + rng.gauss(0, noise)))) for s in samples]
+    return audio_fingerprint(struct.pack(f"<{len(pcm)}h", *pcm))
+
+
+@pytest.fixture(scope="module")
+def prints():
+    call = _recording(14, seed=1)
+    return {
+        "stored": _fingerprint(call[:80000]),
+        # The same prompt heard 1.3 s later into the recording, quieter and with line noise
+        "replay": _fingerprint(call[10400:90400], gain=0.5, noise=200),
+        "other": _fingerprint(_recording(10, seed=2)),
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make(max_entries: int = 100, ttl_seconds: float = 3600) -> VerdictCache:
+        if request.param == "memory":
+            store = InMemoryVerdictStore(max_entries, ttl_seconds)
+        else:
+            store = SQLiteVerdictStore(str(tmp_path / f"verdicts{len(caches)}.sqlite3"), max_entries, ttl_seconds)
+        caches.append(VerdictCache(store))
+        return caches[-1]
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def _words(seed: int, n: int = 200):
+    rng = random.Random(seed)
+    return [rng.randrange(1, 1 << 24) for _ in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_audio_hits_and_other_audio_misses(make_cache, prints):
+    cache = make_cache()
+    await cache.store(prints["stored"], MANIPULATED)
+    assert await cache.lookup(prints["replay"]) == dict(MANIPULATED, cached=True)
+    assert await cache.lookup(prints["other"]) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_only_final_verdicts_are_stored(make_cache):
+    cache = make_cache()
+    for i, status in enumerate(["ANALYZING", "ERROR", None, "manipulated"]):
+        await cache.store(_words(i), {"status": status, "score": 0.9, "extra": "dropped"})
+    assert [await cache.lookup(_words(i)) is not None for i in range(4)] == [False, False, False, True]
+    assert await cache.lookup(_words(3)) == {"status": "manipulated", "score": 0.9, "request_id": None, "cached": True}
+    await cache.store([], MANIPULATED)  # nothing to index
+    assert await cache.lookup([]) is None
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_after_the_ttl(make_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, "time", lambda: now[0])
+    cache = make_cache(ttl_seconds=60)
+    await cache.store(_words(1), MANIPULATED)
+    now[0] += 59
+    assert await cache.lookup(_words(1)) is not None
+    now[0] += 2
+    assert await cache.lookup(_words(1)) is None
+    assert await cache.lookup(_words(1)) is None  # and it was removed, not just skipped
+
+
+@pytest.mark.asyncio
+async def test_size_bound_evicts_the_least_recently_hit(make_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, "time", lambda: now[0])
+    cache = make_cache(max_entries=2)
+    for seed in (1, 2):
+        now[0] += 1
+        await cache.store(_words(seed), MANIPULATED)
+    now[0] += 1
+    assert await cache.lookup(_words(1)) is not None  # 1 is now the most recent
+    now[0] += 1
+    await cache.store(_words(3), MANIPULATED)
+    assert [await cache.lookup(_words(seed)) is not None for seed in (1, 2, 3)] == [True, False, True]
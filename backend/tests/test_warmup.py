@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.services import warmup
+
+
+class RecordingLog:
+    def __init__(self) -> None:
+        self.events = []
+
+    def _record(self, level):
+        return lambda msg, **fields: self.events.append((level, msg, fields))
+
+    def __getattr__(self, level):
+        return self._record(level)
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    """Every client configured; each warm-up step replaced by a recorder (or whatever a test sets)."""
+    log = RecordingLog()
+    ran = []
+
+    def step(name):
+        async def run():
+            ran.append(name)
+        return run
+
+    monkeypatch.setattr(warmup, "log", log)
+    monkeypatch.setattr(warmup.STARTUP_STEP_SECONDS, "_values", {})
+    monkeypatch.setattr(type(warmup.settings), "GOOGLE_APPLICATION_CREDENTIALS", "/creds.json")
+    monkeypatch.setattr(warmup.settings, "REALITY_DEFENDER_API_KEY", "rd-key")
+    monkeypatch.setattr(warmup.notifier, "_twilio_configured", lambda: True)
+    monkeypatch.setattr(warmup, "_warm_speech", step("speech"))
+    monkeypatch.setattr(warmup, "_warm_reality_defender", step("reality_defender"))
+    monkeypatch.setattr(warmup, "_warm_twilio", step("twilio"))
+    return ran, log
+
+
+def _timed_steps():
+    return {key[0] for key in warmup.STARTUP_STEP_SECONDS._values}
+
+
+@pytest.mark.asyncio
+async def test_failed_step_is_logged_and_the_rest_still_warm_up(steps, monkeypatch):
+    ran, log = steps
+
+    async def no_credentials():
+        raise OSError("could not load credentials")
+
+    monkeypatch.setattr(warmup, "_warm_speech", no_credentials)
+    await warmup.warm_up_clients()  # does not raise
+
+    assert ran == ["reality_defender", "twilio"]
+    failures = [(msg, fields) for level, msg, fields in log.events if level == "warning"]
+    assert failures == [
+        ("warm-up step failed; the first call will retry it", {"step": "speech", "error": "OSError('could not load credentials')"})
+    ]
+    assert _timed_steps() == {"reality_defender", "twilio", "total"}  # no duration for the failed step
+
+
+@pytest.mark.asyncio
+async def test_hanging_step_does_not_block_startup_and_is_cancelled_at_shutdown(steps, monkeypatch):
+    ran, log = steps
+    stalled = asyncio.Event()
+
+    async def unreachable_metadata_server():
+        stalled.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(warmup, "_warm_speech", unreachable_metadata_server)
+    task = asyncio.create_task(warmup.warm_up_clients())  # as the lifespan starts it
+    await asyncio.wait_for(stalled.wait(), 1)
+    assert not task.done()  # the worker carries on serving meanwhile
+
+    task.cancel()  # lifespan shutdown
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert ran == [] and _timed_steps() == set()
+    assert not [event for event in log.events if event[0] == "warning"]  # cancellation is not a failure
+
+
+@pytest.mark.asyncio
+async def test_unconfigured_clients_are_skipped(steps, monkeypatch):
+    ran, log = steps
+    monkeypatch.setattr(type(warmup.settings), "GOOGLE_APPLICATION_CREDENTIALS", "")
+    monkeypatch.setattr(warmup.settings, "REALITY_DEFENDER_API_KEY", "")
+    monkeypatch.setattr(warmup.notifier, "_twilio_configured", lambda: False)
+    await warmup.warm_up_clients()
+    assert ran == [] and _timed_steps() == {"total"}
+    assert ("warning", "REALITY_DEFENDER_API_KEY not set; detection uploads will fail", {}) in log.events
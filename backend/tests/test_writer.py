@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.db.models import Base, Call, DetectionWindow, TranscriptSegment
+from app.db.session import create_engine
+from app.db.writer import PersistenceWriter
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'calls.sqlite3'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def _writer(engine) -> PersistenceWriter:
+    writer = PersistenceWriter(engine, max_pending=100, batch_max=50, flush_seconds=0.01)
+    writer.start()
+    return writer
+
+
+async def _count(engine, model) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_batch_writes_children_after_their_call(engine):
+    writer = _writer(engine)
+    # Queued child-first: the batch still inserts the call row before anything that refers to it
+    writer.record_window("CA1", 0.0, 10.0, "AUTHENTIC", 0.2)
+    writer.record_transcript("CA1", "hello", risk=0.4)
+    writer.record_call_started("CA1", "MZ1")
+    writer.record_call_ended("CA1", frames=500, speech_seconds=6.5)
+    await writer.aclose()
+    async with engine.connect() as conn:
+        call = (await conn.execute(select(Call))).one()
+    assert (call.frames, call.speech_seconds, call.max_score, call.phrase_risk) == (500, 6.5, 0.2, 0.4)
+    assert await _count(engine, DetectionWindow) == 1 and await _count(engine, TranscriptSegment) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_one_transaction_per_row(engine):
+    writer = _writer(engine)
+    writer.record_call_started("CA1", "MZ1")
+    await writer.aclose()
+
+    writer = _writer(engine)
+    writer.record_call_started("CA1", "MZ1")  # duplicate key: fails the whole batch
+    writer.record_call_started("CA2", "MZ2")
+    writer.record_window("CA2", 0.0, 10.0, "AUTHENTIC", 0.1)
+    await writer.aclose()
+    assert await _count(engine, Call) == 2
+    assert await _count(engine, DetectionWindow) == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_keeps_running_after_an_unexpected_error(engine, monkeypatch):
+    writer = _writer(engine)
+    write = writer._write
+    failures = []
+
+    async def flaky(batch):
+        if not failures:
+            failures.append(batch)
+            raise RuntimeError("driver bug")
+        await write(batch)
+
+    monkeypatch.setattr(writer, "_write", flaky)
+    writer.record_call_started("CA1", "MZ1")
+    while not failures:
+        await asyncio.sleep(0.01)
+    writer.record_call_started("CA2", "MZ2")
+    await writer.aclose()
+    assert len(failures) == 1
+    assert await _count(engine, Call) == 1
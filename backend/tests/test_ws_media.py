@@ -0,0 +1,150 @@
+import base64
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import ws_media
+from app.core.config import settings
+from app.services.admission import AdmissionController
+
+
+class FakeSTT:
+    """Stands in for AsyncGoogleSTTStreamer: keeps the transcript callback so the test can drive it."""
+
+    instances = []
+    calls = []  # (method, instance index[, bytes written]) across instances, in order
+
+    def __init__(self, **_) -> None:
+        self.callback = None
+        self.queue_depth = 0
+        self.index = len(FakeSTT.instances)
+        FakeSTT.instances.append(self)
+
+    def start(self, callback) -> None:
+        self.callback = callback
+        FakeSTT.calls.append(("start", self.index))
+
+    async def write(self, chunk) -> None:
+        FakeSTT.calls.append(("write", self.index, len(chunk)))
+
+    def close(self) -> None:
+        FakeSTT.calls.append(("close", self.index))
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args))
+
+
+@pytest.fixture
+def media(monkeypatch):
+    FakeSTT.instances.clear()
+    FakeSTT.calls.clear()
+    hub, db = Recorder(), Recorder()
+    monkeypatch.setattr(ws_media, "AsyncGoogleSTTStreamer", FakeSTT)
+    monkeypatch.setattr(ws_media, "get_event_hub", lambda: hub)
+    monkeypatch.setattr(ws_media, "get_persistence", lambda: db)
+    monkeypatch.setattr(settings, "VAD_ENABLED", False)
+    monkeypatch.setattr(settings, "FORWARD_TO_NUMBER", "")
+    app = FastAPI()
+    app.include_router(ws_media.router)
+    return TestClient(app), hub, db
+
+
+def test_late_stt_results_are_only_persisted_after_the_call_ends(media):
+    client, hub, db = media
+    with client.websocket_connect("/media") as ws:
+        ws.send_text(json.dumps({"event": "start", "start": {"callSid": "CA1", "streamSid": "MZ1"}}))
+        ws.send_text(json.dumps({"event": "stop"}))
+    (stt,) = FakeSTT.instances
+    assert ("publish", ("call_ended", "CA1")) in hub.calls
+
+    published, recorded = len(hub.calls), len(db.calls)
+    stt.callback("buy a gift card", False)
+    stt.callback("buy a gift card and don't tell anyone", True)
+    assert len(hub.calls) == published  # no transcript or risk events after call_ended
+    assert db.calls[recorded:] == [("record_transcript", ("CA1", "buy a gift card and don't tell anyone"))]
+
+
+class FakeArchive:
+    def __init__(self) -> None:
+        self.appended = []
+
+    def append(self, call_sid, mulaw, pos) -> None:
+        self.appended.append((pos, bytes(mulaw)))
+
+    def new_stream(self, call_sid) -> None:
+        pass
+
+
+class FakeEncoder:
+    def __init__(self, archive: FakeArchive) -> None:
+        self.archive = archive
+        self.archived_before = []
+
+    async def wav_and_fingerprint(self, mulaw, fingerprint=True):
+        self.archived_before.append(len(self.archive.appended))
+        return b"RIFF", []
+
+
+class FakeDetector:
+    async def upload_bytes(self, wav, filename):
+        return "req-1"
+
+    async def wait_for_result(self, request_id):
+        return {"status": "AUTHENTIC", "score": 0.1}
+
+
+def _frame(value: int) -> str:
+    payload = base64.b64encode(bytes([value]) * 160).decode()
+    return f'{{"event":"media","media":{{"track":"inbound","payload":"{payload}"}},"streamSid":"MZ1"}}'
+
+
+def test_detection_windows_are_archived_before_the_first_await(media, monkeypatch):
+    client, _, _ = media
+    archive = FakeArchive()
+    encoder = FakeEncoder(archive)
+    monkeypatch.setattr(ws_media, "get_capture_archive", lambda: archive)
+    monkeypatch.setattr(ws_media, "get_audio_executor", lambda: encoder)
+    monkeypatch.setattr(ws_media, "get_verdict_cache", lambda: None)
+    monkeypatch.setattr(ws_media, "get_reality_defender", FakeDetector)
+    monkeypatch.setattr(settings, "DETECTION_SUBMIT_MODE", "memory")
+    monkeypatch.setattr(settings, "DETECTION_WINDOW_SECONDS", 0.1)  # 5 frames
+    monkeypatch.setattr(settings, "DETECTION_HOP_SECONDS", 0.1)
+    with client.websocket_connect("/media") as ws:
+        ws.send_text(json.dumps({"event": "start", "start": {"callSid": "CA1", "streamSid": "MZ1"}}))
+        for value in range(1, 6):
+            ws.send_text(_frame(value))
+        deadline = time.monotonic() + 2
+        while not encoder.archived_before and time.monotonic() < deadline:
+            time.sleep(0.01)
+        ws.send_text(json.dumps({"event": "stop"}))
+    assert encoder.archived_before[0] == 1  # the window was in the archive before encoding began
+    assert archive.appended[0] == (0, b"".join(bytes([v]) * 160 for v in range(1, 6)))
+
+
+def test_repeated_start_closes_the_previous_stt_stream(media, monkeypatch):
+    client, _, _ = media
+    controller = AdmissionController(
+        max_sessions=10, max_stt_streams=10, max_detections=10, lag_tiers=[1.0, 2.0, 3.0], hop_factor=3, recover_seconds=10
+    )
+    monkeypatch.setattr(ws_media, "get_admission", lambda: controller)
+    with client.websocket_connect("/media") as ws:
+        ws.send_text(json.dumps({"event": "start", "start": {"callSid": "CA1", "streamSid": "MZ1"}}))
+        ws.send_text(_frame(1))
+        ws.send_text(json.dumps({"event": "start", "start": {"callSid": "CA1", "streamSid": "MZ2"}}))
+        ws.send_text(json.dumps({"event": "stop"}))
+    assert FakeSTT.calls == [
+        ("start", 0),
+        ("write", 0, 160),  # the first stream's buffered tail goes to it, not the new one
+        ("close", 0),
+        ("start", 1),
+        ("close", 1),
+    ]
+    assert controller.stt_streams == 0 and controller.sessions == 0